@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -30,7 +31,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-ig0*&s!y64h48(vy%$&p#zv4@*h!b()o(0l5j3gd^=vy2xlan!'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DJANGO_DEBUG", "1") == "1"
 
 ALLOWED_HOSTS = []
 
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'rest_framework.authtoken',
     'coreapi',
     'core',
@@ -58,9 +60,23 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    "UPDATE_LAST_LOGIN": False,
 }
 
+# Segundos que un usuario autenticado por JWT permanece en la caché del proceso
+AUTH_USER_CACHE_TTL = 60
+# Usuarios distintos en esa caché como máximo (LRU): la memoria no crece con cada id
+AUTH_USER_CACHE_MAX_ENTRIES = 10000
+# Alias de CACHES donde se guardan los access tokens revocados (compartido entre workers)
+AUTH_REVOCATION_CACHE = "default"
+
 MIDDLEWARE = [
+    # Primero para medir la petición completa (ver core/instrumentation.py)
+    'core.instrumentation.InstrumentationMiddleware',
+    # Fija al primario tras una escritura (ver core/routers.py)
+    'core.routers.ReplicaPinMiddleware',
+    # Antes que el resto para comprimir la respuesta final (ver core/compression.py)
+    'core.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,13 +91,24 @@ MIDDLEWARE = [
 AUTH_USER_MODEL = 'core.User'  # Usar nuestro modelo personalizado
 
 AUTHENTICATION_BACKENDS = [
-    #'core.backends.EmailAuthBackend',
-    'django.contrib.auth.backends.ModelBackend',
+    # Login por email en una consulta; también atiende al admin (hereda los permisos de ModelBackend)
+    'core.backend.EmailAuthBackend',
+]
+
+# Coste de PBKDF2: subirlo re-hashea cada contraseña en su siguiente login correcto
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "0")) or None
+PASSWORD_HASHERS = [
+    'core.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # JWT verificado por firma + usuario en caché: sin consultas por petición
+        'core.authentication.CachedJWTAuthentication',
         #'rest_framework.renderers.BrowsableAPIRenderer',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -90,11 +117,23 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
         
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        # Solo actúan en vistas con `throttle_scope(s)` (ver THROTTLING)
+        'core.throttling.IPBucketThrottle',
+        'core.throttling.UserBucketThrottle',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
+    # JSON con orjson/msgspec si están instalados (ver core/renderers.py);
+    # el browsable API solo en desarrollo: su HTML es caro de generar
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ]
+        'core.renderers.FastJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -135,6 +174,33 @@ WSGI_APPLICATION = 'backend_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Conexiones:
+# - Por defecto, conexiones persistentes por hilo (CONN_MAX_AGE) con health
+#   check antes de reutilizarlas: evita pagar el handshake en cada petición.
+# - DB_POOL=1 (solo PostgreSQL con psycopg 3 + psycopg-pool): pool nativo de
+#   Django 5.1 por proceso. El tamaño se reparte el presupuesto de conexiones
+#   del servidor (DB_MAX_CONNECTIONS) entre los workers (WEB_CONCURRENCY).
+#   Sus estadísticas se exportan en /metrics (db_pool_*).
+DB_POOL = os.getenv("DB_POOL", "0") == "1"
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "0")) or max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+
+DB_OPTIONS = {}
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DB_OPTIONS["pool"] = {
+        "min_size": min(int(os.getenv("DB_POOL_MIN_SIZE", "2")), DB_POOL_MAX_SIZE),
+        "max_size": DB_POOL_MAX_SIZE,
+        # Segundos esperando una conexión libre antes de fallar (pool agotado)
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        "max_idle": 300,
+        "max_lifetime": 1800,
+        # Health check al sacar una conexión del pool
+        "check": ConnectionPool.check_connection,
+    }
+
 DATABASES = {
     "default": {
         "ENGINE": os.getenv("DB_ENGINE"),
@@ -143,9 +209,143 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Con pool, Django exige CONN_MAX_AGE = 0 (el pool gestiona la vida de la conexión)
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": DB_OPTIONS,
+    }
+}
+
+# Réplicas de lectura (ver core/routers.py). DB_REPLICAS es una lista separada
+# por comas de hosts (PostgreSQL) o de ficheros (SQLite); cada una se registra
+# como 'replica1', 'replica2'... con el resto de la configuración del primario.
+# En tests son espejo de 'default'.
+for index, replica in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1):
+    key = "NAME" if "sqlite3" in (DATABASES["default"]["ENGINE"] or "") else "HOST"
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        key: replica.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+# Segundos que un cliente lee del primario tras escribir (cubre el retraso de replicación)
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "e-commerce-shop"),
+    }
+}
+
+# Caché de lectura del catálogo (ver core/cache.py).
+# Con varios workers usar 'core.cache.DjangoCacheBackend' sobre un CACHES compartido.
+CATALOG_CACHE = {
+    "BACKEND": os.getenv("CATALOG_CACHE_BACKEND", "core.cache.LRUBackend"),
+    "OPTIONS": {},
+    "TIMEOUT": 300,
+    "REPLICA_TIMEOUT": REPLICA_PIN_SECONDS,
+    "ENABLED": True,
+}
+
+# Listados del catálogo construidos desde values() (ver core/fast_serializers.py)
+FAST_SERIALIZERS = {
+    "ENABLED": os.getenv("FAST_SERIALIZERS_ENABLED", "1") == "1",
+}
+
+# Compresión negociada por Accept-Encoding (ver core/compression.py).
+# 'br' requiere `brotli` y 'zstd' requiere `zstandard`; sin ellos se usa gzip.
+COMPRESSION = {
+    "ENABLED": os.getenv("COMPRESSION_ENABLED", "1") == "1",
+    "MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "LEVELS": {"gzip": 6, "br": 4, "zstd": 3},
+}
+
+# Escrituras en lote de variantes e inventario (ver core/bulk.py): cada lote
+# de BATCH_SIZE elementos se guarda en una transacción
+BULK_WRITES = {
+    "BATCH_SIZE": int(os.getenv("BULK_BATCH_SIZE", "1000")),
+    "MAX_ITEMS": 50000,
 }
 
+# Backend de FastJSONRenderer/FastJSONParser: 'auto' (orjson > msgspec > json),
+# 'orjson', 'msgspec' o 'json' (ver core/renderers.py)
+JSON_BACKEND = {
+    "BACKEND": os.getenv("JSON_BACKEND", "auto"),
+}
+
+# Limitación por token bucket (ver core/throttling.py). Cada ámbito admite un
+# límite por IP y otro por usuario: 'N/periodo' (ráfaga = N) o {'rate', 'burst'}.
+# Con varios workers usar 'core.throttling.DjangoCacheBackend' sobre un CACHES compartido.
+THROTTLING = {
+    "BACKEND": os.getenv("THROTTLE_BACKEND", "core.throttling.LocalBucketBackend"),
+    "OPTIONS": {},
+    "ENABLED": os.getenv("THROTTLE_ENABLED", "1") == "1",
+    "SCOPES": {
+        "login": {"ip": {"rate": "20/min", "burst": 10}},
+        "register": {"ip": "5/hour"},
+        "stock_write": {"ip": "600/min", "user": {"rate": "120/min", "burst": 30}},
+        "cart_write": {"ip": "600/min", "user": "120/min"},
+        "checkout": {"ip": "60/min", "user": {"rate": "10/min", "burst": 5}},
+    },
+}
+
+# Instrumentación por petición (ver core/instrumentation.py): Server-Timing,
+# logs JSON en 'core.performance' y agregados por vista en /api/ops/metrics/
+INSTRUMENTATION = {
+    "ENABLED": os.getenv("INSTRUMENTATION_ENABLED", "1") == "1",
+    "SERVER_TIMING": True,
+    "SLOW_REQUEST_MS": int(os.getenv("SLOW_REQUEST_MS", "500")),
+    "SLOW_QUERIES": 10,
+}
+
+# Exportador Prometheus en /metrics (ver core/metrics.py). Con varios workers,
+# apuntar METRICS_MULTIPROC_DIR a un directorio compartido y vacío al arrancar.
+# Sin METRICS_AUTH_TOKEN el endpoint responde 403.
+METRICS = {
+    "ENABLED": True,
+    "MULTIPROCESS_DIR": os.getenv("METRICS_MULTIPROC_DIR") or None,
+    "FLUSH_INTERVAL": 1.0,
+    "AUTH_TOKEN": os.getenv("METRICS_AUTH_TOKEN") or None,
+}
+
+# Canal push de stock por SSE en /api/stream/inventory/ (ver core/push.py).
+# Requiere ASGI. El broker en memoria solo reparte las escrituras del propio worker.
+PUSH = {
+    "BACKEND": os.getenv("PUSH_BACKEND", "core.push.InMemoryBroker"),
+    "OPTIONS": {"replay": 1000, "queue_size": 1000},
+    "ENABLED": os.getenv("PUSH_ENABLED", "1") == "1",
+    "HEARTBEAT": 15,
+}
+
+TESTING = sys.argv[1:2] == ["test"]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # INFO registra todas las peticiones; WARNING solo las lentas
+        "core.performance": {
+            "handlers": ["console"],
+            # Bajo `manage.py test` los avisos de peticiones lentas solo ensucian la salida
+            "level": os.getenv("PERFORMANCE_LOG_LEVEL", "ERROR" if TESTING else "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+# Backend de búsqueda de productos (ver core/search.py): 'auto', 'postgres' o 'memory'
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
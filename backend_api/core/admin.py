@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Product, Variant, Inventory
+from .models import Product, Promotion, Variant, Inventory, Order, OrderLine
 
 class VariantInline(admin.TabularInline):
     """Configuración inline para Variants en Product"""
@@ -19,9 +19,10 @@ class InventoryInline(admin.StackedInline):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     """Configuración del admin para Product"""
-    list_display = ('name', 'category_display', 'gender_display', 'base_price', 'created_at')
+    list_display = ('name', 'category_display', 'gender_display', 'base_price', 'effective_price', 'created_at')
     list_filter = ('category', 'gender', 'created_at')
     search_fields = ('name', 'description')
+    readonly_fields = ('effective_price',)
     #prepopulated_fields = {'slug': ('name',)}  # Si añades un campo slug
     inlines = [VariantInline]
     fieldsets = (
@@ -29,7 +30,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('name', 'description')
         }),
         ('Precio y Categorización', {
-            'fields': ('base_price', 'category', 'gender')
+            'fields': ('base_price', 'effective_price', 'category', 'gender')
         }),
     )
 
@@ -41,6 +42,14 @@ class ProductAdmin(admin.ModelAdmin):
         return obj.get_gender_display()
     gender_display.short_description = 'Género'
 
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    """Configuración del admin para Promotion (guardar recalcula los precios de su alcance)"""
+    list_display = ('name', 'discount_type', 'value', 'product', 'category', 'gender', 'starts_at', 'ends_at', 'is_active')
+    list_filter = ('is_active', 'discount_type', 'category', 'gender')
+    search_fields = ('name',)
+    raw_id_fields = ('product',)
+
 @admin.register(Variant)
 class VariantAdmin(admin.ModelAdmin):
     """Configuración del admin para Variant"""
@@ -83,4 +92,22 @@ class InventoryAdmin(admin.ModelAdmin):
         elif obj.stock_quantity < 5:
             return format_html('<span style="color: orange;">BAJO STOCK</span>')
         return format_html('<span style="color: green;">DISPONIBLE</span>')
-    stock_status.short_description = 'Estado'
\ No newline at end of file
+    stock_status.short_description = 'Estado'
+
+class OrderLineInline(admin.TabularInline):
+    """Líneas de pedido (solo lectura: son una foto del checkout)"""
+    model = OrderLine
+    extra = 0
+    fields = ('sku', 'product_name', 'quantity', 'unit_price')
+    readonly_fields = fields
+    can_delete = False
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    """Configuración del admin para Order"""
+    list_display = ('id', 'user', 'status', 'total', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__email',)
+    readonly_fields = ('user', 'total', 'created_at')
+    list_select_related = ('user',)
+    inlines = [OrderLineInline]
\ No newline at end of file
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registra los receivers de invalidación de caché del catálogo
+        from . import signals  # noqa: F401
+        # Conecta el wrapper de consultas antes de que se abra ninguna conexión
+        from . import instrumentation  # noqa: F401
@@ -0,0 +1,141 @@
+"""
+Variantes asíncronas (ASGI) de las lecturas del catálogo.
+
+DRF no ejecuta vistas `async def`, así que estas son vistas de Django puras:
+el acceso a datos usa el ORM asíncrono (`aget`, `async for`, con
+`select_related`/`prefetch_related` resueltos en la misma iteración) y la
+respuesta se construye con los mismos serializers de DRF (solo
+`to_representation`, que no toca la base de datos porque todo viene
+precargado) y `FastJSONRenderer` (ver `core/renderers.py`).
+
+Bajo un servidor ASGI (`uvicorn backend_api.asgi:application`) un cliente
+lento no retiene un hilo: mientras espera, el event loop atiende a otros.
+Bajo WSGI estas vistas también funcionan (Django las ejecuta en un loop).
+
+Rutas (`/api/async/...`), equivalentes de solo lectura a:
+- `products/`                 -> `GET /api/products/` (keyset, ver `PAGE_SIZE`)
+- `products/<pk>/`            -> `GET /api/products/<pk>/`
+- `variants/<pk>/stock/`      -> `GET /api/variants/<pk>/stock/`
+- `inventory/low_stock/`      -> `GET /api/inventory/low_stock/` (sin paginar)
+
+Todas leen de una réplica si hay (`replica_view`, ver `core/routers.py`),
+salvo que el cliente esté fijado al primario tras una escritura.
+
+El listado pagina por keyset con el mismo orden que `ProductCursorPagination`
+(`-created_at, name, id`), pero con un cursor propio: `?cursor=` codifica
+la última fila devuelta.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_safe
+
+from .models import Inventory, Product, Variant
+from .renderers import FastJSONRenderer
+from .routers import replica_view
+from .serializers import InventorySerializer, ProductSerializer
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+def encode_cursor(product):
+    position = [product.created_at.isoformat(), product.name, product.pk]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(raw):
+    """Devuelve `(created_at, name, id)` o lanza `ValueError`"""
+    created_at, name, pk = json.loads(base64.urlsafe_b64decode(raw.encode()))
+    created_at = parse_datetime(created_at)
+    if created_at is None:
+        raise ValueError(raw)
+    return created_at, name, int(pk)
+
+
+def after(created_at, name, pk):
+    """Filas posteriores a la posición en el orden `-created_at, name, id`"""
+    return (
+        Q(created_at__lt=created_at)
+        | Q(created_at=created_at, name__gt=name)
+        | Q(created_at=created_at, name=name, id__gt=pk)
+    )
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('page_size', PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+@require_safe
+@replica_view
+async def product_list(request):
+    size = page_size(request)
+    queryset = Product.objects.order_by('-created_at', 'name', 'id')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            queryset = queryset.filter(after(*decode_cursor(cursor)))
+        except (ValueError, TypeError):
+            return HttpResponseBadRequest('Cursor inválido')
+
+    # Se pide una fila de más para saber si hay página siguiente
+    products = [product async for product in queryset[:size + 1]]
+    has_next = len(products) > size
+    products = products[:size]
+
+    next_url = None
+    if has_next:
+        query = request.GET.copy()
+        query['cursor'] = encode_cursor(products[-1])
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return json_response({
+        'next': next_url,
+        'results': ProductSerializer(products, many=True, context={'request': request}).data,
+    })
+
+
+@require_safe
+@replica_view
+async def product_detail(request, pk):
+    try:
+        product = await Product.objects.aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404
+    return json_response(ProductSerializer(product, context={'request': request}).data)
+
+
+@require_safe
+@replica_view
+async def variant_stock(request, pk):
+    try:
+        variant = await Variant.objects.select_related('product', 'inventory').aget(pk=pk)
+    except Variant.DoesNotExist:
+        raise Http404
+    try:
+        inventory = variant.inventory
+    except Inventory.DoesNotExist:
+        raise Http404
+    # `variant_info` usa `str(variant)`: la variante ya está cargada con su producto
+    inventory.variant = variant
+    return json_response(InventorySerializer(inventory, context={'request': request}).data)
+
+
+@require_safe
+@replica_view
+async def low_stock(request):
+    queryset = Inventory.objects.low_stock().select_related('variant__product').order_by('id')
+    items = [item async for item in queryset]
+    return json_response(InventorySerializer(items, many=True, context={'request': request}).data)
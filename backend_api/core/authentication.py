@@ -0,0 +1,143 @@
+"""
+Autenticación JWT sin consultas en el camino caliente.
+
+`CachedJWTAuthentication` valida el access token solo por firma y expiración
+(no existe tabla de tokens que consultar), comprueba la lista de revocados en
+la caché de Django y resuelve el usuario desde una caché en memoria del
+proceso. Una petición autenticada al catálogo no hace consultas de auth
+mientras el usuario esté en caché.
+
+- `UserCache`: usuarios por id con TTL (`AUTH_USER_CACHE_TTL`), LRU con
+  como mucho `AUTH_USER_CACHE_MAX_ENTRIES` usuarios. Los cambios en el
+  usuario lo expulsan en este proceso (ver `core.signals`); en otros
+  workers expira como mucho tras el TTL.
+- Revocación: `revoke_access_token` guarda el `jti` en la caché compartida
+  solo hasta que el token habría expirado, así que la lista no crece sin fin.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+REVOKED_PREFIX = 'jwt:revoked:'
+
+
+def revocation_cache():
+    return caches[getattr(settings, 'AUTH_REVOCATION_CACHE', 'default')]
+
+
+class UserCache:
+    """Caché LRU de usuarios (con sus permisos ya calculados) por id, con TTL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'AUTH_USER_CACHE_MAX_ENTRIES', 10000)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._users.move_to_end(user_id)
+                else:
+                    del self._users[user_id]
+                    entry = None
+        if entry is not None:
+            # Copia superficial: cada petición tiene su propio objeto
+            return copy.copy(entry[1])
+
+        user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        # Precalcula permisos para que `has_perm` no consulte en cada petición
+        user.get_all_permissions()
+        with self._lock:
+            self._users[user_id] = (now + self.ttl, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+        return copy.copy(user)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def __len__(self):
+        return len(self._users)
+
+
+user_cache = UserCache()
+
+
+def issue_tokens(user):
+    """
+    Emite el par refresh/access para `user` sin escribir en la base de datos.
+
+    `RefreshToken.for_user` inserta un `OutstandingToken` por login cuando la
+    app de blacklist está instalada; no hace falta: `blacklist()` crea ese
+    registro bajo demanda, solo para los tokens que se revocan.
+    """
+    refresh = RefreshToken()
+    user_id = getattr(user, api_settings.USER_ID_FIELD)
+    refresh[api_settings.USER_ID_CLAIM] = user_id if isinstance(user_id, int) else str(user_id)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def revoke_access_token(token):
+    """Revoca un access token hasta su expiración natural"""
+    remaining = int(token['exp'] - time.time())
+    if remaining > 0:
+        revocation_cache().set(REVOKED_PREFIX + token[api_settings.JTI_CLAIM], 1, remaining)
+
+
+def is_revoked(token):
+    return revocation_cache().get(REVOKED_PREFIX + token[api_settings.JTI_CLAIM]) is not None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication con usuario cacheado y revocación sin base de datos"""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_revoked(token):
+            raise InvalidToken(_("Token has been revoked"))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = user_cache.get(user_id)
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
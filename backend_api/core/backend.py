@@ -1,12 +1,30 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
 
+
 class EmailAuthBackend(ModelBackend):
-    def authenticate(self, request, email=None, password=None, **kwargs):
+    """
+    Autenticación por email con una sola consulta indexada por intento.
+
+    - Busca por `email` (único, con índice) ya normalizado, sin consultas previas.
+    - Si el usuario no existe, hashea igualmente la contraseña con el hasher
+      actual para que un fallo tarde lo mismo que un acierto (no revela qué
+      emails están registrados).
+    - `check_password` re-hashea la contraseña si el hasher o su coste han
+      cambiado (ver `core.hashers`).
+    """
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
         User = get_user_model()
+        # El admin de Django envía las credenciales como `username`
+        email = email or username or kwargs.get(User.USERNAME_FIELD)
+        if email is None or password is None:
+            return None
         try:
-            user = User.objects.get(email=email)
-            if user.check_password(password):
-                return user
+            user = User._default_manager.get(email=User.objects.normalize_email(email))
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
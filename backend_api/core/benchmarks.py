@@ -0,0 +1,716 @@
+"""
+Benchmarks de rendimiento del backend.
+
+Cada benchmark es una función registrada con `@benchmark('nombre')` que
+recibe las opciones del comando y devuelve un dict de métricas. Se ejecutan
+con `python manage.py benchmark <nombre>` sobre una base de datos de test
+desechable (nunca sobre los datos reales).
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from .models import Inventory, Product, Variant
+
+REGISTRY = {}
+
+
+def benchmark(name):
+    """Registra una función de benchmark bajo `name`"""
+    def decorator(func):
+        REGISTRY[name] = func
+        return func
+    return decorator
+
+
+def make_catalog(products, variants_per_product=1, stock=100):
+    """
+    Crea un catálogo sintético con `bulk_create` y devuelve las variantes.
+    Solo usa las filas que crea: se puede llamar con datos previos en la base.
+    """
+    last_product = Product.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    last_variant = Variant.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    Product.objects.bulk_create(
+        Product(
+            name=f'Producto {i}',
+            description=f'Calzado sintético número {i}',
+            category=Product.CategoryChoices.values[i % len(Product.CategoryChoices.values)],
+            gender=Product.GenderChoices.values[i % len(Product.GenderChoices.values)],
+            base_price=Decimal(50 + i % 200),
+            effective_price=Decimal(50 + i % 200),
+        )
+        for i in range(products)
+    )
+    product_ids = list(Product.objects.filter(id__gt=last_product).order_by('id').values_list('id', flat=True))
+    Variant.objects.bulk_create(
+        Variant(product_id=pid, size=str(36 + j), color='negro', sku=f'SKU-{pid}-{j}')
+        for pid in product_ids
+        for j in range(variants_per_product)
+    )
+    variants = list(Variant.objects.filter(id__gt=last_variant).order_by('id'))
+    Inventory.objects.bulk_create(
+        Inventory(variant=variant, stock_quantity=stock) for variant in variants
+    )
+    return variants
+
+
+def timed(func, *args, **kwargs):
+    """Ejecuta `func` y devuelve `(resultado, segundos)`"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def hammer_stock(variant_id, threads=16, attempts=50, quantity=1):
+    """
+    Lanza `threads` hilos que intentan reservar `quantity` unidades de la
+    misma variante `attempts` veces cada uno. Devuelve éxitos, rechazos por
+    falta de stock, reintentos por bloqueo del motor y el throughput obtenido.
+    """
+    from .stock import InsufficientStock, decrement_stock
+
+    counters = {'reserved': 0, 'rejected': 0, 'retries': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def attempt():
+        while True:
+            try:
+                decrement_stock(variant_id, quantity)
+                return 'reserved'
+            except InsufficientStock:
+                return 'rejected'
+            except OperationalError:
+                # SQLite no encola escritores ("database table is locked"):
+                # se reintenta, igual que haría un cliente real
+                with lock:
+                    counters['retries'] += 1
+                time.sleep(0.001)
+
+    def worker():
+        barrier.wait()
+        try:
+            for _ in range(attempts):
+                outcome = attempt()
+                with lock:
+                    counters[outcome] += 1
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = threads * attempts
+    return {
+        **counters,
+        'attempts': total,
+        'seconds': round(elapsed, 3),
+        'ops_per_second': round(total / elapsed, 1),
+    }
+
+
+@benchmark('stock_contention')
+def stock_contention(threads=16, iterations=50, **options):
+    """Muchos hilos reservando la misma SKU: sin sobreventa y con throughput"""
+    stock = threads * iterations // 2
+    variant = make_catalog(1, stock=stock)[0]
+    result = hammer_stock(variant.pk, threads=threads, attempts=iterations)
+    remaining = Inventory.objects.get(variant=variant).stock_quantity
+    result.update({
+        'initial_stock': stock,
+        'final_stock': remaining,
+        'oversold': remaining < 0 or result['reserved'] > stock,
+    })
+    return result
+
+
+def synthetic_import_rows(count, variants_per_product=4):
+    """Genera filas de importación sin materializarlas en memoria"""
+    categories = Product.CategoryChoices.values
+    genders = Product.GenderChoices.values
+    for i in range(count):
+        product = i // variants_per_product
+        yield {
+            'product_name': f'Importado {product}',
+            'description': f'Producto importado {product}',
+            'category': categories[product % len(categories)],
+            'gender': genders[product % len(genders)],
+            'base_price': f'{50 + product % 200}.00',
+            'size': str(36 + i % variants_per_product),
+            'color': 'negro',
+            'sku': f'IMP-{i}',
+            'stock_quantity': i % 50,
+        }
+
+
+@benchmark('catalog_import')
+def catalog_import(size=20000, iterations=1, **options):
+    """Importación masiva: filas por segundo y memoria pico (alta y re-importación)"""
+    import tracemalloc
+
+    from .importers import CatalogImporter
+
+    result = {}
+    for label in ('insert', 'upsert'):
+        tracemalloc.start()
+        importer = CatalogImporter(chunk_size=1000)
+        _, elapsed = timed(importer.run, synthetic_import_rows(size))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result[f'{label}_rows'] = importer.result.imported
+        result[f'{label}_rows_per_second'] = round(size / elapsed, 1)
+        result[f'{label}_peak_mib'] = round(peak / 2**20, 1)
+    return result
+
+
+@benchmark('catalog_export')
+def catalog_export(size=20000, **options):
+    """Exportación en streaming: filas por segundo y memoria pico a 1x y 4x filas"""
+    import tracemalloc
+
+    from .exporters import export_catalog
+
+    result = {}
+    for factor in (1, 4):
+        Variant.objects.all().delete()
+        Product.objects.all().delete()
+        make_catalog(size * factor // 4, variants_per_product=4)
+        for fmt in ('csv', 'jsonl'):
+            tracemalloc.start()
+            _, elapsed = timed(lambda: sum(len(chunk) for chunk in export_catalog(fmt)))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result[f'{fmt}_{size * factor}_rows_per_second'] = round(size * factor / elapsed, 1)
+            result[f'{fmt}_{size * factor}_peak_mib'] = round(peak / 2**20, 2)
+    return result
+
+
+@benchmark('product_search')
+def product_search(size=20000, iterations=200, **options):
+    """Latencia de búsqueda (p50/p95 en ms) sobre un catálogo sintético grande"""
+    import random
+
+    from .search import get_search_backend, search_products
+
+    make_catalog(size)
+    _, build = timed(search_products, 'producto')
+    queries = ['producto', 'prod', 'calzado sintetico', 'sintetco', 'numero 42', 'producto 1999']
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(iterations):
+        query = rng.choice(queries)
+        filters = rng.choice([{}, {'category': 'deportivo'}, {'gender': 'mujer'}])
+        _, elapsed = timed(search_products, query, **filters)
+        latencies.append(elapsed * 1000)
+    latencies.sort()
+    return {
+        'backend': type(get_search_backend()).__name__,
+        'products': size,
+        'first_query_ms': round(build * 1000, 1),
+        'p50_ms': round(latencies[len(latencies) // 2], 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)], 2),
+    }
+
+
+@benchmark('login')
+def login(size=200, threads=8, iterations=25, **options):
+    """Tormenta de logins: logins/s, latencia p50/p95, consultas por intento y acierto vs fallo"""
+    from django.contrib.auth import authenticate
+    from django.contrib.auth.hashers import get_hasher, make_password
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIRequestFactory
+
+    from .models import User
+    from .views import LoginAPIView
+
+    password = 'benchmark-secret'
+    encoded = make_password(password)  # un solo hash: el coste está en el login, no en el setup
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@shop.com', password=encoded)
+        for i in range(size)
+    )
+    view = LoginAPIView.as_view()
+    factory = APIRequestFactory()
+
+    def attempt(email):
+        request = factory.post('/login/', {'email': email, 'password': password}, format='json')
+        return view(request).status_code
+
+    with CaptureQueriesContext(connection) as ctx:
+        authenticate(email='user0@shop.com', password=password)
+    auth_queries = len(ctx.captured_queries)
+    with CaptureQueriesContext(connection) as ctx:
+        attempt('user0@shop.com')
+    # incluye la serialización del usuario (grupos y permisos) en la respuesta
+    queries = len(ctx.captured_queries)
+    _, hit = timed(attempt, 'user1@shop.com')
+    _, miss = timed(attempt, 'nadie@shop.com')
+
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(offset):
+        barrier.wait()
+        try:
+            for i in range(iterations):
+                # 1 de cada 5 intentos es un email inexistente
+                email = 'nadie@shop.com' if i % 5 == 4 else f'user{(offset + i) % size}@shop.com'
+                _, elapsed = timed(attempt, email)
+                with lock:
+                    latencies.append(elapsed * 1000)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=worker, args=(n * iterations,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'attempts': len(latencies),
+        'logins_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2], 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)], 2),
+        'auth_queries': auth_queries,
+        'queries_per_login': queries,
+        'hit_ms': round(hit * 1000, 2),
+        'miss_ms': round(miss * 1000, 2),
+        'hash_iterations': get_hasher().iterations,
+    }
+
+
+@benchmark('login_abuse')
+def login_abuse(threads=8, iterations=50, **options):
+    """Carga abusiva contra /login/ desde pocas IPs: CPU consumida con y sin throttling"""
+    from django.contrib.auth.hashers import make_password
+    from django.test.utils import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from .models import User
+    from .throttling import throttling
+    from .views import LoginAPIView
+
+    User.objects.create(username='victima', email='victima@shop.com', password=make_password('correcta'))
+    view = LoginAPIView.as_view()
+    factory = APIRequestFactory()
+
+    def storm():
+        statuses = {}
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker(n):
+            barrier.wait()
+            try:
+                for _ in range(iterations):
+                    request = factory.post(
+                        '/login/',
+                        {'email': 'victima@shop.com', 'password': 'incorrecta'},
+                        format='json',
+                        REMOTE_ADDR=f'203.0.113.{n % 2}',  # 2 IPs atacantes
+                    )
+                    status_code = view(request).status_code
+                    with lock:
+                        statuses[status_code] = statuses.get(status_code, 0) + 1
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        cpu, start = time.process_time(), time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return statuses, time.process_time() - cpu, time.perf_counter() - start
+
+    result = {'attempts': threads * iterations}
+    for label, enabled in (('unthrottled', False), ('throttled', True)):
+        with override_settings(THROTTLING={**settings.THROTTLING, 'ENABLED': enabled}):
+            throttling.reset()
+            statuses, cpu, wall = storm()
+        result[f'{label}_rejected_429'] = statuses.get(429, 0)
+        result[f'{label}_password_checks'] = statuses.get(400, 0)
+        result[f'{label}_cpu_seconds'] = round(cpu, 2)
+        result[f'{label}_wall_seconds'] = round(wall, 2)
+    throttling.reset()
+    return result
+
+
+@benchmark('async_reads')
+def async_reads(size=200, threads=16, iterations=400, **options):
+    """
+    Throughput WSGI (pool de `threads` hilos) frente a ASGI (un event loop) con
+    `iterations` clientes lentos concurrentes pidiendo el stock de una variante.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.test import AsyncClient, Client
+    from django.test.utils import override_settings
+
+    variants = make_catalog(size)
+    client_delay = 0.2  # red lenta: el cliente tarda 200 ms en enviar la petición
+    clients = iterations
+
+    def wsgi_request(n):
+        # Bajo WSGI el hilo del worker espera al cliente lento
+        time.sleep(client_delay)
+        response = Client().get(f'/api/variants/{variants[n % size].pk}/stock/')
+        connection.close()
+        return response.status_code
+
+    def wsgi_storm():
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return list(pool.map(wsgi_request, range(clients)))
+
+    async def asgi_storm():
+        client = AsyncClient()
+
+        async def request(n):
+            # Bajo ASGI la espera es un await: el loop atiende a otros clientes
+            await asyncio.sleep(client_delay)
+            response = await client.get(f'/api/async/variants/{variants[n % size].pk}/stock/')
+            return response.status_code
+
+        return await asyncio.gather(*(request(n) for n in range(clients)))
+
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        wsgi_statuses, wsgi_seconds = timed(wsgi_storm)
+        asgi_statuses, asgi_seconds = timed(asyncio.run, asgi_storm())
+
+    return {
+        'concurrent_clients': clients,
+        'wsgi_threads': threads,
+        'client_delay_ms': client_delay * 1000,
+        'wsgi_ok': wsgi_statuses.count(200),
+        'wsgi_requests_per_second': round(clients / wsgi_seconds, 1),
+        'asgi_ok': list(asgi_statuses).count(200),
+        'asgi_requests_per_second': round(clients / asgi_seconds, 1),
+    }
+
+
+@benchmark('db_connections')
+def db_connections(size=500, iterations=300, **options):
+    """
+    Latencia p50/p99 de `GET /api/products/` abriendo una conexión por petición
+    frente a conexiones persistentes (o el pool, si `DB_POOL=1`).
+    Con SQLite en memoria Django nunca cierra la conexión: la diferencia
+    solo es visible contra PostgreSQL.
+    """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    make_catalog(size)
+    database = connections['default'].settings_dict
+    if database['OPTIONS'].get('pool'):
+        modes = [('pool', {})]
+    else:
+        modes = [('new_connection', {'CONN_MAX_AGE': 0}), ('persistent', {'CONN_MAX_AGE': None})]
+
+    setups = []
+
+    def count_setup(sender, connection, **kwargs):
+        setups.append(connection.alias)
+
+    connection_created.connect(count_setup)
+    client = Client()
+    result = {'vendor': connection.vendor}
+    original = {key: database[key] for key in ('CONN_MAX_AGE',)}
+    try:
+        # Sin caché del catálogo: cada petición llega a la base de datos
+        with override_settings(ALLOWED_HOSTS=['testserver'], CATALOG_CACHE={'ENABLED': False}):
+            for label, overrides in modes:
+                database.update(overrides)
+                connection.close()
+                setups.clear()
+                latencies = []
+                for _ in range(iterations):
+                    _, elapsed = timed(client.get, '/api/products/')
+                    latencies.append(elapsed * 1000)
+                latencies.sort()
+                result[f'{label}_p50_ms'] = round(latencies[len(latencies) // 2], 2)
+                result[f'{label}_p99_ms'] = round(latencies[int(len(latencies) * 0.99)], 2)
+                result[f'{label}_connection_setups'] = len(setups)
+    finally:
+        database.update(original)
+        connection_created.disconnect(count_setup)
+    return result
+
+
+@benchmark('push_fanout')
+def push_fanout(size=5000, iterations=50, **options):
+    """
+    Reparto del broker en memoria: `size` suscriptores en un event loop
+    (la mitad a todo, la otra mitad a un producto) y `iterations`
+    publicaciones desde otro hilo, como hace el hook post-commit.
+    Mide la latencia hasta que el último suscriptor interesado recibe el evento.
+    """
+    import asyncio
+
+    from .push import InMemoryBroker
+
+    broker = InMemoryBroker(queue_size=iterations + 1)
+    event = {'variant': 1, 'product': 1, 'category': 'deportivo', 'stock_quantity': 5, 'updated_at': None}
+    other = {**event, 'product': 2}
+
+    async def run():
+        subscriptions = [
+            broker.subscribe(['product:1'] if i % 2 else [])
+            for i in range(size)
+        ]
+        latencies = []
+        for i in range(iterations):
+            # Alterna eventos para todos y para la mitad que no filtra
+            payload = event if i % 2 else other
+            expected = size if i % 2 else size // 2 + size % 2
+            start = time.perf_counter()
+            await asyncio.to_thread(broker.publish, [payload])
+            received = 0
+            while received < expected:
+                await asyncio.sleep(0)
+                received = sum(1 for s in subscriptions if not s.queue.empty())
+            latencies.append((time.perf_counter() - start) * 1000)
+            for s in subscriptions:
+                while not s.queue.empty():
+                    s.queue.get_nowait()
+        for s in subscriptions:
+            broker.unsubscribe(s)
+        return latencies
+
+    latencies = sorted(asyncio.run(run()))
+    return {
+        'subscribers': size,
+        'publishes': iterations,
+        'p50_ms': round(latencies[len(latencies) // 2], 2),
+        'max_ms': round(latencies[-1], 2),
+        'p50_us_per_subscriber': round(latencies[len(latencies) // 2] * 1000 / size, 3),
+    }
+
+
+@benchmark('serializers')
+def serializers(size=None, iterations=3, **options):
+    """
+    Listados de producto, variante e inventario: serializers de DRF frente a
+    `core.fast_serializers`, incluida la consulta y el render a JSON.
+    Por defecto a 1k/10k/100k filas (`--size` mide un único tamaño).
+    Devuelve el mejor de `iterations` en ms y la aceleración.
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .fast_serializers import InventoryRows, ProductRows, VariantRows
+    from .serializers import InventorySerializer, ProductSerializer, VariantSerializer
+
+    sizes = [size] if size else [1000, 10000, 100000]
+    make_catalog(max(sizes))
+    renderer = JSONRenderer()
+    cases = {
+        'product': (Product.objects.order_by('id'), ProductSerializer, ProductRows),
+        'variant': (Variant.objects.select_related('product').order_by('id'), VariantSerializer, VariantRows),
+        'inventory': (
+            Inventory.objects.select_related('variant__product').order_by('id'),
+            InventorySerializer, InventoryRows,
+        ),
+    }
+
+    def best(func):
+        return min(timed(func)[1] for _ in range(iterations)) * 1000
+
+    result = {}
+    for rows in sizes:
+        for name, (queryset, serializer_class, rows_class) in cases.items():
+            page = queryset[:rows]
+            fast_rows = rows_class.shared()
+            drf_ms = best(lambda: renderer.render(serializer_class(page.all(), many=True).data))
+            fast_ms = best(lambda: renderer.render(fast_rows.rows(fast_rows.values(page.all()))))
+            result[f'{name}_{rows}_drf_ms'] = round(drf_ms, 1)
+            result[f'{name}_{rows}_fast_ms'] = round(fast_ms, 1)
+            result[f'{name}_{rows}_speedup'] = round(drf_ms / fast_ms, 1)
+    return result
+
+
+@benchmark('json_render')
+def json_render(size=10000, iterations=5, **options):
+    """
+    Render a JSON de `size` productos (filas de DRF, con `Decimal` y fechas)
+    con el `JSONRenderer` de DRF y con `FastJSONRenderer` en cada backend
+    instalado. Devuelve el mejor de `iterations` en ms y la aceleración.
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .renderers import BACKENDS, FastJSONRenderer
+    from .serializers import ProductSerializer
+
+    make_catalog(size)
+    data = ProductSerializer(Product.objects.order_by('id')[:size], many=True).data
+
+    def best(renderer):
+        return min(timed(renderer.render, data)[1] for _ in range(iterations)) * 1000
+
+    drf_ms = best(JSONRenderer())
+    result = {'rows': len(data), 'drf_ms': round(drf_ms, 1)}
+    for name in BACKENDS:
+        renderer = type(f'{name}Renderer', (FastJSONRenderer,), {'backend': name})()
+        try:
+            ms = best(renderer)
+        except ImportError:
+            continue
+        result[f'{name}_ms'] = round(ms, 1)
+        result[f'{name}_speedup'] = round(drf_ms / ms, 1)
+    return result
+
+
+@benchmark('bulk_writes')
+def bulk_writes(size=20000, single=1000, batch_size=None, **options):
+    """
+    Sincronización de stock: `single` PUT de `/api/variants/<id>/stock/` (un
+    objeto por petición) frente a `size` niveles en un `POST
+    /api/inventory/bulk/`. Devuelve elementos por segundo de cada camino.
+    """
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from .bulk import get_config
+    from .models import User
+    from .views import InventoryViewSet, VariantViewSet
+
+    variants = make_catalog(size)
+    staff = User.objects.create_user(username='bench', email='bench@shop.com', password='x', is_staff=True)
+    factory = APIRequestFactory()
+    stock_view = VariantViewSet.as_view({'put': 'stock'})
+    bulk_view = InventoryViewSet.as_view({'post': 'bulk'})
+
+    def put_one(variant, quantity):
+        request = factory.put(f'/api/variants/{variant.pk}/stock/', {'stock_quantity': quantity}, format='json')
+        force_authenticate(request, staff)
+        return stock_view(request, pk=variant.pk).status_code
+
+    def post_bulk(items):
+        request = factory.post('/api/inventory/bulk/', items, format='json')
+        force_authenticate(request, staff)
+        return bulk_view(request)
+
+    single = min(single, size)
+    _, single_seconds = timed(lambda: [put_one(variant, 7) for variant in variants[:single]])
+
+    if batch_size:
+        from django.test.utils import override_settings
+        override = override_settings(BULK_WRITES={**get_config(), 'BATCH_SIZE': batch_size})
+        override.enable()
+    try:
+        items = [{'sku': variant.sku, 'stock_quantity': i % 50} for i, variant in enumerate(variants)]
+        response, bulk_seconds = timed(post_bulk, items)
+    finally:
+        if batch_size:
+            override.disable()
+
+    single_rate = single / single_seconds
+    bulk_rate = size / bulk_seconds
+    return {
+        'single_items': single,
+        'single_items_per_second': round(single_rate, 1),
+        'bulk_items': size,
+        'bulk_status': response.status_code,
+        'bulk_updated': response.data['updated'],
+        'bulk_items_per_second': round(bulk_rate, 1),
+        'speedup': round(bulk_rate / single_rate, 1),
+    }
+
+
+@benchmark('promotions')
+def promotions(size=100000, iterations=5, **options):
+    """
+    Precios con promociones: `size` productos y 1000 promociones vigentes
+    (por producto, categoría, género y globales). Mide la recalculación
+    completa, la incremental al guardar una promoción y la navegación
+    filtrada por precio (con facetas), que lee la columna precalculada.
+    """
+    from django.db.models import Avg
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from . import pricing
+    from .models import Promotion
+    from .views import ProductViewSet
+
+    Product.objects.bulk_create(
+        Product(
+            name=f'Producto {i}',
+            category=Product.CategoryChoices.values[i % len(Product.CategoryChoices.values)],
+            gender=Product.GenderChoices.values[i % len(Product.GenderChoices.values)],
+            base_price=Decimal(50 + i % 200),
+            effective_price=Decimal(50 + i % 200),
+        )
+        for i in range(size)
+    )
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+    categories = Product.CategoryChoices.values
+    genders = Product.GenderChoices.values
+    promos = []
+    for i in range(1000):
+        percentage = i % 2 == 0
+        promo = Promotion(
+            name=f'Promo {i}',
+            discount_type=Promotion.DiscountType.PERCENTAGE if percentage else Promotion.DiscountType.FIXED,
+            value=Decimal(5 + i % 40) if percentage else Decimal(1 + i % 30),
+        )
+        if i % 100 == 0:
+            # Global: sin criterios
+            promo.value = min(promo.value, Decimal(10))
+        elif i % 10 == 0:
+            promo.category = categories[i % len(categories)]
+            promo.gender = genders[i % len(genders)] if i % 20 == 0 else ''
+        else:
+            promo.product_id = product_ids[(i * 97) % len(product_ids)]
+        promos.append(promo)
+    # bulk_create no dispara señales: la primera recalculación es la completa
+    Promotion.objects.bulk_create(promos)
+
+    full_changed, full_seconds = timed(pricing.rebuild)
+    _, noop_seconds = timed(pricing.rebuild)
+
+    product_promo = Promotion.objects.filter(product__isnull=False).first()
+    segment_promo = Promotion.objects.filter(product__isnull=True).exclude(category='').first()
+    incremental = {}
+    for label, promo in (('product', product_promo), ('segment', segment_promo)):
+        promo.value += 1
+        _, seconds = timed(promo.save)
+        incremental[label] = seconds
+
+    factory = APIRequestFactory()
+    view = ProductViewSet.as_view({'get': 'browse'})
+    url = '/api/products/browse/?price_min=80&price_max=120&category=deportivo'
+    durations = []
+    with override_settings(ALLOWED_HOSTS=['testserver'], CATALOG_CACHE={'ENABLED': False}):
+        view(factory.get(url))
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                response, seconds = timed(view, factory.get(url))
+            durations.append(seconds)
+
+    return {
+        'products': size,
+        'promotions': len(promos),
+        'full_rebuild_ms': round(full_seconds * 1000, 1),
+        'full_rebuild_changed': full_changed,
+        'full_rebuild_noop_ms': round(noop_seconds * 1000, 1),
+        'product_promotion_save_ms': round(incremental['product'] * 1000, 1),
+        'segment_promotion_save_ms': round(incremental['segment'] * 1000, 1),
+        'price_filtered_browse_ms': round(sum(durations) / len(durations) * 1000, 2),
+        'price_filtered_browse_queries': len(queries),
+        'list_status': response.status_code,
+        'avg_effective_price': round(Product.objects.aggregate(avg=Avg('effective_price'))['avg'], 2),
+    }
@@ -0,0 +1,178 @@
+"""
+Escrituras en lote (varios objetos por petición) de variantes e inventario.
+
+    POST /api/variants/bulk/    [{"product": 1, "size": "42", "color": "negro", "sku": "A-42"}, ...]
+    POST /api/inventory/bulk/   [{"sku": "A-42", "stock_quantity": 7}, {"variant": 9, "stock_quantity": 0}, ...]
+
+Ambos son upserts: la variante se identifica por `sku` y el inventario por
+su variante (`sku` o `variant`). En lugar de una petición (y varias
+consultas) por objeto:
+- se validan todos los elementos en una pasada, con una sola instancia del
+  serializer hijo (`BulkListSerializer.validate_items`),
+- las comprobaciones contra la base de datos (productos existentes, SKU ->
+  variante) se resuelven con una consulta por lote, no por elemento,
+- se guarda con un upsert por lote (`bulk_create(update_conflicts=True)`,
+  desde `ListSerializer.update`); los elementos sin cambios no se escriben.
+
+Los elementos se procesan en lotes de `BATCH_SIZE` y cada lote es atómico:
+si alguno de sus elementos es inválido o la escritura falla, no se guarda
+ninguno del lote y el resto de lotes sigue adelante. La respuesta trae los
+totales y el resultado de cada elemento (`index` en la lista enviada):
+
+    created / updated / unchanged   guardado (o sin cambios que guardar)
+    invalid                         no pasa la validación (`errors`)
+    rejected                        válido, pero su lote tenía errores
+    failed                          error al escribir el lote (`errors`)
+
+Código HTTP: 200 si todo se aplicó, 207 si una parte y 400 si nada.
+
+Como en la importación, los métodos bulk no disparan señales: la caché del
+catálogo, los cruces de stock bajo y el canal push se actualizan
+explícitamente.
+
+Configuración:
+    {
+        'BATCH_SIZE': 1000,
+        'MAX_ITEMS': 50000,
+    }
+"""
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+
+DEFAULT_SETTINGS = {
+    'BATCH_SIZE': 1000,
+    'MAX_ITEMS': 50000,
+}
+
+WRITTEN = ('created', 'updated', 'unchanged')
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'BULK_WRITES', {})}
+
+
+@dataclass
+class BulkResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    results: list = field(default_factory=list)
+
+    def add(self, index, outcome, **extra):
+        if outcome in WRITTEN:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        else:
+            self.failed += 1
+        self.results.append({'index': index, 'status': outcome, **extra})
+
+    @property
+    def status_code(self):
+        if not self.failed:
+            return status.HTTP_200_OK
+        if self.failed == len(self.results):
+            return status.HTTP_400_BAD_REQUEST
+        return status.HTTP_207_MULTI_STATUS
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'failed': self.failed,
+            'results': self.results,
+        }
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    `many=True` de los serializers de escritura en lote.
+
+    Las subclases implementan `validate_batch(items)` (comprobaciones de
+    todo el lote contra la base de datos), `get_instances(values)` (los
+    objetos existentes, en una consulta) y `update(instances, values)`, que
+    devuelve `[(estado, datos_del_resultado)]` en el orden de `values`.
+    """
+
+    def validate_items(self, data):
+        """`[(valor, errores)]` de cada elemento; uno de los dos es `None`"""
+        items = []
+        for item in data:
+            try:
+                items.append((self.child.run_validation(item), None))
+            except serializers.ValidationError as exc:
+                items.append((None, exc.detail))
+        self.validate_batch(items)
+        return items
+
+    def validate_batch(self, items):
+        pass
+
+    def get_instances(self, values):
+        raise NotImplementedError
+
+    def save_batch(self, values):
+        return self.update(self.get_instances(values), values)
+
+    def create(self, validated_data):
+        return self.save_batch(validated_data)
+
+
+def chunks(values, size=None):
+    """
+    Trozos de `values` de `BATCH_SIZE` elementos como mucho: las búsquedas
+    `__in` de la validación no deben crecer con la petición (hasta
+    `MAX_ITEMS`) ni pasar el límite de parámetros del motor.
+    """
+    values = list(values)
+    size = size or get_config()['BATCH_SIZE']
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def invalidate(items, index, errors):
+    """Marca el elemento `index` de `items` como inválido"""
+    items[index] = (None, errors)
+
+
+def run_bulk(serializer, batch_size=None):
+    """
+    Valida y guarda `serializer.initial_data` (un serializer con
+    `many=True` cuyo `list_serializer_class` es un `BulkListSerializer`).
+    Devuelve un `BulkResult`; lanza `ValidationError` si el cuerpo no es
+    una lista o supera `MAX_ITEMS`.
+    """
+    config = get_config()
+    batch_size = batch_size or config['BATCH_SIZE']
+    data = serializer.initial_data
+    if not isinstance(data, list):
+        raise serializers.ValidationError({'non_field_errors': ["Se esperaba una lista de elementos."]})
+    if len(data) > config['MAX_ITEMS']:
+        raise serializers.ValidationError(
+            {'non_field_errors': [f"Como máximo {config['MAX_ITEMS']} elementos por petición."]}
+        )
+
+    items = serializer.validate_items(data)
+    result = BulkResult()
+    for start in range(0, len(items), batch_size):
+        batch = list(enumerate(items[start:start + batch_size], start))
+        if any(errors for _, (_, errors) in batch):
+            for index, (_, errors) in batch:
+                if errors:
+                    result.add(index, 'invalid', errors=errors)
+                else:
+                    result.add(index, 'rejected')
+            continue
+        try:
+            with transaction.atomic():
+                outcomes = serializer.save_batch([value for _, (value, _) in batch])
+        except IntegrityError as exc:
+            for index, _ in batch:
+                result.add(index, 'failed', errors={'non_field_errors': [str(exc)]})
+            continue
+        for (index, _), (outcome, extra) in zip(batch, outcomes):
+            result.add(index, outcome, **extra)
+    return result
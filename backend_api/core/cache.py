@@ -0,0 +1,244 @@
+"""
+Caché de lectura (read-through) para los endpoints del catálogo.
+
+Las respuestas GET de los viewsets del catálogo se guardan bajo una clave que
+incluye la *versión* de cada modelo del que dependen. Cuando un `Product`,
+`Variant` o `Inventory` cambia, las señales de `core.signals` incrementan la
+versión de ese modelo y todas las entradas que dependían de él dejan de ser
+alcanzables (expiran solas por LRU/TTL). No hace falta buscar ni borrar
+claves concretas.
+
+Backends:
+- `LRUBackend`: en memoria del proceso, acotado por número de entradas.
+- `DjangoCacheBackend`: delega en un alias de `CACHES` (Redis, Memcached...)
+  para compartir la caché y las versiones entre workers.
+
+Configuración (`settings.CATALOG_CACHE`):
+    {
+        'BACKEND': 'core.cache.LRUBackend',
+        'OPTIONS': {'max_entries': 2048},
+        'TIMEOUT': 300,
+        'REPLICA_TIMEOUT': 5,   # respuestas leídas de una réplica (ver core/routers.py)
+        'ENABLED': True,
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+from . import metrics
+from .routers import reading_from_replica
+
+MISS = object()
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'core.cache.LRUBackend',
+    'OPTIONS': {},
+    'TIMEOUT': 300,
+    'REPLICA_TIMEOUT': 5,
+    'ENABLED': True,
+}
+
+
+class LRUBackend:
+    """Caché LRU en memoria del proceso, segura entre hilos"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key, MISS)
+            if item is MISS:
+                return MISS
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_versions(self, names):
+        with self._lock:
+            return [self._versions.get(name, 1) for name in names]
+
+    def incr_version(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 1) + 1
+            return self._versions[name]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Backend compartido sobre un alias de `settings.CACHES`.
+    Las versiones también viven en la caché compartida, de modo que una
+    escritura en un worker invalida la caché de todos los demás.
+    """
+    version_prefix = 'catalog:version:'
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key, MISS)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(key, value, timeout)
+
+    def get_versions(self, names):
+        keys = [self.version_prefix + name for name in names]
+        found = self.cache.get_many(keys)
+        return [found.get(key, 1) for key in keys]
+
+    def incr_version(self, name):
+        key = self.version_prefix + name
+        # add() es atómico: solo inicializa si la clave no existe
+        self.cache.add(key, 1, None)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # La clave expiró/fue desalojada entre add() e incr()
+            self.cache.set(key, 2, None)
+            return 2
+
+    def clear(self):
+        self.cache.clear()
+
+
+class CatalogCache:
+    """Fachada de la caché del catálogo con contadores de aciertos/fallos"""
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def config(self):
+        return {**DEFAULT_SETTINGS, **getattr(settings, 'CATALOG_CACHE', {})}
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            config = self.config
+            backend_class = import_string(config['BACKEND'])
+            self._backend = backend_class(**config['OPTIONS'])
+        return self._backend
+
+    def reset(self):
+        """Descarta el backend (p. ej. tras cambiar la configuración) y los contadores"""
+        with self._lock:
+            self._backend = None
+            self.hits = 0
+            self.misses = 0
+
+    def make_key(self, prefix, models, request):
+        versions = self.backend.get_versions(models)
+        version_part = '.'.join(f'{m}{v}' for m, v in zip(models, versions))
+        query = urlencode(sorted(request.query_params.items()))
+        scope = 'staff' if getattr(request.user, 'is_staff', False) else 'public'
+        return f'catalog:{prefix}:{version_part}:{scope}:{request.path}?{query}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is MISS:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.inc('catalog_cache_requests_total', (('result', 'miss' if value is MISS else 'hit'),))
+        return value
+
+    def set(self, key, value):
+        config = self.config
+        # Una réplica atrasada no debe fijar datos viejos durante todo el TTL
+        timeout = config['REPLICA_TIMEOUT'] if reading_from_replica() else config['TIMEOUT']
+        self.backend.set(key, value, timeout)
+
+    def bump(self, model_name):
+        """Invalida todas las entradas que dependen de `model_name`"""
+        return self.backend.incr_version(model_name)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+def cache_response(handler):
+    """
+    Decorador para métodos de un viewset con `cache_models` definido.
+    Sirve desde la caché las respuestas GET 200 y guarda las nuevas.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET' or not catalog_cache.enabled:
+            return handler(self, request, *args, **kwargs)
+
+        prefix = f'{self.basename}.{self.action}'
+        key = catalog_cache.make_key(prefix, self.cache_models, request)
+        data = catalog_cache.get(key)
+        if data is not MISS:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            catalog_cache.set(key, response.data)
+            response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+class CachedCatalogMixin:
+    """
+    Mixin para viewsets del catálogo: cachea `list` y `retrieve`.
+    Las acciones extra de lectura se decoran con `@cache_response`.
+    """
+    cache_models = ('product', 'variant', 'inventory')
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
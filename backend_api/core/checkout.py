@@ -0,0 +1,89 @@
+"""
+Pipeline de checkout del carrito.
+
+El número de consultas es constante sin importar cuántas líneas tenga el
+carrito. Todo ocurre en una transacción:
+1. Se bloquea la fila del carrito (`lock_cart`, como las escrituras de
+   líneas) y se leen sus líneas: el pedido corresponde exactamente al stock
+   descontado aunque el carrito se edite a la vez.
+2. Se bloquean las filas de Inventory de esas variantes, ordenadas por
+   `variant_id`, y se validan contra el stock (una consulta). El orden fijo
+   evita deadlocks entre dos checkouts que comparten variantes.
+3. Se descuenta el stock con un único UPDATE condicionado (`core.stock`).
+4. Se crea el pedido y sus líneas con `bulk_create`.
+5. Se vacía el carrito con un único DELETE.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Cart, CartItem, Inventory, Order, OrderLine
+from .stock import InsufficientStock, decrement_many
+
+
+class EmptyCart(Exception):
+    """El carrito no tiene líneas"""
+
+
+def lock_cart(cart):
+    """Bloquea la fila del carrito hasta el fin de la transacción en curso"""
+    list(Cart.objects.select_for_update().filter(pk=cart.pk).values_list('pk', flat=True))
+
+
+def checkout(cart):
+    """
+    Convierte el carrito en un pedido de forma atómica.
+    Lanza `EmptyCart` o `InsufficientStock`; en ese caso nada cambia.
+    """
+    with transaction.atomic():
+        lock_cart(cart)
+        quantities = dict(
+            CartItem.objects.filter(cart=cart)
+            .order_by('variant_id')
+            .values_list('variant_id', 'quantity')
+        )
+        if not quantities:
+            raise EmptyCart("El carrito está vacío")
+
+        locked = list(
+            Inventory.objects.select_for_update(of=('self',))
+            .select_related('variant__product')
+            .filter(variant_id__in=quantities)
+            .order_by('variant_id')
+        )
+        by_variant = {inventory.variant_id: inventory for inventory in locked}
+        shortages = [
+            {
+                'variant': variant_id,
+                'requested': quantity,
+                'available': by_variant[variant_id].stock_quantity if variant_id in by_variant else 0,
+            }
+            for variant_id, quantity in quantities.items()
+            if variant_id not in by_variant or by_variant[variant_id].stock_quantity < quantity
+        ]
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        decrement_many(quantities.items())
+
+        lines = []
+        total = Decimal('0.00')
+        for inventory in locked:
+            variant = inventory.variant
+            quantity = quantities[variant.pk]
+            unit_price = variant.product.current_price
+            total += unit_price * quantity
+            lines.append(OrderLine(
+                variant=variant,
+                sku=variant.sku,
+                product_name=variant.product.name,
+                quantity=quantity,
+                unit_price=unit_price,
+            ))
+
+        order = Order.objects.create(user_id=cart.user_id, total=total)
+        for line in lines:
+            line.order = order
+        OrderLine.objects.bulk_create(lines)
+        CartItem.objects.filter(cart=cart).delete()
+    return order
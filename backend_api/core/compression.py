@@ -0,0 +1,237 @@
+"""
+Compresión de respuestas negociada con `Accept-Encoding` (zstd, brotli, gzip).
+
+`CompressionMiddleware` comprime las respuestas de datos de la API (JSON,
+NDJSON/JSONL, CSV) con la mejor codificación que acepte el cliente, en el
+orden de preferencia de `ENCODINGS` (la `q` del cliente manda; a igual `q`,
+el orden del servidor). El JSON de los listados, muy repetitivo, se reduce
+varias veces.
+
+- Por debajo de `MIN_SIZE` bytes no se comprime: la cabecera y el coste de
+  CPU no compensan. Tampoco si el resultado no es más pequeño.
+- Las respuestas en streaming (exportación del catálogo) se comprimen por
+  trozos y pierden `Content-Length`. Los Server-Sent Events no se tocan: el
+  compresor retendría los eventos hasta llenar su búfer.
+- `Vary: Accept-Encoding` siempre, para que las cachés intermedias guarden
+  una copia por codificación, y los ETag fuertes pasan a débiles (como en
+  `GZipMiddleware`).
+
+`gzip` usa la biblioteca estándar. `br` requiere el paquete `brotli` y `zstd`
+el paquete `zstandard`; si no están instalados esas codificaciones
+simplemente no se ofrecen.
+
+El HTML (admin, browsable API) no se comprime nunca: lleva secretos ligados
+a la sesión (token CSRF) junto a texto controlado por el cliente, y
+comprimirlo sin el relleno aleatorio de `GZipMiddleware` lo expondría a
+BREACH. Las respuestas de datos no llevan esos secretos.
+
+Configuración:
+    {
+        'ENABLED': True,
+        'MIN_SIZE': 1024,
+        'ENCODINGS': ['zstd', 'br', 'gzip'],
+        'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+    }
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'ENCODINGS': ['zstd', 'br', 'gzip'],
+    'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+}
+
+# Solo tipos de datos de la API; nunca text/html (ver BREACH arriba)
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/jsonl',
+    'text/csv',
+)
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'COMPRESSION', {})}
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        # wbits 16 + MAX_WBITS: cabecera y cola gzip
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def __init__(self, level):
+        import brotli
+
+        self.brotli = brotli
+        self.level = level
+
+    def compressor(self):
+        return BrotliStream(self.brotli.Compressor(quality=self.level))
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.level)
+
+
+class BrotliStream:
+    """Adapta `brotli.Compressor` a la interfaz `compress()`/`flush()` de zlib"""
+
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self, level):
+        import zstandard
+
+        self._zstd = zstandard.ZstdCompressor(level=level)
+
+    def compressor(self):
+        return self._zstd.compressobj()
+
+    def compress(self, data):
+        return self._zstd.compress(data)
+
+
+CODECS = {
+    'zstd': ZstdCodec,
+    'br': BrotliCodec,
+    'gzip': GzipCodec,
+}
+
+_codecs = {}
+
+
+def get_codec(name, level):
+    """Codec por nombre, o `None` si su paquete no está instalado"""
+    key = (name, level)
+    if key not in _codecs:
+        try:
+            _codecs[key] = CODECS[name](level)
+        except ImportError:
+            _codecs[key] = None
+    return _codecs[key]
+
+
+def parse_accept_encoding(header):
+    """'gzip, br;q=0.8, *;q=0' -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}"""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, config=None):
+    """Codec a usar para `Accept-Encoding: header`, o `None` (sin comprimir)"""
+    config = config or get_config()
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for name in config['ENCODINGS']:
+        q = accepted.get(name, wildcard)
+        if q <= best_q:
+            continue
+        codec = get_codec(name, config['LEVELS'].get(name))
+        if codec is not None:
+            best, best_q = codec, q
+    return best
+
+
+def is_compressible(content_type):
+    # text/event-stream no está: los eventos se necesitan en cuanto se producen
+    return content_type.split(';')[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def compress_chunks(codec, chunks):
+    compressor = codec.compressor()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def acompress_chunks(codec, chunks):
+    compressor = codec.compressor()
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        config = get_config()
+        if not config['ENABLED'] or response.has_header('Content-Encoding'):
+            return response
+        if not is_compressible(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and len(response.content) < config['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), config)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_chunks(codec, response.streaming_content)
+            else:
+                response.streaming_content = compress_chunks(codec, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            original = len(response.content)
+            compressed = codec.compress(response.content)
+            if len(compressed) >= original:
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+            metrics.inc('compression_saved_bytes_total', (('encoding', codec.name),), original - len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codec.name
+        metrics.inc('compressed_responses_total', (('encoding', codec.name),))
+        return response
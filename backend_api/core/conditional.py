@@ -0,0 +1,135 @@
+"""
+GET condicional (ETag / Last-Modified) para los endpoints del catálogo.
+
+Los validadores se calculan con una sola consulta agregada sobre el queryset
+de la acción (`COUNT` + `MAX(updated_at)` del modelo y de las relaciones que
+aparecen en la respuesta), nunca serializando. Si el cliente envía
+`If-None-Match`/`If-Modified-Since` y coinciden, se responde 304 antes de
+tocar el serializer.
+
+Los validadores también se guardan en la caché versionada del catálogo, así
+que un 304 repetido no cuesta consultas mientras no cambien los datos.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import MISS, catalog_cache
+
+
+def _relation_prefix(lookup):
+    """'variants__inventory__updated_at' -> 'variants__inventory'"""
+    return lookup.rpartition('__')[0]
+
+
+def compute_validators(queryset, fields):
+    """
+    Devuelve `(count, [max_timestamp, ...])` para `queryset`.
+    Por cada relación recorrida se cuentan también sus filas, para que un
+    borrado en la relación cambie el validador.
+    """
+    aggregates = {'count': Count('pk', distinct=True)}
+    for index, lookup in enumerate(fields):
+        aggregates[f'max_{index}'] = Max(lookup)
+        prefix = _relation_prefix(lookup)
+        if prefix:
+            aggregates[f'count_{index}'] = Count(prefix, distinct=True)
+    result = queryset.aggregate(**aggregates)
+    counts = [result['count']] + [
+        result[f'count_{i}'] for i in range(len(fields)) if f'count_{i}' in result
+    ]
+    timestamps = [result[f'max_{i}'] for i in range(len(fields))]
+    return counts, timestamps
+
+
+def conditional_response(handler):
+    """
+    Decorador para métodos de lectura de un viewset con `ConditionalCatalogMixin`.
+    Responde 304 sin ejecutar `handler` cuando los validadores coinciden.
+    """
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(self, request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
+
+
+class ConditionalCatalogMixin:
+    """
+    Añade ETag/Last-Modified a `list` y `retrieve`.
+
+    `validator_fields` indica, por acción, qué timestamps influyen en la
+    respuesta (la clave `'default'` aplica al resto de acciones).
+    """
+    validator_fields = {'default': ('updated_at',)}
+
+    def get_validator_fields(self):
+        return self.validator_fields.get(self.action, self.validator_fields['default'])
+
+    def get_validator_queryset(self):
+        """Queryset de la acción actual, sin paginar"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, ValidationError):
+                # Como `generics.get_object_or_404`: un pk mal formado es un 404
+                raise Http404
+        return queryset
+
+    def get_validators(self, request):
+        """Devuelve `(etag, last_modified)`; `last_modified` en segundos epoch"""
+        key = None
+        if catalog_cache.enabled:
+            key = catalog_cache.make_key(
+                f'{self.basename}.{self.action}.validators', self.cache_models, request
+            )
+            cached = catalog_cache.get(key)
+            if cached is not MISS:
+                return cached
+
+        counts, timestamps = compute_validators(
+            self.get_validator_queryset(), self.get_validator_fields()
+        )
+        present = [ts for ts in timestamps if ts is not None]
+        last_modified = int(max(present).timestamp()) if present else None
+
+        renderer = getattr(request, 'accepted_renderer', None)
+        fingerprint = '|'.join([
+            request.get_full_path(),
+            getattr(renderer, 'format', ''),
+            ','.join(str(count) for count in counts),
+            ','.join(ts.isoformat() if ts else '-' for ts in timestamps),
+        ])
+        etag = 'W/' + quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+        validators = (etag, last_modified)
+        if key is not None:
+            catalog_cache.set(key, validators)
+        return validators
+
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,195 @@
+"""
+Navegación facetada del catálogo.
+
+Todas las facetas (categoría, género, rango de precio, talla y color) se
+cuentan en UNA sola consulta: un `UNION ALL` de `GROUP BY`, uno por faceta.
+Los conteos son "disyuntivos": cada faceta aplica todos los filtros activos
+menos el suyo, para que el usuario vea cuántos resultados tendría al cambiar
+esa selección.
+
+- Facetas de producto (`category`, `gender`, `price`): cuentan productos.
+- Facetas de variante (`size`, `color`): cuentan productos distintos que
+  tienen al menos una variante con ese valor.
+
+El precio de los filtros y de la faceta es el precio con promociones
+(`effective_price`, precalculado e indexado; ver core/pricing.py).
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Case, CharField, Count, Exists, F, OuterRef, Q, Value, When
+from rest_framework import serializers
+
+from .models import Product, Variant
+
+# (mínimo incluido, máximo excluido); None = sin límite
+PRICE_BUCKETS = (
+    (None, Decimal('50')),
+    (Decimal('50'), Decimal('100')),
+    (Decimal('100'), Decimal('200')),
+    (Decimal('200'), None),
+)
+
+PRODUCT_FACETS = ('category', 'gender', 'price')
+VARIANT_FACETS = ('size', 'color')
+FACETS = PRODUCT_FACETS + VARIANT_FACETS
+
+LABELS = {
+    'category': dict(Product.CategoryChoices.choices),
+    'gender': dict(Product.GenderChoices.choices),
+}
+
+
+def bucket_label(low, high):
+    if low is None:
+        return f'0-{high}'
+    if high is None:
+        return f'{low}+'
+    return f'{low}-{high}'
+
+
+def bucket_condition(low, high, field='effective_price'):
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def price_bucket_expression(field='effective_price'):
+    return Case(
+        *[
+            When(bucket_condition(low, high, field), then=Value(bucket_label(low, high)))
+            for low, high in PRICE_BUCKETS
+        ],
+        output_field=CharField(),
+    )
+
+
+class FacetFilters:
+    """
+    Filtros activos leídos de la query string.
+    Cada faceta admite varios valores: `?size=40&size=41` o `?size=40,41`.
+    `price` admite etiquetas de rango (`50-100`); además `price_min`/`price_max`.
+    Un rango desconocido o un precio mal formado lanza `ValidationError` (400).
+    """
+
+    def __init__(self, query_params):
+        self.values = {}
+        for facet in FACETS:
+            selected = []
+            for raw in query_params.getlist(facet):
+                selected.extend(value for value in raw.split(',') if value)
+            if selected:
+                self.values[facet] = selected
+        errors = {}
+        labels = [bucket_label(low, high) for low, high in PRICE_BUCKETS]
+        unknown = [label for label in self.values.get('price', ()) if label not in labels]
+        if unknown:
+            errors['price'] = [f"Rango desconocido: {', '.join(unknown)}. Válidos: {', '.join(labels)}"]
+        self.price_min = self._decimal(query_params.get('price_min'), 'price_min', errors)
+        self.price_max = self._decimal(query_params.get('price_max'), 'price_max', errors)
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    @staticmethod
+    def _decimal(raw, name, errors):
+        if raw in (None, ''):
+            return None
+        try:
+            value = Decimal(raw)
+        except InvalidOperation:
+            value = None
+        if value is None or not value.is_finite():
+            errors[name] = ["Debe ser un número."]
+            return None
+        return value
+
+    def product_q(self, exclude=None, prefix=''):
+        """Condición sobre campos de Product, omitiendo la faceta `exclude`"""
+        q = Q()
+        for facet in ('category', 'gender'):
+            if facet != exclude and facet in self.values:
+                q &= Q(**{f'{prefix}{facet}__in': self.values[facet]})
+        if exclude != 'price':
+            field = f'{prefix}effective_price'
+            if 'price' in self.values:
+                buckets = Q()
+                for low, high in PRICE_BUCKETS:
+                    if bucket_label(low, high) in self.values['price']:
+                        buckets |= bucket_condition(low, high, field)
+                q &= buckets
+            if self.price_min is not None:
+                q &= Q(**{f'{field}__gte': self.price_min})
+            if self.price_max is not None:
+                q &= Q(**{f'{field}__lte': self.price_max})
+        return q
+
+    def variant_q(self, exclude=None, prefix=''):
+        """Condición sobre campos de Variant, omitiendo la faceta `exclude`"""
+        q = Q()
+        for facet in VARIANT_FACETS:
+            if facet != exclude and facet in self.values:
+                q &= Q(**{f'{prefix}{facet}__in': self.values[facet]})
+        return q
+
+    def has_variant_filters(self, exclude=None):
+        return any(facet in self.values for facet in VARIANT_FACETS if facet != exclude)
+
+
+def filter_products(queryset, filters, exclude=None):
+    """Aplica los filtros a un queryset de Product (sin duplicar filas)"""
+    queryset = queryset.filter(filters.product_q(exclude))
+    if filters.has_variant_filters(exclude):
+        matching = Variant.objects.filter(filters.variant_q(exclude), product=OuterRef('pk'))
+        queryset = queryset.filter(Exists(matching))
+    return queryset
+
+
+def _product_facet(filters, facet):
+    value = price_bucket_expression() if facet == 'price' else F(facet)
+    return (
+        filter_products(Product.objects.all(), filters, exclude=facet)
+        .order_by()
+        .values(facet_name=Value(facet, output_field=CharField()), value=value)
+        .annotate(count=Count('pk'))
+    )
+
+
+def _variant_facet(filters, facet):
+    queryset = Variant.objects.filter(
+        filters.product_q(prefix='product__'),
+        filters.variant_q(exclude=facet),
+    )
+    return (
+        queryset.order_by()
+        .values(facet_name=Value(facet, output_field=CharField()), value=F(facet))
+        .annotate(count=Count('product_id', distinct=True))
+    )
+
+
+def facet_counts(filters):
+    """
+    Devuelve `{faceta: [{'value', 'label', 'count'}, ...]}` con una sola consulta.
+    """
+    branches = [_product_facet(filters, facet) for facet in PRODUCT_FACETS]
+    branches += [_variant_facet(filters, facet) for facet in VARIANT_FACETS]
+    rows = branches[0].union(*branches[1:], all=True)
+
+    facets = {facet: [] for facet in FACETS}
+    for row in rows:
+        facet = row['facet_name']
+        labels = LABELS.get(facet, {})
+        facets[facet].append({
+            'value': row['value'],
+            'label': labels.get(row['value'], row['value']),
+            'count': row['count'],
+        })
+
+    bucket_order = [bucket_label(low, high) for low, high in PRICE_BUCKETS]
+    for facet, items in facets.items():
+        if facet == 'price':
+            items.sort(key=lambda item: bucket_order.index(item['value']))
+        else:
+            items.sort(key=lambda item: (-item['count'], str(item['value'])))
+    return facets
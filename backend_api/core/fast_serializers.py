@@ -0,0 +1,179 @@
+"""
+Serialización rápida de listados de solo lectura del catálogo.
+
+`ProductSerializer`, `VariantSerializer` e `InventorySerializer` resuelven
+cada fila campo a campo: un `to_representation` por campo, `source`
+con puntos (`get_category_display`, `product.name`, `variant.__str__`) y
+una instancia de modelo por fila. Para los listados, `FastRows` construye
+las mismas filas a partir de `values()`:
+- solo se piden las columnas que salen en la respuesta (con JOIN en lugar
+  de acceder a relaciones),
+- las etiquetas de `category`/`gender` salen de mapas precalculados de
+  `Product.CategoryChoices`/`GenderChoices`,
+- decimales y fechas se convierten con las mismas instancias de campo de
+  DRF que usa el serializer (formato idéntico), una vez por valor,
+- cada fila contiene solo tipos nativos de JSON: el `JSONRenderer` la
+  escribe con el codificador en C sin llamar a `default()`.
+
+La salida es idéntica byte a byte a la del serializer (mismas claves, mismo
+orden, mismos formatos); lo comprueban los tests. Si el serializer cambia,
+hay que cambiar también su `FastRows`.
+
+`FastListMixin` lo aplica a `list` de los viewsets (y a las acciones que
+llamen a `fast_list_response`). Se desactiva con
+`FAST_SERIALIZERS = {'ENABLED': False}`. Las peticiones con campos a la carta
+(`?fields=`/`?omit=`, ver `core/fieldsets.py`) usan el serializer.
+"""
+from django.conf import settings
+from rest_framework.response import Response
+
+from .fieldsets import requested_fieldset
+from .instrumentation import SerializerTimingMixin, timing_serialization
+from .models import Product
+from .serializers import InventorySerializer, ProductSerializer, VariantSerializer
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+}
+
+CATEGORY_LABELS = {value: str(label) for value, label in Product.CategoryChoices.choices}
+GENDER_LABELS = {value: str(label) for value, label in Product.GenderChoices.choices}
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'FAST_SERIALIZERS', {})}
+
+
+class FastRows:
+    """
+    Base: `lookups` son las columnas de `values()`; `build(row)` devuelve el
+    dict de salida. `field(name)` da el campo DRF del serializer original,
+    para reutilizar su formato.
+    """
+    serializer_class = None
+    lookups = ()
+
+    def __init__(self):
+        self._fields = self.serializer_class().fields
+
+    @classmethod
+    def shared(cls):
+        """Instancia reutilizable (los campos del serializer se enlazan una vez)"""
+        instance = cls.__dict__.get('_shared')
+        if instance is None:
+            instance = cls._shared = cls()
+        return instance
+
+    def field(self, name):
+        return self._fields[name].to_representation
+
+    def values(self, queryset):
+        # El prefetch de instancias no aplica a values()
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+    def build(self, row):
+        raise NotImplementedError
+
+    def rows(self, values):
+        build = self.build
+        return [build(row) for row in values]
+
+
+class ProductRows(FastRows):
+    serializer_class = ProductSerializer
+    lookups = ('id', 'name', 'description', 'category', 'gender', 'base_price', 'effective_price', 'created_at')
+
+    def __init__(self):
+        super().__init__()
+        self.decimal = self.field('base_price')
+        self.datetime = self.field('created_at')
+
+    def build(self, row):
+        category = row['category']
+        gender = row['gender']
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'category': category,
+            'category_display': CATEGORY_LABELS.get(category, category),
+            'gender': gender,
+            'gender_display': GENDER_LABELS.get(gender, gender),
+            'base_price': self.decimal(row['base_price']),
+            # `current_price` es un ReadOnlyField (Decimal): el encoder de DRF lo emite como float
+            'current_price': float(row['effective_price']),
+            'created_at': self.datetime(row['created_at']),
+        }
+
+
+class VariantRows(FastRows):
+    serializer_class = VariantSerializer
+    lookups = ('id', 'product__name', 'size', 'color', 'sku')
+
+    def build(self, row):
+        return {
+            'id': row['id'],
+            'product_name': row['product__name'],
+            'size': row['size'],
+            'color': row['color'],
+            'sku': row['sku'],
+        }
+
+
+class InventoryRows(FastRows):
+    serializer_class = InventorySerializer
+    lookups = (
+        'id', 'variant_id', 'variant__product__name', 'variant__size', 'variant__color',
+        'stock_quantity', 'updated_at',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.datetime = self.field('updated_at')
+
+    def build(self, row):
+        return {
+            'id': row['id'],
+            'variant': row['variant_id'],
+            # Variant.__str__ sin cargar la variante ni su producto
+            'variant_info': f"{row['variant__product__name']} - {row['variant__size']}/{row['variant__color']}",
+            'stock_quantity': row['stock_quantity'],
+            'updated_at': self.datetime(row['updated_at']),
+        }
+
+
+class FastListMixin(SerializerTimingMixin):
+    """
+    Para viewsets: `list` usa `fast_rows_class` si el serializer de la acción
+    es el que esa clase reproduce. Va antes del viewset de DRF en las bases
+    (después de los mixins de caché/ETag, que siguen envolviendo la respuesta).
+    La construcción de filas y los serializers del viewset cuentan como
+    tiempo de serialización en la instrumentación.
+    """
+    fast_rows_class = None
+
+    def use_fast_rows(self):
+        return (
+            self.fast_rows_class is not None
+            and get_config()['ENABLED']
+            and self.get_serializer_class() is self.fast_rows_class.serializer_class
+            # `?fields=`/`?omit=` van por el serializer (con `only()`)
+            and requested_fieldset(self.request) is None
+        )
+
+    def fast_list_response(self, queryset):
+        fast_rows = self.fast_rows_class.shared()
+        values = fast_rows.values(queryset)
+        page = self.paginate_queryset(values)
+        if page is not None:
+            with timing_serialization():
+                rows = fast_rows.rows(page)
+            return self.get_paginated_response(rows)
+        with timing_serialization():
+            rows = fast_rows.rows(values)
+        return Response(rows)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_rows():
+            return super().list(request, *args, **kwargs)
+        return self.fast_list_response(self.filter_queryset(self.get_queryset()))
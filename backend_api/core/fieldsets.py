@@ -0,0 +1,213 @@
+"""
+Campos a la carta (sparse fieldsets): `?fields=` y `?omit=`.
+
+    GET /api/products/?fields=id,name,current_price
+    GET /api/products/?omit=description,category_display,gender_display
+    GET /api/products/catalog/?fields=id,name,variants.sku,variants.inventory.stock_quantity
+
+- `fields` deja solo los campos indicados; `omit` quita los indicados (si
+  vienen los dos, se aplica `fields` y después `omit`).
+- Los campos anidados se indican con punto (`variants.sku`). Un campo
+  anidado sin subcampos (`variants`) sale completo.
+- Los nombres que no existen se ignoran.
+- Solo en lecturas (GET/HEAD): en una escritura el serializer valida y
+  devuelve todos sus campos.
+
+Lo aplica `SparseFieldsetMixin` en los serializers de `core/serializers.py`
+cuando son la raíz de la respuesta (con `request` en el contexto). Las
+envolturas de la respuesta (`next`, `results`, `facets`...) no cambian.
+
+En los viewsets, `SparseQuerysetMixin` reduce además la consulta a las
+columnas que usan los campos pedidos (`only()`). Cada campo se resuelve por
+su `source`: una columna, una relación hacia delante (`product.name` ->
+`product__name`), `get_<campo>_display` o lo que declare el serializer en
+`field_columns` (propiedades como `current_price`). Si algún campo no se
+puede resolver no se reduce nada: nunca se provoca una consulta por fila.
+"""
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+DISPLAY_RE = re.compile(r'^get_(\w+)_display$')
+
+
+def parse_fieldset(raw):
+    """'id,name,variants.sku' -> {'id': {}, 'name': {}, 'variants': {'sku': {}}}"""
+    tree = {}
+    for path in raw.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            name = name.strip()
+            if not name:
+                break
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_fieldset(request):
+    """`(fields, omit)` de la petición (árboles o `None`), o `None` si no pide ninguno"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    raw_fields = params.get(FIELDS_PARAM)
+    raw_omit = params.get(OMIT_PARAM)
+    if not raw_fields and not raw_omit:
+        return None
+    return (parse_fieldset(raw_fields) if raw_fields else None, parse_fieldset(raw_omit) if raw_omit else {})
+
+
+def nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, SparseFieldsetMixin) else None
+
+
+class SparseFieldsetMixin:
+    """
+    Para serializers: aplica `?fields=`/`?omit=` a sus campos. El serializer
+    raíz los toma de la petición y pasa a cada serializer anidado su parte.
+    `field_columns` indica las columnas de los campos que no son columnas
+    (propiedades, `__str__`...), para `SparseQuerysetMixin`.
+    """
+    field_columns = {}
+
+    def get_fieldset(self):
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return None
+        return requested_fieldset(self.context.get('request'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return fields
+        include, omit = fieldset
+        if include is not None:
+            fields = {name: field for name, field in fields.items() if name in include}
+        for name in list(fields):
+            sub_omit = omit.get(name)
+            if sub_omit == {}:
+                del fields[name]
+                continue
+            nested = nested_serializer(fields[name])
+            if nested is not None:
+                sub_include = include.get(name) if include is not None else None
+                nested._fieldset = (sub_include or None, sub_omit or {})
+        return fields
+
+
+def required_columns(serializer, model):
+    """
+    Columnas (lookups para `only()`) que necesitan los campos de lectura de
+    `serializer`, o `None` si alguno no se puede resolver.
+    """
+    columns = {model._meta.pk.name}
+    declared = getattr(serializer, 'field_columns', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in declared:
+            columns.update(declared[name])
+            continue
+        if nested_serializer(field) is not None:
+            source = field.source
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.concrete:
+                # Relación hacia delante anidada: haría falta reducir también la relacionada
+                return None
+            # Relación inversa (prefetch): solo necesita la clave primaria
+            continue
+        lookup = source_lookup(field, model)
+        if lookup is None:
+            return None
+        columns.add(lookup)
+    return columns
+
+
+def source_lookup(field, model):
+    """'product.name' -> 'product__name'; 'get_category_display' -> 'category'"""
+    if field.source == '*':
+        return None
+    attrs = field.source.split('.')
+    match = DISPLAY_RE.match(attrs[-1])
+    if match:
+        attrs[-1] = match.group(1)
+    path = []
+    current = model
+    for index, attr in enumerate(attrs):
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+        path.append(attr)
+        if model_field.is_relation and index < len(attrs) - 1:
+            current = model_field.related_model
+        elif index < len(attrs) - 1:
+            return None
+    return '__'.join(path)
+
+
+def nested_sources(serializer):
+    return {field.source for field in serializer.fields.values() if nested_serializer(field) is not None}
+
+
+def narrow(queryset, columns, nested):
+    """
+    `only(columns)`, y sin los `select_related`/`prefetch_related` que ya no
+    usa ningún campo (un JOIN a una relación diferida es un error en Django).
+    """
+    if queryset.query.select_related:
+        joins = {column.rpartition('__')[0] for column in columns if '__' in column}
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+    lookups = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if getattr(lookup, 'prefetch_through', lookup).split('__')[0] in nested
+    ]
+    if len(lookups) != len(queryset._prefetch_related_lookups):
+        queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+    return queryset.only(*sorted(columns))
+
+
+class SparseQuerysetMixin:
+    """
+    Para viewsets: en las acciones de `sparse_actions`, si la petición pide
+    campos, la consulta trae solo sus columnas (y las del orden de la
+    paginación, que el cursor lee de la última fila).
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def sparse_queryset(self, queryset):
+        if requested_fieldset(self.request) is None:
+            return queryset
+        serializer = self.get_serializer()
+        columns = required_columns(serializer, queryset.model)
+        if columns is None:
+            return queryset
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        columns.update(lookup.lstrip('-') for lookup in ordering)
+        return narrow(queryset, columns, nested_sources(serializer))
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.sparse_actions:
+            queryset = self.sparse_queryset(queryset)
+        return queryset
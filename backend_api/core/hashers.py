@@ -0,0 +1,17 @@
+"""
+Hasher de contraseñas con coste configurable.
+
+`settings.PASSWORD_HASH_ITERATIONS` fija las iteraciones de PBKDF2-SHA256
+(por defecto, las de Django). Conserva el identificador `pbkdf2_sha256`, así
+que los hashes existentes siguen siendo válidos; si el coste guardado no
+coincide con el configurado, `check_password` vuelve a hashear la contraseña
+en el siguiente login correcto (ver `must_update`).
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,312 @@
+"""
+Importación masiva del catálogo desde CSV o JSONL.
+
+Cada fila describe una variante con su producto y su stock:
+
+    product_name, description, category, gender, base_price,
+    size, color, sku, stock_quantity, low_stock_threshold
+
+Las filas se leen en streaming y se procesan por bloques de `chunk_size`:
+la memoria usada depende del tamaño del bloque, no del archivo. Por bloque:
+- se validan las filas con `CatalogImportRowSerializer` (errores por fila),
+- los productos se resuelven por nombre (una consulta) y se crean/actualizan
+  con `bulk_create`/`bulk_update`, con su precio efectivo ya calculado
+  (`core.pricing`, una consulta de promociones por bloque),
+- variantes (clave: `sku`) e inventario (clave: `variant`) se insertan con
+  `bulk_create(update_conflicts=True)`, es decir, un upsert por tabla.
+
+Los métodos bulk no disparan señales: la caché del catálogo se invalida
+explícitamente al terminar cada bloque, y los cruces del umbral de stock bajo
+se registran comparando con los niveles leídos antes del upsert. Los cambios
+de stock se publican en el canal push (`core.push`) al confirmar.
+
+Los uploads se comprueban antes de importar (`check_encoding`): un archivo
+que no es UTF-8 se rechaza entero en lugar de fallar a mitad de la
+importación con los primeros bloques ya guardados.
+"""
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .low_stock import record_crossings
+from .models import Inventory, Product, Promotion, Variant
+from .pricing import PromotionIndex
+from .push import stock_changed
+from .signals import invalidate_catalog
+
+FORMATS = ('csv', 'jsonl')
+
+PRODUCT_FIELDS = ('description', 'category', 'gender', 'base_price')
+
+
+class CatalogImportRowSerializer(serializers.Serializer):
+    """Valida una fila de importación (producto + variante + stock)"""
+    product_name = serializers.CharField(max_length=100)
+    description = serializers.CharField(allow_blank=True, required=False, default='')
+    category = serializers.ChoiceField(choices=Product.CategoryChoices.choices)
+    gender = serializers.ChoiceField(choices=Product.GenderChoices.choices)
+    base_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    size = serializers.CharField(max_length=10)
+    color = serializers.CharField(max_length=30)
+    sku = serializers.CharField(max_length=50)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False, default=0)
+    low_stock_threshold = serializers.IntegerField(min_value=0, required=False, default=10)
+
+
+@dataclass
+class ImportResult:
+    """Resumen de una importación. Solo guarda los primeros `max_errors` errores"""
+    rows: int = 0
+    imported: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    max_errors: int = 1000
+
+    def add_error(self, line, detail):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': detail})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'products_created': self.products_created,
+            'products_updated': self.products_updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def iter_rows(stream, fmt):
+    """
+    Itera las filas de `stream` (texto) como dicts, una a una.
+    Las líneas JSON inválidas se devuelven como `None` para reportarlas.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Formato no soportado: {fmt}")
+
+
+class EncodingError(ValueError):
+    """El archivo no se puede decodificar; `line` y `position` (byte) desde 1"""
+
+    def __init__(self, line, position, encoding):
+        self.line = line
+        self.position = position
+        super().__init__(f"El archivo no es {encoding} válido: línea {line}, byte {position}.")
+
+
+def check_encoding(binary_stream, encoding='utf-8', block_size=64 * 1024):
+    """
+    Decodifica `binary_stream` entero por bloques (memoria constante) y lo
+    deja al principio. Lanza `EncodingError` en el primer byte inválido.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    offset, line = 0, 1
+    while True:
+        block = binary_stream.read(block_size)
+        try:
+            decoder.decode(block, final=not block)
+        except UnicodeDecodeError as exc:
+            # `exc.object` = bytes pendientes del bloque anterior (una
+            # secuencia multibyte a medias, sin saltos de línea) + el bloque
+            pending = len(exc.object) - len(block)
+            raise EncodingError(
+                line + exc.object[:exc.start].count(b'\n'),
+                offset - pending + exc.start + 1,
+                encoding,
+            ) from exc
+        if not block:
+            break
+        offset += len(block)
+        line += block.count(b'\n')
+    binary_stream.seek(0)
+
+
+def open_text(binary_stream, encoding='utf-8'):
+    """Envuelve un archivo binario (p. ej. un upload) para leerlo como texto"""
+    return io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+
+
+class CatalogImporter:
+    """
+    Importador por bloques. `progress(result)` se llama tras cada bloque.
+    """
+
+    def __init__(self, chunk_size=1000, progress=None, max_errors=1000):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.result = ImportResult(max_errors=max_errors)
+        # Una sola instancia: construir los campos del serializer por fila
+        # (deepcopy) cuesta más que la propia validación
+        self.row_serializer = CatalogImportRowSerializer()
+
+    def run(self, rows):
+        numbered = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(numbered, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            if self.progress:
+                self.progress(self.result)
+        return self.result
+
+    def validate_chunk(self, chunk):
+        """
+        Devuelve `[(línea, fila_validada)]` del bloque, deduplicadas por SKU
+        (gana la última aparición).
+        """
+        valid = {}
+        for line, row in chunk:
+            self.result.rows += 1
+            if row is None:
+                self.result.add_error(line, {'non_field_errors': ["Fila JSON inválida"]})
+                continue
+            try:
+                data = self.row_serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                self.result.add_error(line, exc.detail)
+                continue
+            valid[data['sku']] = (line, data)
+        return list(valid.values())
+
+    def import_chunk(self, chunk):
+        rows = self.validate_chunk(chunk)
+        if not rows:
+            return
+        try:
+            self.write_rows([row for _, row in rows])
+        except IntegrityError:
+            # Algún conflicto no resoluble por upsert (p. ej. producto/talla/color
+            # repetido con otro SKU): se reintenta fila a fila para aislarlo
+            for line, row in rows:
+                try:
+                    self.write_rows([row])
+                except IntegrityError as exc:
+                    self.result.add_error(line, {'non_field_errors': [str(exc)]})
+        for model_name in ('product', 'variant', 'inventory'):
+            invalidate_catalog(model_name)
+
+    def write_rows(self, rows):
+        """Upsert de productos, variantes e inventario en una transacción"""
+        with transaction.atomic():
+            products, created, updated = self.upsert_products(rows)
+            now = timezone.now()
+            Variant.objects.bulk_create(
+                [
+                    Variant(
+                        product=products[row['product_name']],
+                        size=row['size'],
+                        color=row['color'],
+                        sku=row['sku'],
+                        updated_at=now,
+                    )
+                    for row in rows
+                ],
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=['product', 'size', 'color', 'updated_at'],
+            )
+            variant_ids = dict(
+                Variant.objects.filter(sku__in=[row['sku'] for row in rows])
+                .values_list('sku', 'id')
+            )
+            previous = {
+                variant_id: (stock, threshold)
+                for variant_id, stock, threshold in Inventory.objects.filter(
+                    variant_id__in=variant_ids.values()
+                ).values_list('variant_id', 'stock_quantity', 'low_stock_threshold')
+            }
+            Inventory.objects.bulk_create(
+                [
+                    Inventory(
+                        variant_id=variant_ids[row['sku']],
+                        stock_quantity=row['stock_quantity'],
+                        low_stock_threshold=row['low_stock_threshold'],
+                        updated_at=now,
+                    )
+                    for row in rows
+                ],
+                update_conflicts=True,
+                unique_fields=['variant'],
+                update_fields=['stock_quantity', 'low_stock_threshold', 'updated_at'],
+            )
+            record_crossings(
+                (
+                    variant_ids[row['sku']],
+                    previous.get(variant_ids[row['sku']]),
+                    (row['stock_quantity'], row['low_stock_threshold']),
+                )
+                for row in rows
+            )
+            stock_changed(variant_ids.values())
+        self.result.imported += len(rows)
+        self.result.products_created += created
+        self.result.products_updated += updated
+
+    def upsert_products(self, rows):
+        """
+        Crea o actualiza los productos del bloque.
+        Devuelve `({name: Product}, creados, actualizados)`.
+        """
+        wanted = {}
+        for row in rows:
+            wanted[row['product_name']] = row
+
+        existing = {}
+        for product in Product.objects.filter(name__in=wanted).order_by('id'):
+            existing.setdefault(product.name, product)
+
+        now = timezone.now()
+        promotions = PromotionIndex(Promotion.objects.live(now))
+        changed = []
+        for name, product in existing.items():
+            row = wanted[name]
+            if any(getattr(product, attr) != row[attr] for attr in PRODUCT_FIELDS):
+                for attr in PRODUCT_FIELDS:
+                    setattr(product, attr, row[attr])
+                product.effective_price = promotions.price(product.pk, product.category, product.gender, product.base_price)
+                product.updated_at = now
+                changed.append(product)
+        if changed:
+            Product.objects.bulk_update(changed, [*PRODUCT_FIELDS, 'effective_price', 'updated_at'])
+
+        new = [
+            Product(name=name, **{attr: row[attr] for attr in PRODUCT_FIELDS})
+            for name, row in wanted.items()
+            if name not in existing
+        ]
+        for product in new:
+            # Sin id todavía: solo le aplican las promociones sin producto
+            product.effective_price = promotions.price(None, product.category, product.gender, product.base_price)
+        if new:
+            Product.objects.bulk_create(new)
+            if any(product.pk is None for product in new):
+                # Motores sin RETURNING: se recuperan los ids por nombre
+                for product in Product.objects.filter(name__in=[p.name for p in new]).order_by('id'):
+                    existing.setdefault(product.name, product)
+        for product in new:
+            existing.setdefault(product.name, product)
+        return existing, len(new), len(changed)
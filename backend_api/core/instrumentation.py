@@ -0,0 +1,356 @@
+"""
+Instrumentación de rendimiento por petición.
+
+`InstrumentationMiddleware` mide en cada petición:
+- tiempo total (wall),
+- número de consultas SQL y tiempo total en base de datos, con un
+  `execute_wrapper` instalado en cada conexión al crearse,
+- tiempo de serialización: `serializer.data` en las vistas con
+  `SerializerTimingMixin` y las filas de `FastListMixin` (ver
+  `timing_serialization`); el resto de vistas informa 0.
+
+Los resultados se devuelven en la cabecera `Server-Timing` (visible en las
+DevTools del navegador), se registran como JSON en el logger
+`core.performance` y se agregan por vista en `registry`: histograma de
+latencias, consultas y tiempo de BD (y en `core.metrics` para Prometheus). Si la petición supera el umbral
+`SLOW_REQUEST_MS`, el log (nivel WARNING) incluye las consultas más lentas.
+
+Configuración (`settings.INSTRUMENTATION`):
+    {
+        'ENABLED': True,
+        'SERVER_TIMING': True,
+        'SLOW_REQUEST_MS': 500,
+        'SLOW_QUERIES': 10,      # consultas que se adjuntan a un log lento
+    }
+"""
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from . import metrics as prometheus
+
+logger = logging.getLogger('core.performance')
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERIES': 10,
+}
+
+# Límites superiores (ms) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+class RequestMetrics:
+    """Contadores de una petición en curso"""
+
+    def __init__(self, slow_queries=10):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+        self._slow_queries = slow_queries
+        # min-heap (duración, orden, sql): se conservan solo las N más lentas
+        self._top = []
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if self._slow_queries:
+            item = (duration, self.queries, sql)
+            if len(self._top) < self._slow_queries:
+                heapq.heappush(self._top, item)
+            elif duration > self._top[0][0]:
+                heapq.heapreplace(self._top, item)
+
+    def slowest_queries(self):
+        return [
+            {'sql': sql, 'ms': round(duration * 1000, 2)}
+            for duration, _, sql in sorted(self._top, reverse=True)
+        ]
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_metrics():
+    """Métricas de la petición en curso (o `None` fuera de una petición)"""
+    return _current.get()
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    Receiver de `connection_created`: deja `query_wrapper` fijo en cada conexión.
+    Las conexiones son por hilo y el ORM asíncrono consulta desde otro hilo,
+    así que no basta con envolver la conexión del hilo de la petición; el
+    wrapper lee las métricas del contextvar, que sí viaja con `sync_to_async`.
+    """
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+class ViewStats:
+    """Agregados de una vista: histograma de latencia + totales"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.queries = 0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, total_ms, db_ms, serializer_ms, queries, error):
+        self.count += 1
+        self.errors += error
+        self.total_ms += total_ms
+        self.db_ms += db_ms
+        self.serializer_ms += serializer_ms
+        self.queries += queries
+        self.max_ms = max(self.max_ms, total_ms)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if total_ms <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def quantile(self, q):
+        """Estimación por bucket: límite superior del bucket que contiene el cuantil"""
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max_ms
+        return 0.0
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / count, 2),
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'avg_queries': round(self.queries / count, 2),
+            'avg_db_ms': round(self.db_ms / count, 2),
+            'avg_serializer_ms': round(self.serializer_ms / count, 2),
+            'histogram': {
+                **{f'le_{bound}': n for bound, n in zip(LATENCY_BUCKETS, self.buckets)},
+                'le_inf': self.buckets[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """Agregados por `(método, vista)` en memoria del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, method, view, metrics, status_code):
+        with self._lock:
+            stats = self._views.get((method, view))
+            if stats is None:
+                stats = self._views[(method, view)] = ViewStats()
+            stats.observe(
+                metrics.elapsed * 1000,
+                metrics.db_time * 1000,
+                metrics.serializer_time * 1000,
+                metrics.queries,
+                status_code >= 500,
+            )
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f'{method} {view}': stats.as_dict()
+                for (method, view), stats in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+connection_created.connect(install_query_wrapper, dispatch_uid='core.instrumentation.query_wrapper')
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+def server_timing(metrics):
+    return ', '.join([
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'serialize;dur={metrics.serializer_time * 1000:.1f}',
+        f'total;dur={metrics.elapsed * 1000:.1f}',
+    ])
+
+
+class InstrumentationMiddleware:
+    """
+    Mide cada petición y publica Server-Timing, logs y agregados por vista.
+    Admite WSGI y ASGI: bajo ASGI no obliga a Django a ejecutar la cadena de
+    middlewares en un hilo, y las vistas `async def` siguen siendo asíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        metrics = RequestMetrics(slow_queries=config['SLOW_QUERIES'])
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics(slow_queries=config['SLOW_QUERIES'])
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, config)
+
+    def finish(self, request, response, metrics, config):
+        view = view_name(request)
+        registry.observe(request.method, view, metrics, response.status_code)
+        prometheus.observe_request(
+            request.method, view, response.status_code,
+            metrics.elapsed, metrics.queries, metrics.db_time,
+        )
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(metrics)
+        self.log(request, response, view, metrics, config)
+        return response
+
+    def log(self, request, response, view, metrics, config):
+        total_ms = metrics.elapsed * 1000
+        slow = total_ms >= config['SLOW_REQUEST_MS']
+        level = logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serializer_ms': round(metrics.serializer_time * 1000, 2),
+            'queries': metrics.queries,
+        }
+        if slow:
+            record['slow'] = True
+            record['slowest_queries'] = metrics.slowest_queries()
+        logger.log(level, json.dumps(record, ensure_ascii=False), extra={'metrics': record})
+
+
+@contextmanager
+def timing_serialization():
+    """
+    Suma el bloque al tiempo de serialización de la petición en curso.
+    Solo cuenta el bloque más externo: los serializers anidados no suman
+    dos veces. Fuera de una petición instrumentada no hace nada.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics._serializer_depth:
+        yield
+        return
+    metrics._serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._serializer_depth -= 1
+        metrics.serializer_time += time.perf_counter() - start
+
+
+_timed_classes = {}
+
+
+def timed_serializer_class(serializer_class):
+    """Subclase de `serializer_class` cuyo `data` se mide (una por clase)"""
+    timed = _timed_classes.get(serializer_class)
+    if timed is None:
+        original = serializer_class.data
+
+        def data(self):
+            with timing_serialization():
+                return original.fget(self)
+
+        timed = _timed_classes[serializer_class] = type(
+            serializer_class.__name__, (serializer_class,),
+            {'data': property(data), '__module__': serializer_class.__module__},
+        )
+    return timed
+
+
+class SerializerTimingMixin:
+    """
+    Para vistas genéricas de DRF: mide `data` de los serializers de
+    `get_serializer` (también con `many=True`, cuyo `ListSerializer` se
+    crea dentro de DRF). Los demás serializers no se tocan.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.__class__ = timed_serializer_class(type(serializer))
+        return serializer
@@ -0,0 +1,62 @@
+"""
+Conjunto de stock bajo y feed de cruces del umbral.
+
+El conjunto lo mantiene la base de datos: `Inventory.is_low_stock` es una
+columna generada y `inventory_low_stock_idx` un índice parcial que solo
+contiene las filas en stock bajo. Listarlas (o contarlas) cuesta
+O(filas en stock bajo) aunque el inventario tenga millones de filas.
+
+El feed (`LowStockEvent`) registra cada variante que entra o sale del
+conjunto. Lo alimentan todas las vías de escritura de stock:
+- `Inventory.save()` (señal `post_save`, compara con los niveles cargados),
+- los movimientos atómicos de `core.stock`,
+- la importación masiva (`core.importers`).
+
+Un panel que sondea pide `?after=<último id visto>`: cada consulta recorre
+solo los eventos nuevos por clave primaria.
+"""
+from .models import LowStockEvent
+
+FEED_LIMIT = 100
+MAX_FEED_LIMIT = 1000
+
+
+def is_low(stock_quantity, low_stock_threshold):
+    """Misma condición que la columna generada `Inventory.is_low_stock`"""
+    return stock_quantity <= low_stock_threshold
+
+
+def record_crossings(changes):
+    """
+    Registra los cruces de umbral de `changes`, un iterable de
+    `(variant_id, antes, después)` con niveles `(stock, umbral)`.
+    `antes` es `None` si el inventario no existía.
+    Devuelve los eventos creados (un único INSERT).
+    """
+    events = []
+    for variant_id, before, after in changes:
+        was_low = before is not None and is_low(*before)
+        if was_low != is_low(*after):
+            events.append(LowStockEvent(
+                variant_id=variant_id,
+                is_low_stock=not was_low,
+                stock_quantity=after[0],
+                low_stock_threshold=after[1],
+            ))
+    if events:
+        LowStockEvent.objects.bulk_create(events)
+    return events
+
+
+def feed(after=None, limit=FEED_LIMIT):
+    """
+    Eventos posteriores al id `after`, en orden. Sin `after`, los `limit`
+    más recientes (para arrancar un panel). Devuelve `(eventos, último_id)`;
+    el último id se pasa como `after` en la siguiente consulta.
+    """
+    if after is None:
+        events = list(LowStockEvent.objects.order_by('-id')[:limit])[::-1]
+    else:
+        events = list(LowStockEvent.objects.filter(id__gt=after).order_by('id')[:limit])
+    last_id = events[-1].id if events else (after or 0)
+    return events, last_id
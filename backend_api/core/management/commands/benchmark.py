@@ -0,0 +1,51 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from core.benchmarks import REGISTRY
+from core.cache import catalog_cache
+from core.search import reset_search_backend
+
+
+class Command(BaseCommand):
+    help = "Ejecuta benchmarks de rendimiento sobre una base de datos de test desechable"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Benchmarks a ejecutar (por defecto todos)")
+        parser.add_argument('--list', action='store_true', help="Lista los benchmarks disponibles")
+        parser.add_argument('--size', type=int, help="Tamaño del dataset sintético")
+        parser.add_argument('--threads', type=int, help="Hilos/clientes concurrentes")
+        parser.add_argument('--iterations', type=int, help="Repeticiones por hilo o por medición")
+        parser.add_argument('--keepdb', action='store_true', help="Reutiliza la base de datos de test")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, func in sorted(REGISTRY.items()):
+                summary = (func.__doc__ or '').strip().splitlines()[0:1]
+                self.stdout.write(f"{name}: {summary[0] if summary else ''}")
+            return
+
+        names = options['names'] or sorted(REGISTRY)
+        unknown = [name for name in names if name not in REGISTRY]
+        if unknown:
+            raise CommandError(f"Benchmarks desconocidos: {', '.join(unknown)}")
+
+        params = {
+            key: options[key]
+            for key in ('size', 'threads', 'iterations')
+            if options[key] is not None
+        }
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            for index, name in enumerate(names):
+                if index:
+                    # Cada benchmark parte de una base de datos y cachés vacías
+                    call_command('flush', interactive=False, verbosity=0)
+                    catalog_cache.reset()
+                    reset_search_backend()
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                result = REGISTRY[name](**params)
+                for key, value in result.items():
+                    self.stdout.write(f"  {key}: {value}")
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
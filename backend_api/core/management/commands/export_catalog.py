@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exporters import FORMATS, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Exporta el catálogo completo (variantes con producto y stock) en streaming"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Archivo de salida, o '-' para stdout")
+        parser.add_argument('--format', choices=FORMATS, help="Formato (por defecto según la extensión)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Filas leídas por bloque del cursor")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (path.rpartition('.')[2].lower() if path != '-' else 'csv')
+        if fmt not in FORMATS:
+            raise CommandError(f"Indica --format ({', '.join(FORMATS)})")
+
+        chunks = export_catalog(fmt, chunk_size=options['chunk_size'])
+        if path == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Catálogo exportado en {path}"))
@@ -0,0 +1,50 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import FORMATS, CatalogImporter, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Importa productos, variantes y stock desde un archivo CSV o JSONL (upsert por SKU)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ruta del archivo, o '-' para leer de stdin")
+        parser.add_argument('--format', choices=FORMATS, help="Formato (por defecto según la extensión)")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Filas por bloque")
+        parser.add_argument('--max-errors', type=int, default=100, help="Errores a mostrar al final")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or path.rpartition('.')[2].lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Indica --format ({', '.join(FORMATS)})")
+
+        start = time.perf_counter()
+
+        def progress(result):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{result.rows} filas ({result.imported} importadas, {result.failed} con error) "
+                f"- {result.rows / elapsed:.0f} filas/s"
+            )
+
+        importer = CatalogImporter(
+            chunk_size=options['chunk_size'],
+            progress=progress if options['verbosity'] >= 1 else None,
+            max_errors=options['max_errors'],
+        )
+        if path == '-':
+            result = importer.run(iter_rows(sys.stdin, fmt))
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                result = importer.run(iter_rows(stream, fmt))
+
+        for error in result.errors:
+            self.stderr.write(f"Línea {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación terminada: {result.imported} variantes, "
+            f"{result.products_created} productos nuevos, {result.products_updated} actualizados, "
+            f"{result.failed} filas con error"
+        ))
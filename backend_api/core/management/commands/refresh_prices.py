@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import pricing
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los precios efectivos afectados por promociones que han entrado "
+        "o salido de su ventana (pensado para cron, p. ej. cada minuto)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recalcula todo el catálogo")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['full']:
+            changed = pricing.rebuild()
+            summary = f"Catálogo recalculado: {changed} precios cambiados"
+        else:
+            promotions, changed = pricing.refresh()
+            summary = f"{promotions} promociones recalculadas: {changed} precios cambiados"
+        self.stdout.write(self.style.SUCCESS(f"{summary} ({time.perf_counter() - start:.2f}s)"))
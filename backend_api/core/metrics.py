@@ -0,0 +1,482 @@
+"""
+Métricas en formato de exposición de Prometheus (`GET /metrics`).
+
+Contadores e histogramas sin lock en el camino caliente: cada hilo escribe en
+su propio *shard* (un dict por hilo) y solo la recolección suma los shards.
+Los shards de hilos terminados (pools que reciclan hilos, greenlets de
+gevent) se suman a un shard de retirados, así su número no crece sin límite.
+Las tasas (peticiones/s, descuentos de stock/s) se obtienen en Prometheus con
+`rate()` sobre los contadores `*_total`.
+
+Multi-proceso (gunicorn/uvicorn con varios workers): si
+`METRICS['MULTIPROCESS_DIR']` está definido, cada worker vuelca su snapshot a
+`<dir>/metrics-<pid>.json` como mucho cada `FLUSH_INTERVAL` segundos
+(escritura atómica con `os.replace`) y `/metrics` suma los archivos de todos
+los workers. Tras un `fork` los shards heredados se descartan.
+
+Los workers que terminan (reinicios por `max_requests`, despliegues) no
+dejan su archivo para siempre: sus contadores e histogramas se suman a
+`metrics-dead.json`, para que los totales sigan siendo monotónicos, y sus
+gauges se descartan. Lo hace el propio worker al salir (`atexit`) y, si
+murió sin poder hacerlo, el primer scrape que ve que su pid ya no existe.
+Un worker nuevo que hereda el pid de uno muerto retira el archivo antiguo
+antes de escribir el suyo. Por eso el directorio debe ser local a la
+máquina (o al contenedor): los pids solo tienen sentido ahí.
+
+Los gauges de negocio (variantes con stock bajo) se calculan al recolectar.
+Las estadísticas del pool de conexiones (psycopg-pool) son por worker: se
+copian a gauges con la etiqueta `worker` al volcar y al recolectar.
+"""
+import atexit
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso, sin necesidad de lock
+    fcntl = None
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': None,
+    'FLUSH_INTERVAL': 1.0,
+    # /metrics exige `Authorization: Bearer <token>`; sin token configurado
+    # responde 403 (las métricas no se publican por defecto)
+    'AUTH_TOKEN': None,
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Buckets (segundos) de latencia de las peticiones
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Contadores e histogramas de los workers ya terminados
+RETIRED_FILE = 'metrics-dead.json'
+LOCK_FILE = 'metrics.lock'
+
+# nombre -> (tipo, ayuda)
+METRICS = {
+    'http_requests_total': ('counter', "Peticiones HTTP por ruta, método y estado"),
+    'http_request_duration_seconds': ('histogram', "Latencia de las peticiones HTTP por ruta"),
+    'db_queries_total': ('counter', "Consultas SQL ejecutadas por ruta"),
+    'db_query_duration_seconds_total': ('counter', "Tiempo total en base de datos por ruta"),
+    'catalog_cache_requests_total': ('counter', "Consultas a la caché del catálogo por resultado"),
+    'login_attempts_total': ('counter', "Intentos de login por resultado"),
+    'stock_decrements_total': ('counter', "Operaciones de descuento de stock confirmadas"),
+    'stock_decremented_units_total': ('counter', "Unidades de stock descontadas"),
+    'stock_rejections_total': ('counter', "Descuentos de stock rechazados por falta de stock"),
+    'db_connection_setups_total': ('counter', "Conexiones a la BD abiertas (o tomadas del pool)"),
+    'compressed_responses_total': ('counter', "Respuestas comprimidas por codificación"),
+    'compression_saved_bytes_total': ('counter', "Bytes ahorrados por la compresión (respuestas no streaming)"),
+    'push_events_published_total': ('counter', "Eventos de inventario publicados en el canal push"),
+    # Pool nativo (psycopg-pool), por worker
+    'db_pool_size': ('gauge', "Conexiones abiertas por el pool"),
+    'db_pool_available': ('gauge', "Conexiones libres en el pool"),
+    'db_pool_in_use': ('gauge', "Conexiones prestadas a peticiones"),
+    'db_pool_requests_waiting': ('gauge', "Peticiones esperando una conexión"),
+    # Acumulados desde que arrancó el worker; se descartan con él (como gauges)
+    'db_pool_requests': ('gauge', "Conexiones pedidas al pool"),
+    'db_pool_requests_queued': ('gauge', "Peticiones que tuvieron que esperar conexión"),
+    'db_pool_wait_seconds': ('gauge', "Tiempo total esperando conexión del pool"),
+    'db_pool_timeouts': ('gauge', "Pool agotado: peticiones que no obtuvieron conexión a tiempo"),
+}
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'METRICS', {})}
+
+
+class Shard:
+    """Métricas escritas por un único hilo"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def merge_into(self, counters, histograms):
+        # dict.copy() es atómico con el GIL: no choca con escrituras en curso
+        for key, value in self.counters.copy().items():
+            counters[key] = counters.get(key, 0) + value
+        for key, state in self.histograms.copy().items():
+            merged = histograms.setdefault(key, [0] * len(state))
+            for index, value in enumerate(list(state)):
+                merged[index] += value
+
+
+class MetricStore:
+    """
+    Contadores e histogramas con un shard por hilo.
+    Las claves son `(nombre, ((label, valor), ...))`.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # solo para registrar y retirar shards
+        self._shards = []  # [(weakref al hilo, shard)]
+        self._retired = Shard()
+        self._gauges = {}
+        self._last_flush = 0.0
+        self._flushed = False
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = Shard()
+            thread = weakref.ref(threading.current_thread())
+            with self._lock:
+                self._retire_dead_shards()
+                self._shards.append((thread, shard))
+        return shard
+
+    def _retire_dead_shards(self):
+        """Suma a `_retired` los shards de hilos terminados. Llamar con `_lock`"""
+        alive = []
+        for thread, shard in self._shards:
+            current = thread()
+            if current is not None and current.is_alive():
+                alive.append((thread, shard))
+            else:
+                # El hilo ya no escribe: su shard no cambia
+                shard.merge_into(self._retired.counters, self._retired.histograms)
+        self._shards = alive
+
+    def _after_fork(self):
+        # gunicorn con --preload: el worker no debe volver a contar lo del master
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = Shard()
+        self._gauges = {}
+        self._local = threading.local()
+        self._last_flush = 0.0
+        self._flushed = False
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def set_gauge(self, name, labels, value):
+        """Valor instantáneo del proceso (una asignación de dict: atómica con el GIL)"""
+        self._gauges[(name, labels)] = value
+
+    def observe(self, name, labels, value, buckets=DURATION_BUCKETS):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        state = histograms.get(key)
+        if state is None:
+            # [conteo por bucket..., +Inf, suma]
+            state = histograms[key] = [0] * (len(buckets) + 2)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                state[index] += 1
+                break
+        else:
+            state[len(buckets)] += 1
+        state[-1] += value
+
+    def collect(self):
+        """Suma de todos los shards de este proceso"""
+        counters, histograms = dict(self._gauges), {}
+        with self._lock:
+            self._retire_dead_shards()
+            self._retired.merge_into(counters, histograms)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            shard.merge_into(counters, histograms)
+        return counters, histograms
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+            self._retired = Shard()
+            self._gauges = {}
+        self._local = threading.local()
+        self._flushed = False
+
+    # -- multi-proceso -------------------------------------------------------
+
+    def maybe_flush(self):
+        """Vuelca el snapshot del proceso si ha pasado `FLUSH_INTERVAL`"""
+        config = get_config()
+        directory = config['MULTIPROCESS_DIR']
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self._last_flush < config['FLUSH_INTERVAL']:
+            return
+        self._last_flush = now
+        refresh_db_pool_gauges()
+        self.flush(directory)
+
+    def flush(self, directory):
+        counters, histograms = self.collect()
+        gauges = dict(self._gauges)
+        payload = {
+            'counters': [[name, labels, value] for (name, labels), value in counters.items() if (name, labels) not in gauges],
+            'histograms': [[name, labels, state] for (name, labels), state in histograms.items()],
+            'gauges': [[name, labels, value] for (name, labels), value in gauges.items()],
+        }
+        path = snapshot_path(directory, os.getpid())
+        if not self._flushed:
+            # Un archivo con nuestro pid es de un worker muerto que lo tenía antes
+            with directory_lock(directory):
+                retire(directory, [path])
+            self._flushed = True
+        write_json(path, payload)
+
+    def retire_own(self):
+        """Al salir del worker: su último snapshot pasa al agregado de workers terminados"""
+        directory = get_config()['MULTIPROCESS_DIR']
+        if not self._flushed or not directory:
+            return
+        self.flush(directory)
+        with directory_lock(directory):
+            retire(directory, [snapshot_path(directory, os.getpid())])
+        self._flushed = False
+
+    def collect_all(self):
+        """Este proceso (en vivo) + los snapshots del resto de workers y de los terminados"""
+        counters, histograms = self.collect()
+        directory = get_config()['MULTIPROCESS_DIR']
+        if not directory or not os.path.isdir(directory):
+            return counters, histograms
+        retire_dead(directory)
+        own = os.path.basename(snapshot_path(directory, os.getpid()))
+        for filename in os.listdir(directory):
+            if not filename.startswith('metrics-') or not filename.endswith('.json') or filename == own:
+                continue
+            payload = read_json(os.path.join(directory, filename))
+            if payload is not None:
+                merge_payload(counters, histograms, payload, gauges=True)
+        return counters, histograms
+
+
+def snapshot_path(directory, pid):
+    return os.path.join(directory, f'metrics-{pid}.json')
+
+
+def write_json(path, payload):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(payload, fh)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_payload(counters, histograms, payload, gauges=False):
+    """Suma un snapshot; sus gauges solo si `gauges` (los de workers vivos)"""
+    rows = payload['counters'] + (payload.get('gauges', []) if gauges else [])
+    for name, labels, value in rows:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, state in payload['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        merged = histograms.setdefault(key, [0] * len(state))
+        for index, value in enumerate(state):
+            merged[index] += value
+
+
+@contextlib.contextmanager
+def directory_lock(directory):
+    """Lock entre procesos: dos scrapes no deben retirar (y sumar) el mismo archivo"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def retire(directory, paths):
+    """
+    Suma los contadores e histogramas de `paths` a `RETIRED_FILE` y borra
+    los archivos (sus gauges se descartan). Llamar con `directory_lock`.
+    """
+    payloads = [(path, read_json(path)) for path in paths if os.path.exists(path)]
+    if not payloads:
+        return
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    counters, histograms = {}, {}
+    retired = read_json(retired_path)
+    if retired is not None:
+        merge_payload(counters, histograms, retired)
+    for _, payload in payloads:
+        if payload is not None:
+            merge_payload(counters, histograms, payload)
+    write_json(retired_path, {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, state] for (name, labels), state in histograms.items()],
+    })
+    for path, _ in payloads:
+        os.remove(path)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def retire_dead(directory):
+    """Retira los snapshots de workers cuyo proceso ya no existe"""
+    dead = []
+    for filename in os.listdir(directory):
+        pid = filename[len('metrics-'):-len('.json')]
+        if filename.startswith('metrics-') and filename.endswith('.json') and pid.isdigit():
+            if int(pid) != os.getpid() and not pid_alive(int(pid)):
+                dead.append(os.path.join(directory, filename))
+    if dead:
+        with directory_lock(directory):
+            retire(directory, dead)
+
+
+store = MetricStore()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=store._after_fork)
+atexit.register(store.retire_own)
+
+
+def inc(name, labels=(), value=1):
+    if get_config()['ENABLED']:
+        store.inc(name, labels, value)
+
+
+def refresh_db_pool_gauges():
+    """
+    Copia las estadísticas de los pools de psycopg de este proceso a gauges
+    etiquetados con el worker (los de otros workers llegan por sus snapshots).
+    """
+    from django.db import connections
+
+    worker = str(os.getpid())
+    for alias in connections:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql' or not connection.settings_dict['OPTIONS'].get('pool'):
+            continue
+        stats = connection.pool.get_stats()
+        labels = (('alias', alias), ('worker', worker))
+        size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+        store.set_gauge('db_pool_size', labels, size)
+        store.set_gauge('db_pool_available', labels, available)
+        store.set_gauge('db_pool_in_use', labels, size - available)
+        store.set_gauge('db_pool_requests_waiting', labels, stats.get('requests_waiting', 0))
+        store.set_gauge('db_pool_requests', labels, stats.get('requests_num', 0))
+        store.set_gauge('db_pool_requests_queued', labels, stats.get('requests_queued', 0))
+        store.set_gauge('db_pool_wait_seconds', labels, stats.get('requests_wait_ms', 0) / 1000)
+        store.set_gauge('db_pool_timeouts', labels, stats.get('requests_errors', 0))
+
+
+def observe_request(method, route, status_code, seconds, queries, db_seconds):
+    """Registra una petición terminada (lo llama `InstrumentationMiddleware`)"""
+    if not get_config()['ENABLED']:
+        return
+    labels = (('route', route), ('method', method))
+    store.inc('http_requests_total', labels + (('status', str(status_code)),))
+    store.observe('http_request_duration_seconds', labels, seconds)
+    store.inc('db_queries_total', (('route', route),), queries)
+    store.inc('db_query_duration_seconds_total', (('route', route),), db_seconds)
+    store.maybe_flush()
+
+
+# -- exposición -----------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def business_gauges(counters):
+    """Gauges calculados al recolectar: `[(nombre, tipo, ayuda, valor)]`"""
+    from .models import Inventory
+
+    hits = sum(v for (n, l), v in counters.items() if n == 'catalog_cache_requests_total' and ('result', 'hit') in l)
+    total = sum(v for (n, _), v in counters.items() if n == 'catalog_cache_requests_total')
+    return [
+        ('inventory_low_stock_variants', 'gauge',
+         "Variantes con stock en o por debajo de su umbral", Inventory.objects.low_stock().count()),
+        ('catalog_cache_hit_ratio', 'gauge',
+         "Aciertos / consultas de la caché del catálogo", hits / total if total else 0.0),
+    ]
+
+
+def render():
+    """Texto en formato de exposición de Prometheus 0.0.4"""
+    refresh_db_pool_gauges()
+    counters, histograms = store.collect_all()
+    lines = []
+
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for (name, labels), state in histograms.items():
+        by_name.setdefault(name, []).append((labels, state))
+
+    for name in sorted(by_name):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + (math.inf,), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    for name, kind, help_text, value in business_gauges(counters):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+@require_GET
+def metrics_view(request):
+    """Endpoint de scraping para Prometheus"""
+    token = get_config()['AUTH_TOKEN']
+    if not token:
+        return HttpResponse(status=403)
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
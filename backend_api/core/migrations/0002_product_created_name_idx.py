@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', 'name'], name='product_created_name_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:30
+
+from django.db import migrations, transaction
+
+# Vocales acentuadas y ñ/ç: lo que quita `normalize()` del backend en memoria
+ACCENTED = 'áàâäãåéèêëíìîïóòôöõúùûüñçÁÀÂÄÃÅÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÑÇ'
+PLAIN = 'aaaaaaeeeeiiiiooooouuuuncAAAAAAEEEEIIIIOOOOOUUUUNC'
+
+
+def create_search_vector(apps, schema_editor):
+    """
+    Solo PostgreSQL: columna tsvector generada (la mantiene la base de datos)
+    con su índice GIN, e índice de trigramas si `pg_trgm` está disponible.
+    En otros motores la búsqueda usa el índice en memoria de core/search.py.
+
+    El texto se indexa sin acentos, como en el backend en memoria.
+    `unaccent()` no es IMMUTABLE y no se puede usar en una columna generada
+    ni en un índice: se envuelve en `core_unaccent()`, marcada IMMUTABLE
+    (con el diccionario explícito no depende de `search_path`). Si la
+    extensión no se puede instalar se usa `translate()` con los caracteres
+    acentuados del español y otras lenguas latinas.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        # Crear una extensión puede requerir permisos de superusuario
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        body = "SELECT public.unaccent('public.unaccent', $1)"
+    except Exception:
+        body = f"SELECT translate($1, '{ACCENTED}', '{PLAIN}')"
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION core_unaccent(text) RETURNS text "
+        f"LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $${body}$$"
+    )
+    schema_editor.execute(
+        "ALTER TABLE core_product ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', core_unaccent(coalesce(name, ''))), 'A') || "
+        "setweight(to_tsvector('simple', core_unaccent(coalesce(description, ''))), 'B')"
+        ") STORED"
+    )
+    schema_editor.execute(
+        "CREATE INDEX product_search_vector_idx ON core_product USING GIN (search_vector)"
+    )
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception:
+        return
+    schema_editor.execute(
+        "CREATE INDEX product_search_trgm_idx ON core_product "
+        "USING GIN (core_unaccent(name || ' ' || description) gin_trgm_ops)"
+    )
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_search_trgm_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS product_search_vector_idx")
+    schema_editor.execute("ALTER TABLE core_product DROP COLUMN IF EXISTS search_vector")
+    schema_editor.execute("DROP FUNCTION IF EXISTS core_unaccent(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_cart_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
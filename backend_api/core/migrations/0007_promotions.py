@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:06
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_base_price(apps, schema_editor):
+    """Sin promociones todavía, el precio efectivo es el precio base"""
+    Product = apps.get_model('core', 'Product')
+    Product.objects.update(effective_price=models.F('base_price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_low_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('discount_type', models.CharField(choices=[('percentage', 'Porcentaje'), ('fixed', 'Importe fijo')], max_length=10, verbose_name='Tipo de descuento')),
+                ('value', models.DecimalField(decimal_places=2, help_text='Porcentaje (0-100) o importe a descontar', max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Valor')),
+                ('category', models.CharField(blank=True, choices=[('deportivo', 'Calzado Deportivo'), ('utilitario', 'Calzado Utilitario')], max_length=20)),
+                ('gender', models.CharField(blank=True, choices=[('hombre', 'Hombre'), ('mujer', 'Mujer'), ('unisex', 'Unisex'), ('niño', 'Niño')], max_length=10)),
+                ('starts_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('ends_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activa')),
+                ('applied', models.BooleanField(default=False, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Promoción',
+                'verbose_name_plural': 'Promociones',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, editable=False, help_text='Precio base con la mejor promoción vigente aplicada', max_digits=10, null=True, verbose_name='Precio Efectivo'),
+        ),
+        migrations.RunPython(copy_base_price, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, editable=False, help_text='Precio base con la mejor promoción vigente aplicada', max_digits=10, verbose_name='Precio Efectivo'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price'], name='product_effective_price_idx'),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='core.product'),
+        ),
+    ]
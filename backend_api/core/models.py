@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
@@ -50,7 +51,9 @@ class Product(models.Model):
         category (CharField): Categoría del calzado (choices: DEPORTIVO, UTILITARIO)
         gender (CharField): Género objetivo (choices: HOMBRE, MUJER, UNISEX, NIÑO)
         base_price (DecimalField): Precio base (validado para ser ≥ 0)
+        effective_price (DecimalField): Precio con promociones (precalculado)
         created_at (DateTimeField): Fecha de creación (auto-generada)
+        updated_at (DateTimeField): Fecha de última modificación (auto-generada)
     
     Relaciones:
         variants (ForeignKey): Relación uno-a-muchos con el modelo Variant
@@ -103,11 +106,26 @@ class Product(models.Model):
         help_text="Precio en la moneda local (debe ser ≥ 0)"
     )
     
+    # Columna desnormalizada que mantiene core/pricing.py: los listados y el
+    # filtro por precio la leen tal cual, sin evaluar promociones por fila
+    effective_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        editable=False,
+        verbose_name="Precio Efectivo",
+        help_text="Precio base con la mejor promoción vigente aplicada"
+    )
+
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Fecha de Creación"
     )
 
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Fecha de Modificación"
+    )
+
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
@@ -115,6 +133,10 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=['name'], name='product_name_idx'),
             models.Index(fields=['category', 'gender'], name='product_category_gender_idx'),
+            # Sirve la paginación por cursor (keyset) del catálogo
+            models.Index(fields=['-created_at', 'name'], name='product_created_name_idx'),
+            # Filtro y facetas por rango de precio
+            models.Index(fields=['effective_price'], name='product_effective_price_idx'),
         ]
 
     def __str__(self):
@@ -123,8 +145,109 @@ class Product(models.Model):
 
     @property
     def current_price(self):
-        """Precio actual considerando descuentos (para futura implementación)"""
-        return self.base_price
+        """Precio actual considerando las promociones vigentes (ver core/pricing.py)"""
+        return self.effective_price
+
+
+class PromotionQuerySet(models.QuerySet):
+    def live(self, now):
+        """Promociones activas cuya ventana incluye `now`"""
+        return self.filter(Promotion.live_q(now))
+
+
+class Promotion(models.Model):
+    """
+    Descuento sobre el precio base de los productos.
+
+    Se aplica a los productos que cumplen todos los criterios informados
+    (producto, categoría, género); sin ninguno, a todo el catálogo. Solo
+    cuenta dentro de su ventana `[starts_at, ends_at)` (extremos opcionales).
+    Si varias aplican a un producto gana la que deja el precio más bajo: no
+    se acumulan.
+    """
+
+    class DiscountType(models.TextChoices):
+        PERCENTAGE = 'percentage', 'Porcentaje'
+        FIXED = 'fixed', 'Importe fijo'
+
+    name = models.CharField(max_length=100, verbose_name="Nombre")
+    discount_type = models.CharField(
+        max_length=10,
+        choices=DiscountType.choices,
+        verbose_name="Tipo de descuento"
+    )
+    value = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+        verbose_name="Valor",
+        help_text="Porcentaje (0-100) o importe a descontar"
+    )
+    product = models.ForeignKey(
+        Product,
+        related_name='promotions',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    category = models.CharField(max_length=20, choices=Product.CategoryChoices.choices, blank=True)
+    gender = models.CharField(max_length=10, choices=Product.GenderChoices.choices, blank=True)
+    starts_at = models.DateTimeField(null=True, blank=True, verbose_name="Inicio")
+    ends_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+    is_active = models.BooleanField(default=True, verbose_name="Activa")
+    # Si los precios efectivos la reflejan como vigente; `refresh_prices`
+    # recalcula las que han entrado o salido de su ventana desde entonces
+    applied = models.BooleanField(default=False, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PromotionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Promoción"
+        verbose_name_plural = "Promociones"
+        ordering = ['id']
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def live_q(now):
+        return (
+            models.Q(is_active=True)
+            & (models.Q(starts_at__isnull=True) | models.Q(starts_at__lte=now))
+            & (models.Q(ends_at__isnull=True) | models.Q(ends_at__gt=now))
+        )
+
+    def is_live(self, now):
+        return (
+            self.is_active
+            and (self.starts_at is None or self.starts_at <= now)
+            and (self.ends_at is None or self.ends_at > now)
+        )
+
+    @property
+    def scope(self):
+        """`(product_id, category, gender)`: criterios que eligen los productos"""
+        return (self.product_id, self.category, self.gender)
+
+    def clean(self):
+        if self.discount_type == self.DiscountType.PERCENTAGE and self.value is not None and self.value > 100:
+            raise ValidationError({'value': "Un porcentaje no puede superar 100."})
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': "El fin debe ser posterior al inicio."})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Alcance al cargar: al cambiarlo hay que recalcular también el anterior
+        instance._loaded_scope = (
+            instance.__dict__.get('product_id'),
+            instance.__dict__.get('category'),
+            instance.__dict__.get('gender'),
+        )
+        return instance
+
 class Variant(models.Model):
     """
     Modelo para variantes de productos (tallas/colores).
@@ -138,6 +261,7 @@ class Variant(models.Model):
     size = models.CharField(max_length=10)
     color = models.CharField(max_length=30)
     sku = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['product', 'size', 'color']
@@ -145,6 +269,12 @@ class Variant(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.size}/{self.color}"
 
+class InventoryQuerySet(models.QuerySet):
+    def low_stock(self):
+        """Items cuyo stock está en o por debajo de su umbral (índice parcial)"""
+        return self.filter(is_low_stock=True)
+
+
 class Inventory(models.Model):
     """
     Modelo para gestión de inventario.
@@ -162,6 +292,178 @@ class Inventory(models.Model):
         validators=[MinValueValidator(0)]
     )
     updated_at = models.DateTimeField(auto_now=True)
+    # Lo calcula la base de datos en cada escritura, también en update() y
+    # en los upserts de bulk_create, que no pasan por save()
+    is_low_stock = models.GeneratedField(
+        expression=models.Q(stock_quantity__lte=models.F('low_stock_threshold')),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+
+    objects = InventoryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Solo contiene las filas en stock bajo: el listado cuesta
+            # O(filas en stock bajo), no O(inventario)
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_low_stock=True),
+                name='inventory_low_stock_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Inventory for {self.variant}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Niveles al cargar: permiten detectar el cruce del umbral al guardar
+        instance._loaded_levels = (
+            instance.__dict__.get('stock_quantity'),
+            instance.__dict__.get('low_stock_threshold'),
+        )
+        return instance
+
+
+class LowStockEvent(models.Model):
+    """
+    Cruce del umbral de stock bajo de una variante (feed de cambios).
+    `is_low_stock=True`: entra en stock bajo; `False`: sale.
+    """
+    variant = models.ForeignKey(
+        Variant,
+        related_name='low_stock_events',
+        on_delete=models.CASCADE
+    )
+    is_low_stock = models.BooleanField()
+    stock_quantity = models.IntegerField()
+    low_stock_threshold = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
 
     def __str__(self):
-        return f"Inventory for {self.variant}"
\ No newline at end of file
+        state = 'entra en' if self.is_low_stock else 'sale de'
+        return f"{self.variant_id} {state} stock bajo ({self.stock_quantity}/{self.low_stock_threshold})"
+
+class Cart(models.Model):
+    """
+    Carrito persistido en el servidor.
+    Un carrito por usuario; las líneas viven en CartItem.
+    """
+    user = models.OneToOneField(
+        User,
+        related_name='cart',
+        on_delete=models.CASCADE
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Carrito de {self.user}"
+
+
+class CartItem(models.Model):
+    """Línea de carrito: una variante y la cantidad deseada"""
+    cart = models.ForeignKey(
+        Cart,
+        related_name='items',
+        on_delete=models.CASCADE
+    )
+    variant = models.ForeignKey(
+        Variant,
+        related_name='cart_items',
+        on_delete=models.CASCADE
+    )
+    quantity = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)]
+    )
+
+    class Meta:
+        unique_together = ['cart', 'variant']
+
+    def __str__(self):
+        return f"{self.quantity} x {self.variant_id}"
+
+
+class Order(models.Model):
+    """
+    Pedido confirmado en el checkout.
+    Guarda el total calculado en el momento de la compra.
+    """
+
+    class StatusChoices(models.TextChoices):
+        """Estados del ciclo de vida del pedido"""
+        PENDIENTE = 'pendiente', 'Pendiente de pago'
+        PAGADO = 'pagado', 'Pagado'
+        ENVIADO = 'enviado', 'Enviado'
+        CANCELADO = 'cancelado', 'Cancelado'
+
+    user = models.ForeignKey(
+        User,
+        related_name='orders',
+        on_delete=models.PROTECT
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDIENTE,
+        verbose_name="Estado"
+    )
+    total = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+        verbose_name="Total"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+
+    class Meta:
+        verbose_name = "Pedido"
+        verbose_name_plural = "Pedidos"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.pk} ({self.get_status_display()})"
+
+
+class OrderLine(models.Model):
+    """
+    Línea de pedido.
+    Copia SKU, nombre y precio para que el pedido no cambie si el catálogo cambia.
+    """
+    order = models.ForeignKey(
+        Order,
+        related_name='lines',
+        on_delete=models.CASCADE
+    )
+    variant = models.ForeignKey(
+        Variant,
+        related_name='order_lines',
+        null=True,
+        on_delete=models.SET_NULL
+    )
+    sku = models.CharField(max_length=50)
+    product_name = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0)]
+    )
+
+    def __str__(self):
+        return f"{self.quantity} x {self.sku}"
+
+    @property
+    def subtotal(self):
+        return self.unit_price * self.quantity
@@ -0,0 +1,74 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class AdminOffsetPagination(PageNumberPagination):
+    """
+    Paginación por número de página (OFFSET/LIMIT).
+    Solo se usa para el personal del admin, que necesita saltar a una página
+    concreta y conocer el total (`count`).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el catálogo de productos.
+
+    Usa el mismo orden que `Product.Meta.ordering` (más `id` como desempate),
+    de modo que cada página es un `WHERE created_at < cursor ... LIMIT n`
+    servido por el índice `product_created_name_idx`: el coste es el mismo
+    en la primera página que en la página 10.000.
+
+    Modo offset:
+    - Si el usuario es staff y envía `?page=N`, se delega en
+      `AdminOffsetPagination` (mantiene la navegación clásica del admin).
+    - El resto de clientes siempre recibe cursores.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', 'name', 'id')
+    offset_pagination_class = AdminOffsetPagination
+
+    def use_offset_mode(self, request):
+        """Indica si la petición debe paginarse por número de página"""
+        user = getattr(request, 'user', None)
+        return (
+            self.offset_pagination_class.page_query_param in request.query_params
+            and bool(user and user.is_staff)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.offset_paginator = None
+        if self.use_offset_mode(request):
+            self.offset_paginator = self.offset_pagination_class()
+            page = self.offset_paginator.paginate_queryset(queryset, request, view)
+            # El browsable API lee estos atributos directamente del paginador
+            self.template = self.offset_paginator.template
+            self.display_page_controls = self.offset_paginator.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_html_context()
+        return super().get_html_context()
+
+
+class LowStockCursorPagination(CursorPagination):
+    """
+    Paginación por id del conjunto de stock bajo: cada página es
+    `WHERE is_low_stock AND id > cursor ORDER BY id LIMIT n`, servida por el
+    índice parcial `inventory_low_stock_idx`.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
@@ -0,0 +1,238 @@
+"""
+Motor de promociones y precios efectivos precalculados.
+
+Una `Promotion` descuenta un porcentaje o un importe fijo a los productos de
+su alcance (un producto, una categoría, un género o una combinación; sin
+criterios, todo el catálogo) dentro de su ventana de fechas. Si varias
+aplican a un producto gana la que deja el precio más bajo; no se acumulan.
+
+El resultado se guarda en `Product.effective_price` (columna indexada), que
+es lo que leen `current_price`, los listados, el carrito, el checkout y el
+filtro y las facetas de precio: en una petición nunca se evalúan reglas.
+La columna se mantiene de forma incremental:
+- al guardar un producto (`pre_save`): su precio, con una consulta de las
+  promociones que le pueden aplicar,
+- al crear, cambiar o borrar una promoción (`post_save`/`post_delete`): los
+  productos de su alcance actual y del anterior,
+- en la importación: el bloque importado,
+- `python manage.py refresh_prices` (cron, p. ej. cada minuto): los
+  alcances de las promociones que han entrado o salido de su ventana desde
+  la última recalculación (`Promotion.applied`). `--full` recalcula todo.
+
+Recalcular un conjunto de productos (`reprice`) lee solo sus columnas de
+precio, evalúa las promociones vigentes en memoria (O(1) por producto: se
+precalcula el mejor descuento de cada segmento categoría/género) y escribe
+solo los precios que cambian, con un `UPDATE ... WHERE id IN (...)` por
+precio resultante en lugar de una fila por producto.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import signals
+from .models import Product, Promotion
+
+ZERO = Decimal('0')
+HUNDRED = Decimal('100')
+CENT = Decimal('0.01')
+
+# Ids por sentencia UPDATE
+UPDATE_CHUNK = 500
+# Filas leídas por bloque del cursor
+READ_CHUNK = 5000
+
+
+def discounted(base_price, percentage=ZERO, fixed=ZERO):
+    """
+    Precio con el mejor de los dos descuentos (porcentaje e importe fijo);
+    nunca negativo, redondeado al céntimo.
+    """
+    price = base_price
+    if percentage:
+        price = min(price, (base_price * (HUNDRED - min(percentage, HUNDRED)) / HUNDRED).quantize(CENT, ROUND_HALF_UP))
+    if fixed:
+        price = min(price, max(base_price - fixed, ZERO))
+    return price
+
+
+class Discount:
+    """Mejor porcentaje y mejor importe fijo de un conjunto de promociones"""
+    __slots__ = ('percentage', 'fixed')
+
+    def __init__(self, percentage=ZERO, fixed=ZERO):
+        self.percentage = percentage
+        self.fixed = fixed
+
+    def add(self, promotion):
+        if promotion.discount_type == Promotion.DiscountType.PERCENTAGE:
+            self.percentage = max(self.percentage, promotion.value)
+        else:
+            self.fixed = max(self.fixed, promotion.value)
+
+    def merge(self, other):
+        return Discount(max(self.percentage, other.percentage), max(self.fixed, other.fixed))
+
+
+class PromotionIndex:
+    """
+    Promociones vigentes organizadas para calcular precios en memoria: las de
+    un producto concreto por id y el resto por segmento `(categoría, género)`
+    ('' = cualquiera), combinadas una sola vez por segmento.
+    """
+
+    def __init__(self, promotions):
+        self.by_product = defaultdict(list)
+        self.by_segment = defaultdict(Discount)
+        for promotion in promotions:
+            if promotion.product_id is not None:
+                self.by_product[promotion.product_id].append(promotion)
+            else:
+                self.by_segment[(promotion.category, promotion.gender)].add(promotion)
+        self._segments = {}
+        self._prices = {}
+
+    def segment(self, category, gender):
+        """Mejor descuento de las promociones sin producto que aplican al segmento"""
+        key = (category, gender)
+        if key not in self._segments:
+            discount = Discount()
+            for candidate in (key, (category, ''), ('', gender), ('', '')):
+                if candidate in self.by_segment:
+                    discount = discount.merge(self.by_segment[candidate])
+            self._segments[key] = discount
+        return self._segments[key]
+
+    def price(self, pk, category, gender, base_price):
+        discount = self.segment(category, gender)
+        own = self.by_product.get(pk)
+        if own:
+            # Copia: el descuento del segmento es compartido
+            discount = discount.merge(Discount())
+            for promotion in own:
+                if promotion.category in ('', category) and promotion.gender in ('', gender):
+                    discount.add(promotion)
+            return discounted(base_price, discount.percentage, discount.fixed)
+        # Muchos productos comparten segmento y precio base
+        key = (category, gender, base_price)
+        if key not in self._prices:
+            self._prices[key] = discounted(base_price, discount.percentage, discount.fixed)
+        return self._prices[key]
+
+
+def scope_q(scope):
+    """Productos del alcance `(product_id, category, gender)`; `Q()` = todos"""
+    product_id, category, gender = scope
+    q = Q()
+    if product_id is not None:
+        q &= Q(pk=product_id)
+    if category:
+        q &= Q(category=category)
+    if gender:
+        q &= Q(gender=gender)
+    return q
+
+
+def price_for(product, now=None):
+    """Precio efectivo de una instancia (guardada o no), con una consulta"""
+    now = now or timezone.now()
+    target = Q(product__isnull=True)
+    if product.pk is not None:
+        target |= Q(product_id=product.pk)
+    promotions = Promotion.objects.live(now).filter(
+        target,
+        category__in=('', product.category),
+        gender__in=('', product.gender),
+    )
+    index = PromotionIndex(promotions)
+    return index.price(product.pk, product.category, product.gender, product.base_price)
+
+
+def reprice(queryset=None, now=None):
+    """
+    Recalcula `effective_price` de los productos de `queryset` (todos por
+    defecto) y guarda los que cambian. Devuelve cuántos han cambiado.
+    """
+    now = now or timezone.now()
+    index = PromotionIndex(Promotion.objects.live(now))
+    queryset = Product.objects.all() if queryset is None else queryset
+    rows = (
+        queryset.order_by()
+        .values_list('pk', 'category', 'gender', 'base_price', 'effective_price')
+        .iterator(chunk_size=READ_CHUNK)
+    )
+    changes = defaultdict(list)
+    for pk, category, gender, base_price, current in rows:
+        price = index.price(pk, category, gender, base_price)
+        if price != current:
+            changes[price].append(pk)
+    if not changes:
+        return 0
+
+    with transaction.atomic():
+        for price, pks in changes.items():
+            for start in range(0, len(pks), UPDATE_CHUNK):
+                Product.objects.filter(pk__in=pks[start:start + UPDATE_CHUNK]).update(
+                    effective_price=price, updated_at=now,
+                )
+        signals.invalidate_catalog('product')
+    return sum(len(pks) for pks in changes.values())
+
+
+def reprice_scopes(scopes, now=None):
+    """Recalcula los productos de varios alcances (su unión)"""
+    q = Q(pk__in=[])
+    for scope in scopes:
+        condition = scope_q(scope)
+        if not condition:
+            return reprice(now=now)
+        q |= condition
+    return reprice(Product.objects.filter(q), now=now)
+
+
+def promotion_changed(promotion, deleted=False, now=None):
+    """Recalcula el alcance actual y el anterior de una promoción"""
+    now = now or timezone.now()
+    scopes = {promotion.scope}
+    loaded = getattr(promotion, '_loaded_scope', None)
+    if loaded is not None:
+        scopes.add(loaded)
+    changed = reprice_scopes(scopes, now)
+    if not deleted:
+        applied = promotion.is_live(now)
+        if applied != promotion.applied:
+            Promotion.objects.filter(pk=promotion.pk).update(applied=applied)
+            promotion.applied = applied
+        promotion._loaded_scope = promotion.scope
+    return changed
+
+
+def refresh(now=None):
+    """
+    Recalcula los alcances de las promociones que han entrado o salido de su
+    ventana (o cambiado de estado sin pasar por `save()`) desde la última
+    vez. Devuelve `(promociones, productos cambiados)`.
+    """
+    now = now or timezone.now()
+    live = Promotion.live_q(now)
+    stale = list(Promotion.objects.filter((live & Q(applied=False)) | (~live & Q(applied=True))))
+    if not stale:
+        return 0, 0
+    with transaction.atomic():
+        changed = reprice_scopes({promotion.scope for promotion in stale}, now)
+        Promotion.objects.filter(live, pk__in=[p.pk for p in stale]).update(applied=True)
+        Promotion.objects.filter(~live, pk__in=[p.pk for p in stale]).update(applied=False)
+    return len(stale), changed
+
+
+def rebuild(now=None):
+    """Recalcula todo el catálogo y marca el estado de todas las promociones"""
+    now = now or timezone.now()
+    live = Promotion.live_q(now)
+    with transaction.atomic():
+        changed = reprice(now=now)
+        Promotion.objects.filter(live, applied=False).update(applied=True)
+        Promotion.objects.filter(~live, applied=True).update(applied=False)
+    return changed
@@ -0,0 +1,316 @@
+"""
+Canal push de cambios de stock (Server-Sent Events).
+
+`GET /api/stream/inventory/?product=1,2&category=deportivo` mantiene abierta
+una respuesta `text/event-stream` y envía un evento `stock` por cada cambio
+confirmado de `Inventory`:
+
+    id: 42
+    event: stock
+    data: {"variant": 7, "product": 3, "category": "deportivo",
+           "stock_quantity": 4, "updated_at": "..."}
+
+Sin filtros se reciben todos los cambios; con `product` y/o `category`, los
+que coincidan con cualquiera de ellos. Cada `HEARTBEAT` segundos se envía un
+comentario para mantener viva la conexión a través de proxies.
+
+Flujo:
+- Las escrituras de stock (`post_save` de `Inventory`, `core.stock`, la
+  importación) llaman a `stock_changed(variant_ids)`, que se difiere a
+  `transaction.on_commit`: solo se publica lo confirmado, y una transacción
+  revertida no publica nada.
+- Al confirmar, si hay suscriptores, se leen los datos actuales de esas
+  variantes (una consulta por commit) y se publican en el broker.
+- El broker reparte por tema (`*`, `product:<id>`, `category:<c>`): el coste
+  de publicar depende de los suscriptores interesados, no de todos. Las
+  entregas se agrupan por event loop (una llamada `call_soon_threadsafe`
+  por loop y lote), así miles de conexiones en un worker ASGI no suponen
+  miles de despertares.
+
+Reconexión: el navegador reenvía `Last-Event-ID` y se reenvían los eventos
+posteriores que sigan en el búfer (`OPTIONS['replay']`). Si ya no están, se envía un
+evento `reset` y el cliente debe recargar el stock por la API normal. Un
+cliente que no consume (cola llena) se desconecta con `reset`.
+
+Requiere ASGI (`uvicorn backend_api.asgi:application`): bajo WSGI cada
+conexión ocuparía un hilo, así que se responde 501.
+
+Backends (`settings.PUSH`):
+- `InMemoryBroker`: en memoria del proceso. Para desarrollo, tests o un
+  único worker; con varios workers cada uno solo ve sus propias escrituras.
+  Otro backend (p. ej. sobre Redis pub/sub) solo tiene que implementar
+  `publish`, `subscribe`, `unsubscribe`, `replay` y `has_subscribers`.
+
+Configuración:
+    {
+        'BACKEND': 'core.push.InMemoryBroker',
+        'OPTIONS': {'replay': 1000, 'queue_size': 1000},
+        'ENABLED': True,
+        'HEARTBEAT': 15,
+    }
+"""
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+
+from . import metrics
+from .models import Inventory
+from .renderers import get_backend
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'core.push.InMemoryBroker',
+    'OPTIONS': {},
+    'ENABLED': True,
+    'HEARTBEAT': 15,
+}
+
+ALL = '*'
+
+
+def topics_for(event):
+    return (ALL, f"product:{event['product']}", f"category:{event['category']}")
+
+
+class Subscription:
+    """Cola de un cliente conectado, ligada al event loop que la consume"""
+
+    def __init__(self, topics, queue_size):
+        self.topics = tuple(topics) or (ALL,)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def matches(self, event):
+        return ALL in self.topics or any(topic in self.topics for topic in topics_for(event))
+
+    def put(self, event):
+        """Se ejecuta en el loop del suscriptor"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: se vacía su cola y se corta con `reset`
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class InMemoryBroker:
+    """Broker en memoria del proceso, seguro entre hilos"""
+
+    def __init__(self, replay=1000, queue_size=1000):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._sequence = 0
+        self._recent = deque(maxlen=replay)
+
+    def has_subscribers(self):
+        return bool(self._topics)
+
+    def subscribe(self, topics):
+        subscription = Subscription(topics, self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, events):
+        """Asigna ids, guarda en el búfer y reparte. Se llama desde cualquier hilo"""
+        by_loop = {}
+        with self._lock:
+            for event in events:
+                self._sequence += 1
+                event = {**event, 'id': self._sequence}
+                self._recent.append(event)
+                interested = set()
+                for topic in topics_for(event):
+                    interested |= self._topics.get(topic, set())
+                for subscription in interested:
+                    by_loop.setdefault(subscription.loop, []).append((subscription, event))
+        for loop, deliveries in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(deliver, deliveries)
+            except RuntimeError:
+                # El loop ya se cerró: sus suscripciones se limpian al salir
+                pass
+        metrics.inc('push_events_published_total', value=len(events))
+        return len(by_loop)
+
+    def replay(self, subscription, last_id):
+        """
+        Eventos posteriores a `last_id` para el suscriptor, o `None` si el
+        búfer ya no llega tan atrás (el cliente debe recargar).
+        """
+        with self._lock:
+            recent = list(self._recent)
+            sequence = self._sequence
+        if last_id == sequence:
+            return []
+        # Id de otro proceso o de antes de un reinicio: no se puede saber qué se perdió
+        if last_id > sequence or not recent or recent[0]['id'] > last_id + 1:
+            return None
+        return [event for event in recent if event['id'] > last_id and subscription.matches(event)]
+
+
+def deliver(deliveries):
+    for subscription, event in deliveries:
+        subscription.put(event)
+
+
+class Push:
+    """Fachada: configuración y broker"""
+
+    def __init__(self):
+        self._broker = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return {**DEFAULT_SETTINGS, **getattr(settings, 'PUSH', {})}
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    @property
+    def broker(self):
+        if self._broker is None:
+            with self._lock:
+                if self._broker is None:
+                    config = self.config
+                    broker_class = import_string(config['BACKEND'])
+                    self._broker = broker_class(**config['OPTIONS'])
+        return self._broker
+
+    def reset(self):
+        with self._lock:
+            self._broker = None
+
+
+push = Push()
+
+
+def inventory_events(variant_ids):
+    rows = Inventory.objects.filter(variant_id__in=variant_ids).values_list(
+        'variant_id', 'variant__product_id', 'variant__product__category',
+        'stock_quantity', 'updated_at',
+    ).order_by('variant_id')
+    return [
+        {
+            'variant': variant_id,
+            'product': product_id,
+            'category': category,
+            'stock_quantity': stock_quantity,
+            'updated_at': updated_at,
+        }
+        for variant_id, product_id, category, stock_quantity, updated_at in rows
+    ]
+
+
+def publish_inventory(variant_ids):
+    broker = push.broker
+    if not broker.has_subscribers():
+        return
+    events = inventory_events(variant_ids)
+    if events:
+        broker.publish(events)
+
+
+def stock_changed(variant_ids):
+    """Publica el stock de `variant_ids` cuando se confirme la transacción en curso"""
+    if not push.enabled:
+        return
+    variant_ids = list(variant_ids)
+    if variant_ids:
+        transaction.on_commit(lambda: publish_inventory(variant_ids))
+
+
+def parse_topics(request):
+    topics = []
+    for name in ('product', 'category'):
+        for value in request.GET.get(name, '').split(','):
+            value = value.strip()
+            if value:
+                topics.append(f'{name}:{value}')
+    return topics
+
+
+def format_event(event, name='stock'):
+    data = get_backend().dumps({k: v for k, v in event.items() if k != 'id'}).decode()
+    return f"id: {event['id']}\nevent: {name}\ndata: {data}\n\n"
+
+
+def last_event_id(request):
+    raw = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
+async def event_stream(topics, last_id, heartbeat):
+    broker = push.broker
+    subscription = broker.subscribe(topics)
+    try:
+        yield 'retry: 3000\n\n'
+        sent = 0
+        if last_id is not None:
+            missed = broker.replay(subscription, last_id)
+            if missed is None:
+                yield 'event: reset\ndata: {}\n\n'
+            else:
+                for event in missed:
+                    sent = event['id']
+                    yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event is None:
+                yield 'event: reset\ndata: {}\n\n'
+                return
+            # Publicado entre la suscripción y el replay: ya se envió
+            if event['id'] <= sent:
+                continue
+            yield format_event(event)
+    finally:
+        # También al desconectarse el cliente (Django cancela el generador)
+        broker.unsubscribe(subscription)
+
+
+@require_safe
+async def inventory_stream(request):
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('El stream requiere un servidor ASGI', status=501)
+    config = push.config
+    if not config['ENABLED']:
+        return HttpResponse('Push desactivado', status=503)
+    response = StreamingHttpResponse(
+        event_stream(parse_topics(request), last_event_id(request), config['HEARTBEAT']),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx: no acumular la respuesta
+    response['X-Accel-Buffering'] = 'no'
+    return response
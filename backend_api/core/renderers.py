@@ -0,0 +1,221 @@
+"""
+Renderer y parser JSON con backend intercambiable.
+
+El `JSONRenderer` de DRF usa el módulo `json` de la biblioteca estándar y
+pasa por `JSONEncoder.default()` (Python) para cada `Decimal`, fecha o UUID.
+`FastJSONRenderer`/`FastJSONParser` delegan en el backend más rápido
+disponible:
+- `orjson`: codifica en C `datetime`, `date`, `time` y `UUID`; solo
+  `Decimal` y tipos raros (cadenas lazy, querysets...) pasan por el
+  `default()` de DRF.
+- `msgspec`: codifica en C todo menos `Decimal`, que se pasa antes a
+  `float` como hace DRF (`msgspec` no deja redefinir un tipo que ya
+  soporta y lo escribiría con sus ceros: `100.00` en vez de `100.0`).
+- `json`: la biblioteca estándar, con el mismo encoder de DRF (respaldo si
+  no hay acelerador instalado).
+
+La salida es la misma que la de DRF: JSON compacto en UTF-8, fechas UTC con
+`Z`, `Decimal` como número, `\\u2028`/`\\u2029` escapados. Solo puede variar
+la notación de floats con exponente (`1e+16` frente a `1e16`), que es el
+mismo número. Con `; indent=N` (o desde el browsable API) se usa siempre la
+biblioteca estándar.
+
+Selección:
+- global: `settings.JSON_BACKEND = {'BACKEND': 'auto'}` (`'orjson'`,
+  `'msgspec'`, `'json'`; `'auto'` elige el primero instalado),
+- por vista: `renderer_classes = [OrjsonRenderer]` (o `MsgspecRenderer`,
+  `StdlibJSONRenderer`), igual con `parser_classes`.
+"""
+import json
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'auto',
+}
+
+AUTO_ORDER = ('orjson', 'msgspec', 'json')
+
+# Separadores JS: JSON válido pero no JavaScript válido dentro de <script>
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+drf_default = encoders.JSONEncoder().default
+
+
+def escape_separators(content):
+    for raw, escaped in LINE_SEPARATORS:
+        if raw in content:
+            content = content.replace(raw, escaped)
+    return content
+
+
+class StdlibBackend:
+    """Biblioteca estándar con el encoder de DRF (mismo resultado que `JSONRenderer`)"""
+    name = 'json'
+
+    def dumps(self, data):
+        content = json.dumps(
+            data, cls=encoders.JSONEncoder, ensure_ascii=False,
+            allow_nan=False, separators=(',', ':'),
+        )
+        return escape_separators(content.encode())
+
+    def loads(self, content):
+        return json.loads(content, parse_constant=reject_constant)
+
+
+def reject_constant(value):
+    raise ValueError(f'Invalid JSON constant: {value}')
+
+
+class OrjsonBackend:
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+        self.options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        self.fallback = StdlibBackend()
+
+    def dumps(self, data):
+        try:
+            content = self.orjson.dumps(data, default=drf_default, option=self.options)
+        except self.orjson.JSONEncodeError:
+            # Enteros de más de 64 bits o recursión profunda: lo resuelve `json`
+            return self.fallback.dumps(data)
+        return escape_separators(content)
+
+    def loads(self, content):
+        return self.orjson.loads(content)
+
+
+def coerce_decimals(data):
+    """Copia de `data` con los `Decimal` como `float`, igual que el encoder de DRF"""
+    if isinstance(data, Decimal):
+        return float(data)
+    if isinstance(data, dict):
+        return {key: coerce_decimals(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [coerce_decimals(value) for value in data]
+    return data
+
+
+class MsgspecBackend:
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+
+        self.msgspec = msgspec
+        self.encoder = msgspec.json.Encoder(enc_hook=drf_default)
+        self.decoder = msgspec.json.Decoder()
+        self.fallback = StdlibBackend()
+
+    def dumps(self, data):
+        try:
+            content = self.encoder.encode(coerce_decimals(data))
+        except (TypeError, OverflowError, self.msgspec.EncodeError):
+            return self.fallback.dumps(data)
+        return escape_separators(content)
+
+    def loads(self, content):
+        try:
+            return self.decoder.decode(content)
+        except self.msgspec.DecodeError as exc:
+            # No es un ValueError: el parser lo convierte en un 400 como los demás
+            raise ValueError(str(exc)) from exc
+
+
+BACKENDS = {
+    'orjson': OrjsonBackend,
+    'msgspec': MsgspecBackend,
+    'json': StdlibBackend,
+}
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'JSON_BACKEND', {})}
+
+
+def get_backend(name=None):
+    """
+    Backend por nombre (o el configurado). Con `'auto'` se usa el primero
+    que se pueda importar; un backend pedido explícitamente que no está
+    instalado lanza `ImportError`.
+    """
+    name = name or get_config()['BACKEND']
+    backend = _backends.get(name)
+    if backend is not None:
+        return backend
+    with _lock:
+        if name == 'auto':
+            for candidate in AUTO_ORDER:
+                try:
+                    backend = BACKENDS[candidate]()
+                except ImportError:
+                    continue
+                break
+        else:
+            backend = BACKENDS[name]()
+        _backends[name] = backend
+    return backend
+
+
+def reset_backends():
+    """Olvida los backends elegidos (p. ej. tras cambiar `JSON_BACKEND`)"""
+    with _lock:
+        _backends.clear()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` de DRF con backend acelerado; `backend = None` usa la configuración"""
+    backend = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return get_backend(self.backend).dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """`JSONParser` de DRF con backend acelerado (cuerpo en UTF-8, sin NaN/Infinity)"""
+    backend = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return get_backend(self.backend).loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class OrjsonRenderer(FastJSONRenderer):
+    backend = 'orjson'
+
+
+class MsgspecRenderer(FastJSONRenderer):
+    backend = 'msgspec'
+
+
+class StdlibJSONRenderer(FastJSONRenderer):
+    backend = 'json'
+
+
+class OrjsonParser(FastJSONParser):
+    backend = 'orjson'
+
+
+class MsgspecParser(FastJSONParser):
+    backend = 'msgspec'
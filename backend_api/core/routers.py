@@ -0,0 +1,221 @@
+"""
+Enrutado primario/réplicas con lectura de las propias escrituras.
+
+`PrimaryReplicaRouter` envía a una réplica (`settings.DATABASE_REPLICAS`) solo
+las lecturas hechas dentro de `replica_reads()`; el resto (escrituras,
+`select_for_update`, autenticación, comandos) sigue en `default`. Los viewsets
+del catálogo activan las réplicas con `ReplicaReadMixin` para sus acciones
+seguras (`replica_actions`).
+
+Tras una escritura, el cliente queda fijado al primario durante
+`REPLICA_PIN_SECONDS` para no leer datos anteriores a su propio cambio
+(el retraso de replicación):
+- dentro de la misma petición, en cuanto el router ve una escritura;
+- en las siguientes, con la cookie `REPLICA_PIN_COOKIE` (navegador/sesión) y,
+  para usuarios autenticados (JWT, sin cookies), con una marca por usuario en
+  la caché compartida. Lo gestiona `ReplicaPinMiddleware`.
+
+Las respuestas leídas de una réplica se guardan en la caché del catálogo con
+`CATALOG_CACHE['REPLICA_TIMEOUT']`: una réplica atrasada podría rellenar la
+clave de la versión nueva con datos anteriores a la escritura.
+
+Sin réplicas configuradas todo va a `default` y el router no hace nada.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def pin_cookie():
+    return getattr(settings, 'REPLICA_PIN_COOKIE', 'pin_primary')
+
+
+def pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def user_pin_key(user_id):
+    return f'replica:pin:user:{user_id}'
+
+
+@contextmanager
+def request_context(pinned=False):
+    """
+    Estado de enrutado de una petición. Los contextvars de un hilo WSGI
+    sobreviven entre peticiones: sin esto una escritura fijaría el hilo entero.
+    """
+    tokens = (_use_replica.set(False), _pinned.set(pinned), _wrote.set(False))
+    try:
+        yield
+    finally:
+        _use_replica.reset(tokens[0])
+        _pinned.reset(tokens[1])
+        _wrote.reset(tokens[2])
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+@contextmanager
+def replica_reads():
+    """Permite que las lecturas del bloque vayan a una réplica"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_view(view):
+    """Decorador para vistas de Django (también `async def`) de solo lectura"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def reading_from_replica():
+    """True si las lecturas en curso van a una réplica"""
+    return _use_replica.get() and not _pinned.get() and bool(get_replicas())
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _pinned.get():
+            replicas = get_replicas()
+            if replicas:
+                return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # Lo que se lea después en esta petición debe ver la escritura
+        _pinned.set(True)
+        _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Fija el cliente al primario durante la ventana posterior a una escritura"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_context(pinned=self.cookie_pinned(request)):
+            response = self.get_response(request)
+            self.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with request_context(pinned=self.cookie_pinned(request)):
+            response = await self.get_response(request)
+            self.finish(request, response)
+        return response
+
+    def finish(self, request, response):
+        if wrote_to_primary() and request.method not in SAFE_METHODS and response.status_code < 400:
+            self.pin(request, response)
+
+    def cookie_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(pin_cookie(), 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, request, response):
+        seconds = pin_seconds()
+        response.set_cookie(
+            pin_cookie(), str(time.time() + seconds), max_age=seconds,
+            httponly=True, samesite='Lax',
+        )
+        # DRF copia el usuario autenticado (JWT) al HttpRequest
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_cache().set(user_pin_key(user.pk), 1, seconds)
+
+
+class ReplicaReadMixin:
+    """
+    Para viewsets: las acciones de `replica_actions` leen de una réplica si la
+    petición es de lectura y el cliente no está fijado al primario.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def use_replica(self, request):
+        if request.method not in SAFE_METHODS or self.action not in self.replica_actions:
+            return False
+        if not get_replicas() or is_pinned():
+            return False
+        user = request.user
+        if user.is_authenticated and pin_cache().get(user_pin_key(user.pk)):
+            pin_to_primary()
+            return False
+        return True
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _use_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.use_replica(request):
+            _use_replica.set(True)
@@ -0,0 +1,245 @@
+"""
+Búsqueda full-text de productos con ranking.
+
+Dos backends con la misma interfaz (`search(query, category, gender, limit)`
+devuelve `[(product_id, score)]` ordenado por relevancia):
+
+- `PostgresSearchBackend`: usa la columna generada `core_product.search_vector`
+  (tsvector con peso A para `name` y B para `description`) y su índice GIN,
+  creados por la migración 0005 (sobre el texto sin acentos). La columna la
+  mantiene PostgreSQL en cada INSERT/UPDATE, incluidos los `bulk_create` del
+  importador. Los términos se buscan por prefijo (`runn:*`) y, si no hay
+  resultados y `pg_trgm` está instalado, se reintenta por similitud de
+  trigramas (tolerancia a errores).
+
+- `InMemorySearchBackend`: índice invertido en memoria del proceso, para
+  SQLite y tests. Se reconstruye cuando cambia la versión de caché de
+  `product` (ver `core.cache`), así que refleja altas y cambios sin señales
+  propias. Soporta prefijos y corrige términos a distancia de edición ≤ 2.
+
+Los dos normalizan igual: minúsculas y sin acentos ('calzon' encuentra
+'calzón'). La consulta pasa por `tokenize()` en ambos; en PostgreSQL el
+texto indexado pasa por `core_unaccent()` (extensión `unaccent`, o
+`translate()` si no se puede instalar; ver migración 0005).
+"""
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .cache import catalog_cache
+from .models import Product
+
+TOKEN_RE = re.compile(r'\w+')
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def normalize(text):
+    """Minúsculas y sin acentos: 'Niño Zapatilla' -> 'nino zapatilla'"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein acotado: devuelve `limit + 1` si se supera el límite"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def max_typos(term):
+    """Errores tolerados según la longitud del término"""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 6 else 2
+
+
+class InMemorySearchBackend:
+    """Índice invertido en memoria con ranking tipo TF-IDF por campo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self.postings = {}
+        self.vocabulary = []
+        self.facets = {}
+        self.size = 0
+
+    def build(self):
+        postings = defaultdict(dict)
+        facets = {}
+        rows = Product.objects.values_list('id', 'name', 'description', 'category', 'gender')
+        for product_id, name, description, category, gender in rows.iterator(chunk_size=2000):
+            facets[product_id] = (category, gender)
+            weights = defaultdict(float)
+            for token in tokenize(name):
+                weights[token] += NAME_WEIGHT
+            for token in tokenize(description):
+                weights[token] += DESCRIPTION_WEIGHT
+            for token, weight in weights.items():
+                postings[token][product_id] = weight
+        self.postings = dict(postings)
+        self.vocabulary = sorted(self.postings)
+        self.facets = facets
+        self.size = len(facets)
+
+    def ensure_current(self):
+        version = catalog_cache.backend.get_versions(['product'])[0]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.build()
+                    self._version = version
+
+    def expand(self, term):
+        """Términos del vocabulario que casan con `term` (prefijo o con errores)"""
+        matches = {}
+        index = bisect_left(self.vocabulary, term)
+        while index < len(self.vocabulary) and self.vocabulary[index].startswith(term):
+            candidate = self.vocabulary[index]
+            # el término exacto puntúa más que las extensiones por prefijo
+            matches[candidate] = 1.0 if candidate == term else 0.8
+            index += 1
+        if matches:
+            return matches
+        limit = max_typos(term)
+        if limit:
+            for candidate in self.vocabulary:
+                distance = edit_distance(term, candidate[:len(term) + limit], limit)
+                if distance <= limit:
+                    matches[candidate] = 0.6 / distance if distance else 0.8
+        return matches
+
+    def search(self, query, category=None, gender=None, limit=20):
+        self.ensure_current()
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(float)
+            for candidate, quality in self.expand(term).items():
+                postings = self.postings[candidate]
+                idf = math.log(1 + self.size / len(postings))
+                for product_id, weight in postings.items():
+                    term_scores[product_id] = max(term_scores[product_id], quality * weight * idf)
+            # Todos los términos deben aparecer (AND)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: scores[pid] + s for pid, s in term_scores.items() if pid in scores}
+            if not scores:
+                return []
+
+        results = [
+            (product_id, score)
+            for product_id, score in scores.items()
+            if (category is None or self.facets[product_id][0] == category)
+            and (gender is None or self.facets[product_id][1] == gender)
+        ]
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
+
+
+class PostgresSearchBackend:
+    """Búsqueda sobre la columna generada `search_vector` (tsvector + GIN)"""
+
+    def __init__(self):
+        self._has_trigram = None
+
+    def has_trigram(self):
+        if self._has_trigram is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                self._has_trigram = cursor.fetchone() is not None
+        return self._has_trigram
+
+    def filtered(self, category, gender):
+        queryset = Product.objects.all()
+        if category:
+            queryset = queryset.filter(category=category)
+        if gender:
+            queryset = queryset.filter(gender=gender)
+        return queryset
+
+    def fulltext(self, terms, category=None, gender=None):
+        """Productos que contienen todos los términos (por prefijo), con su `score`"""
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return self.filtered(category, gender).annotate(
+            score=RawSQL("ts_rank_cd(search_vector, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField()),
+        ).filter(
+            RawSQL("search_vector @@ to_tsquery('simple', %s)", (tsquery,), output_field=BooleanField()),
+        )
+
+    def similar(self, terms, category=None, gender=None):
+        """Productos parecidos por trigramas (misma expresión que su índice, migración 0005)"""
+        text = ' '.join(terms)
+        return self.filtered(category, gender).annotate(
+            score=RawSQL(
+                "word_similarity(%s, core_unaccent(name || ' ' || description))", (text,),
+                output_field=FloatField(),
+            ),
+        ).filter(
+            RawSQL("%s <%% core_unaccent(name || ' ' || description)", (text,), output_field=BooleanField()),
+        )
+
+    def search(self, query, category=None, gender=None, limit=20):
+        # Misma normalización que el backend en memoria (minúsculas, sin acentos)
+        terms = tokenize(query)
+        if not terms:
+            return []
+        results = list(self.fulltext(terms, category, gender).order_by('-score', 'id').values_list('id', 'score')[:limit])
+        if results or not self.has_trigram():
+            return results
+        return list(self.similar(terms, category, gender).order_by('-score', 'id').values_list('id', 'score')[:limit])
+
+
+_backend = None
+
+
+def get_search_backend():
+    """Backend según `settings.SEARCH_BACKEND` ('auto', 'postgres' o 'memory')"""
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if choice == 'auto':
+            choice = 'postgres' if connection.vendor == 'postgresql' else 'memory'
+        _backend = PostgresSearchBackend() if choice == 'postgres' else InMemorySearchBackend()
+    return _backend
+
+
+def reset_search_backend():
+    """Descarta el backend (p. ej. en tests o tras cambiar la configuración)"""
+    global _backend
+    _backend = None
+
+
+def search_products(query, category=None, gender=None, limit=20):
+    """Busca productos y devuelve `[(product_id, score)]` por relevancia"""
+    return get_search_backend().search(query, category=category, gender=gender, limit=limit)
@@ -1,7 +1,9 @@
 # users/serializers.py
+from decimal import Decimal
+from itertools import zip_longest
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import User, Product, Variant, Inventory
+from .models import User, Product, Variant, Inventory, Cart, CartItem, Order, OrderLine, LowStockEvent
 from rest_framework import serializers
 from django.contrib.auth.models import Group, Permission
 from .models import User  # Asegúrate de importar tu modelo User personalizado
@@ -10,10 +12,17 @@ from django.contrib.auth.hashers import make_password
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import generics, permissions, status
+from django.db.models import Q
+from django.utils import timezone
+from .bulk import BulkListSerializer, chunks, invalidate
+from .fieldsets import SparseFieldsetMixin
+from .low_stock import record_crossings
+from .push import stock_changed
+from .signals import invalidate_catalog
 
 User = get_user_model()
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializador para grupos de usuarios.
     Muestra solo información básica del grupo para evitar exponer datos sensibles.
     """
@@ -21,7 +30,7 @@ class GroupSerializer(serializers.ModelSerializer):
         model = Group
         fields = ['id', 'name']
 
-class PermissionSerializer(serializers.ModelSerializer):
+class PermissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializador para permisos de usuario.
     Incluye el código de nombre (codename) que se usa para verificar permisos programáticamente.
     """
@@ -29,7 +38,7 @@ class PermissionSerializer(serializers.ModelSerializer):
         model = Permission
         fields = ['id', 'name', 'codename']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializador principal para usuarios con todas las funcionalidades necesarias:
     - Registro de nuevos usuarios con validación de contraseña
     - Visualización segura de información de usuario
@@ -155,18 +164,12 @@ class UserLoginSerializer(serializers.Serializer):
                 {"email": "Formato de email inválido."},
                 code='invalid_email'
             )
-        print("Email recibido:", email)
-        print("Password recibido:", password)  # ¡No lo hagas en producción!
-        print("Usuario existe:", User.objects.filter(email=email).exists())
-        
-        # Autenticación con Django
+        # Una sola consulta por intento (ver core.backend.EmailAuthBackend)
         user = authenticate(
             request=self.context.get('request'),
-            email=attrs.get('email'),
-            password=attrs.get('password')
+            email=email,
+            password=password
         )
-        print("Usuario autenticado:", user)  # Agrega esto
-        print("Usuario activo:", user.is_active if user else "No user")  # Y esto
 
         if not user:
             raise serializers.ValidationError(
@@ -178,7 +181,7 @@ class UserLoginSerializer(serializers.Serializer):
         attrs['user'] = user
         return attrs
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_display = serializers.CharField(
         source='get_category_display', 
         read_only=True,
@@ -189,6 +192,7 @@ class ProductSerializer(serializers.ModelSerializer):
         read_only=True,
         help_text="Nombre legible del género objetivo"
     )
+    field_columns = {'current_price': ('effective_price',)}
     
     class Meta:
         model = Product
@@ -206,7 +210,7 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'current_price']
 
-class VariantSerializer(serializers.ModelSerializer):
+class VariantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(
         source='product.name',
         read_only=True,
@@ -227,12 +231,14 @@ class VariantSerializer(serializers.ModelSerializer):
             'product': {'write_only': True}
         }
 
-class InventorySerializer(serializers.ModelSerializer):
+class InventorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     variant_info = serializers.CharField(
         source='variant.__str__',
         read_only=True,
         help_text="Información de la variante"
     )
+    # Variant.__str__
+    field_columns = {'variant_info': ('variant__product__name', 'variant__size', 'variant__color')}
     
     class Meta:
         model = Inventory
@@ -264,4 +270,339 @@ class InventorySerializer(serializers.ModelSerializer):
 
 #     def create(self, validated_data):
 #         user = User.objects.create_user(**validated_data)
-# 
\ No newline at end of file
+# 
+
+class CatalogStockSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Stock de una variante embebido en la representación del catálogo"""
+    class Meta:
+        model = Inventory
+        fields = [
+            'stock_quantity',
+            'low_stock_threshold',
+            'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class CatalogVariantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Variante con su stock, sin volver a incluir el producto padre"""
+    inventory = CatalogStockSerializer(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Variant
+        fields = [
+            'id',
+            'size',
+            'color',
+            'sku',
+            'inventory'
+        ]
+        read_only_fields = fields
+
+
+class CatalogProductSerializer(ProductSerializer):
+    """
+    Representación anidada producto → variantes → stock.
+
+    Pensado para listados del catálogo: requiere que el queryset venga con
+    `CATALOG_PREFETCH` aplicado (ver `ProductViewSet.get_queryset`), de lo
+    contrario cada producto dispara consultas adicionales.
+    """
+    variants = CatalogVariantSerializer(many=True, read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['variants']
+
+
+class StockMovementSerializer(serializers.Serializer):
+    """Cantidad a reservar o liberar de una variante"""
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class StockLineSerializer(StockMovementSerializer):
+    """Línea de un movimiento de stock en lote (ej: un carrito)"""
+    variant = serializers.IntegerField(min_value=1)
+
+
+class StockBatchSerializer(serializers.Serializer):
+    """Movimiento de stock para varias variantes a la vez (todo o nada)"""
+    items = StockLineSerializer(many=True, allow_empty=False)
+
+    def get_lines(self):
+        return [(item['variant'], item['quantity']) for item in self.validated_data['items']]
+
+
+class VariantBulkListSerializer(BulkListSerializer):
+    """Upsert de variantes por `sku` (ver `core/bulk.py`)"""
+
+    def validate_batch(self, items):
+        values = [(index, value) for index, (value, _) in enumerate(items) if value is not None]
+        products = set()
+        for chunk in chunks({value['product_id'] for _, value in values}):
+            products.update(Product.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+        skus, keys = set(), set()
+        for index, value in values:
+            key = (value['product_id'], value['size'], value['color'])
+            if value['product_id'] not in products:
+                invalidate(items, index, {'product': [f"El producto {value['product_id']} no existe."]})
+            elif value['sku'] in skus:
+                invalidate(items, index, {'sku': ["SKU repetido en la petición."]})
+            elif key in keys:
+                invalidate(items, index, {'non_field_errors': ["Producto, talla y color repetidos en la petición."]})
+            skus.add(value['sku'])
+            keys.add(key)
+
+    def get_instances(self, values):
+        return Variant.objects.filter(sku__in=[value['sku'] for value in values])
+
+    def update(self, instances, validated_data):
+        existing = {variant.sku: variant for variant in instances}
+        now = timezone.now()
+        written, outcomes = [], []
+        for value in validated_data:
+            variant = existing.get(value['sku'])
+            if variant is None:
+                outcome = 'created'
+            elif all(getattr(variant, attr) == item for attr, item in value.items()):
+                outcomes.append(('unchanged', variant))
+                continue
+            else:
+                outcome = 'updated'
+            variant = Variant(updated_at=now, **value)
+            written.append(variant)
+            outcomes.append((outcome, variant))
+        if written:
+            # Un upsert (INSERT ... ON CONFLICT) en lugar de bulk_create +
+            # bulk_update: el CASE de bulk_update crece con el lote
+            Variant.objects.bulk_create(
+                written,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=['product', 'size', 'color', 'updated_at'],
+            )
+            invalidate_catalog('variant')
+            if any(variant.pk is None for variant in written):
+                # Motores que no devuelven los ids del upsert
+                ids = dict(Variant.objects.filter(sku__in=[v.sku for v in written]).values_list('sku', 'id'))
+                for variant in written:
+                    variant.pk = ids[variant.sku]
+        return [(outcome, {'id': variant.pk, 'sku': variant.sku}) for outcome, variant in outcomes]
+
+
+class VariantBulkItemSerializer(serializers.Serializer):
+    """Variante de un alta/actualización en lote (se identifica por `sku`)"""
+    product = serializers.IntegerField(source='product_id', min_value=1)
+    size = serializers.CharField(max_length=10)
+    color = serializers.CharField(max_length=30)
+    sku = serializers.CharField(max_length=50)
+
+    class Meta:
+        list_serializer_class = VariantBulkListSerializer
+
+
+class InventoryBulkListSerializer(BulkListSerializer):
+    """Upsert de niveles de stock por variante (ver `core/bulk.py`)"""
+
+    def validate_batch(self, items):
+        values = [(index, value) for index, (value, _) in enumerate(items) if value is not None]
+        skus = {value['sku'] for _, value in values if 'sku' in value}
+        ids = {value['variant'] for _, value in values if 'variant' in value}
+        by_sku, known = {}, set()
+        for sku_chunk, id_chunk in zip_longest(chunks(skus), chunks(ids), fillvalue=[]):
+            rows = Variant.objects.filter(Q(sku__in=sku_chunk) | Q(pk__in=id_chunk)).values_list('pk', 'sku')
+            for variant_id, sku in rows:
+                by_sku[sku] = variant_id
+                known.add(variant_id)
+        seen = set()
+        for index, value in values:
+            if 'sku' in value:
+                variant_id = by_sku.get(value['sku'])
+                if variant_id is None:
+                    invalidate(items, index, {'sku': [f"No existe ninguna variante con SKU {value['sku']}."]})
+                    continue
+                if value.get('variant', variant_id) != variant_id:
+                    invalidate(items, index, {'variant': ["No corresponde al SKU indicado."]})
+                    continue
+            else:
+                variant_id = value['variant']
+                if variant_id not in known:
+                    invalidate(items, index, {'variant': [f"La variante {variant_id} no existe."]})
+                    continue
+            if variant_id in seen:
+                invalidate(items, index, {'non_field_errors': ["Variante repetida en la petición."]})
+                continue
+            seen.add(variant_id)
+            value['variant_id'] = variant_id
+
+    def get_instances(self, values):
+        # Bloquea las filas del lote: los cruces de umbral se calculan con estos niveles
+        return (
+            Inventory.objects.select_for_update()
+            .filter(variant_id__in=[value['variant_id'] for value in values])
+            .order_by('variant_id')
+            .only('variant_id', 'stock_quantity', 'low_stock_threshold')
+        )
+
+    def update(self, instances, validated_data):
+        existing = {
+            inventory.variant_id: (inventory.stock_quantity, inventory.low_stock_threshold)
+            for inventory in instances
+        }
+        now = timezone.now()
+        written, crossings, outcomes = [], [], []
+        for value in validated_data:
+            variant_id = value['variant_id']
+            before = existing.get(variant_id)
+            default_threshold = before[1] if before else Inventory._meta.get_field('low_stock_threshold').default
+            after = (value['stock_quantity'], value.get('low_stock_threshold', default_threshold))
+            if before == after:
+                outcome = 'unchanged'
+            else:
+                outcome = 'created' if before is None else 'updated'
+                written.append(Inventory(
+                    variant_id=variant_id,
+                    stock_quantity=after[0],
+                    low_stock_threshold=after[1],
+                    updated_at=now,
+                ))
+                crossings.append((variant_id, before, after))
+            outcomes.append((outcome, {'variant': variant_id, 'stock_quantity': after[0]}))
+        if written:
+            # Upsert por variante, como la importación (ver `core.importers`)
+            Inventory.objects.bulk_create(
+                written,
+                update_conflicts=True,
+                unique_fields=['variant'],
+                update_fields=['stock_quantity', 'low_stock_threshold', 'updated_at'],
+            )
+            record_crossings(crossings)
+            stock_changed([variant_id for variant_id, _, _ in crossings])
+            invalidate_catalog('inventory')
+        return outcomes
+
+
+class InventoryBulkItemSerializer(serializers.Serializer):
+    """Nivel de stock de una variante, identificada por `sku` o `variant` (id)"""
+    sku = serializers.CharField(max_length=50, required=False)
+    variant = serializers.IntegerField(min_value=1, required=False)
+    stock_quantity = serializers.IntegerField(min_value=0)
+    low_stock_threshold = serializers.IntegerField(min_value=0, required=False)
+
+    class Meta:
+        list_serializer_class = InventoryBulkListSerializer
+
+    def validate(self, attrs):
+        if 'sku' not in attrs and 'variant' not in attrs:
+            raise serializers.ValidationError("Indica `sku` o `variant`.")
+        return attrs
+
+
+class LowStockEventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Cruce del umbral de stock bajo (feed del panel de operaciones)"""
+    class Meta:
+        model = LowStockEvent
+        fields = [
+            'id',
+            'variant',
+            'is_low_stock',
+            'stock_quantity',
+            'low_stock_threshold',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+class LowStockFeedQuerySerializer(serializers.Serializer):
+    """Parámetros del feed: `?after=<id>&limit=n`"""
+    after = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Línea del carrito con los datos de la variante necesarios para mostrarla"""
+    sku = serializers.CharField(source='variant.sku', read_only=True)
+    product_name = serializers.CharField(source='variant.product.name', read_only=True)
+    size = serializers.CharField(source='variant.size', read_only=True)
+    color = serializers.CharField(source='variant.color', read_only=True)
+    unit_price = serializers.DecimalField(
+        source='variant.product.current_price',
+        max_digits=10,
+        decimal_places=2,
+        read_only=True
+    )
+    # 0 elimina la línea (ver CartItemAPIView)
+    quantity = serializers.IntegerField(min_value=0)
+
+    class Meta:
+        model = CartItem
+        fields = [
+            'variant',
+            'sku',
+            'product_name',
+            'size',
+            'color',
+            'quantity',
+            'unit_price'
+        ]
+
+
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    items = CartItemSerializer(many=True, read_only=True)
+    total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Cart
+        fields = [
+            'id',
+            'items',
+            'total',
+            'updated_at'
+        ]
+
+    def get_total(self, cart):
+        total = sum(
+            (item.variant.product.current_price * item.quantity for item in cart.items.all()),
+            Decimal('0.00')
+        )
+        return str(total)
+
+
+class OrderLineSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = OrderLine
+        fields = [
+            'variant',
+            'sku',
+            'product_name',
+            'quantity',
+            'unit_price'
+        ]
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    lines = OrderLineSerializer(many=True, read_only=True)
+    status_display = serializers.CharField(
+        source='get_status_display',
+        read_only=True,
+        help_text="Nombre legible del estado"
+    )
+
+    class Meta:
+        model = Order
+        fields = [
+            'id',
+            'status',
+            'status_display',
+            'total',
+            'lines',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+class ProductSearchQuerySerializer(serializers.Serializer):
+    """Parámetros de `/api/products/search/`"""
+    q = serializers.CharField(max_length=200, help_text="Texto a buscar (admite prefijos y errores de tipeo)")
+    category = serializers.ChoiceField(choices=Product.CategoryChoices.choices, required=False)
+    gender = serializers.ChoiceField(choices=Product.GenderChoices.choices, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
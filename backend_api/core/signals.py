@@ -0,0 +1,118 @@
+from django.contrib.auth.signals import user_login_failed
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import metrics, pricing
+from .authentication import user_cache
+from .cache import catalog_cache
+from .low_stock import record_crossings
+from .push import stock_changed
+from .models import Inventory, Product, Promotion, User, Variant
+
+CATALOG_MODELS = {
+    Product: 'product',
+    Variant: 'variant',
+    Inventory: 'inventory',
+}
+
+
+def invalidate_catalog(model_name):
+    """
+    Incrementa la versión de caché de un modelo del catálogo.
+
+    Se incrementa ya (para lecturas dentro de la misma transacción) y otra vez
+    al confirmar: así se descarta lo que otro worker haya cacheado leyendo
+    los datos previos al commit.
+    """
+    catalog_cache.bump(model_name)
+    transaction.on_commit(lambda: catalog_cache.bump(model_name))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Variant)
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Variant)
+@receiver(post_delete, sender=Inventory)
+def catalog_changed(sender, **kwargs):
+    """Invalida la caché del catálogo ante cualquier alta, cambio o baja"""
+    invalidate_catalog(CATALOG_MODELS[sender])
+
+
+@receiver(post_save, sender=Inventory)
+def inventory_saved(sender, instance, created, raw=False, **kwargs):
+    """Registra en el feed si el guardado cruzó el umbral de stock bajo"""
+    if raw:
+        return
+    after = (instance.stock_quantity, instance.low_stock_threshold)
+    # Sin niveles cargados (instancia construida a mano) no se sabe si cruzó
+    before = None if created else getattr(instance, '_loaded_levels', after)
+    if before is not None and None in before:
+        before = after
+    record_crossings([(instance.variant_id, before, after)])
+    instance._loaded_levels = after
+    stock_changed([instance.variant_id])
+
+
+PRICING_FIELDS = {'base_price', 'category', 'gender'}
+
+
+@receiver(pre_save, sender=Product)
+def product_pricing(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Precio efectivo del producto con las promociones vigentes"""
+    if raw or update_fields is not None:
+        return
+    instance.effective_price = pricing.price_for(instance)
+
+
+@receiver(post_save, sender=Product)
+def product_repriced(sender, instance, raw=False, update_fields=None, **kwargs):
+    """`save(update_fields=...)` no guardaría el precio calculado en `pre_save`"""
+    if raw or update_fields is None or not PRICING_FIELDS & set(update_fields):
+        return
+    pricing.reprice(Product.objects.filter(pk=instance.pk))
+    instance.effective_price = Product.objects.values_list('effective_price', flat=True).get(pk=instance.pk)
+
+
+@receiver(post_save, sender=Promotion)
+def promotion_saved(sender, instance, raw=False, **kwargs):
+    """Recalcula los precios de su alcance (el actual y el anterior)"""
+    if raw:
+        return
+    pricing.promotion_changed(instance)
+
+
+@receiver(post_delete, sender=Promotion)
+def promotion_deleted(sender, instance, **kwargs):
+    pricing.promotion_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Expulsa al usuario de la caché de autenticación de este proceso"""
+    user_cache.evict(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, reverse, pk_set, **kwargs):
+    """Los permisos cacheados dependen de grupos y permisos directos"""
+    if not reverse:
+        user_cache.evict(instance.pk)
+    elif pk_set:
+        # Cambio desde el lado del grupo/permiso: afecta a varios usuarios
+        for user_id in pk_set:
+            user_cache.evict(user_id)
+
+
+@receiver(user_login_failed)
+def login_failed(sender, credentials, **kwargs):
+    metrics.inc('login_attempts_total', (('result', 'failure'),))
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    metrics.inc('db_connection_setups_total', (('alias', connection.alias),))
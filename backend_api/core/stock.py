@@ -0,0 +1,177 @@
+"""
+Movimientos de stock atómicos.
+
+Toda la lógica se expresa como `UPDATE ... SET stock_quantity = stock_quantity - n
+WHERE stock_quantity >= n`: la comprobación y el descuento ocurren en la misma
+sentencia, por lo que dos checkouts concurrentes nunca pueden leer el mismo
+valor y sobrevender (a diferencia del PUT de `VariantViewSet.stock`, que hace
+lectura-modificación-escritura).
+
+`queryset.update()` no dispara señales, así que aquí se fija `updated_at` a
+mano, se invalida la caché del catálogo, se registran los cruces del umbral
+de stock bajo (`core.low_stock`) y se publica el cambio (`core.push`)
+explícitamente.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from . import metrics
+from .low_stock import record_crossings
+from .models import Inventory
+from .push import stock_changed
+from .signals import invalidate_catalog
+
+
+class InsufficientStock(Exception):
+    """
+    No hay stock suficiente para una o más variantes.
+    `shortages` es una lista de dicts `{variant, requested, available}`.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f"Stock insuficiente para {len(shortages)} variante(s)")
+
+
+class MissingInventory(Exception):
+    """Una o más variantes no tienen fila de inventario. `variants`: sus ids"""
+
+    def __init__(self, variants):
+        self.variants = variants
+        super().__init__(f"Sin inventario para {len(variants)} variante(s)")
+
+
+def _normalize(items):
+    """Agrupa cantidades por variante y las ordena por id (orden determinista)"""
+    totals = {}
+    for variant_id, quantity in items:
+        totals[variant_id] = totals.get(variant_id, 0) + quantity
+    return sorted(totals.items())
+
+
+def _current_stock(lines):
+    return dict(
+        Inventory.objects.filter(variant_id__in=[v for v, _ in lines])
+        .values_list('variant_id', 'stock_quantity')
+    )
+
+
+def _current_levels(lines):
+    """`{variant_id: (stock, umbral)}` tras el movimiento"""
+    return {
+        variant_id: (stock, threshold)
+        for variant_id, stock, threshold in Inventory.objects.filter(
+            variant_id__in=[v for v, _ in lines]
+        ).values_list('variant_id', 'stock_quantity', 'low_stock_threshold')
+    }
+
+
+def _apply_levels(lines, sign):
+    """
+    Lee los niveles resultantes, registra los cruces del umbral y devuelve
+    `{variant_id: stock}`. `sign` es +1 si el movimiento sumó y -1 si restó.
+    """
+    levels = _current_levels(lines)
+    stock_changed(levels)
+    record_crossings(
+        (variant_id, (levels[variant_id][0] - sign * quantity, levels[variant_id][1]), levels[variant_id])
+        for variant_id, quantity in lines
+        if variant_id in levels
+    )
+    return {variant_id: stock for variant_id, (stock, _) in levels.items()}
+
+
+def _shortages(lines):
+    available = _current_stock(lines)
+    return [
+        {'variant': variant_id, 'requested': quantity, 'available': available.get(variant_id, 0)}
+        for variant_id, quantity in lines
+        if available.get(variant_id, 0) < quantity
+    ]
+
+
+def decrement_stock(variant_id, quantity):
+    """
+    Descuenta `quantity` unidades de una variante en una sola sentencia.
+    Devuelve el stock resultante o lanza `InsufficientStock`.
+    """
+    return decrement_many([(variant_id, quantity)])[variant_id]
+
+
+def decrement_many(items):
+    """
+    Descuenta el stock de varias variantes (p. ej. un carrito completo).
+
+    `items` es un iterable de `(variant_id, quantity)`. Es todo o nada: se
+    emite un único UPDATE condicionado con `CASE` y, si no afecta a todas las
+    filas, se revierte y se informa qué variantes no alcanzan.
+    Devuelve `{variant_id: stock_resultante}`.
+    """
+    lines = _normalize(items)
+    if not lines:
+        return {}
+    if any(quantity <= 0 for _, quantity in lines):
+        raise ValueError("Las cantidades deben ser positivas")
+
+    requested = Case(
+        *[When(variant_id=variant_id, then=Value(quantity)) for variant_id, quantity in lines],
+        output_field=IntegerField(),
+    )
+    enough = Q()
+    for variant_id, quantity in lines:
+        enough |= Q(variant_id=variant_id, stock_quantity__gte=quantity)
+
+    with transaction.atomic():
+        updated = Inventory.objects.filter(enough).update(
+            stock_quantity=F('stock_quantity') - requested,
+            updated_at=timezone.now(),
+        )
+        complete = updated == len(lines)
+        if complete:
+            # Se lee dentro de la transacción: si algo falla, no queda un
+            # descuento confirmado sin respuesta (y un reintento no duplica)
+            stock = _apply_levels(lines, -1)
+            invalidate_catalog('inventory')
+        else:
+            transaction.set_rollback(True)
+    if not complete:
+        metrics.inc('stock_rejections_total')
+        raise InsufficientStock(_shortages(lines))
+    metrics.inc('stock_decrements_total')
+    metrics.inc('stock_decremented_units_total', value=sum(quantity for _, quantity in lines))
+    return stock
+
+
+def increment_many(items):
+    """
+    Devuelve unidades al stock (liberar una reserva, cancelación).
+    Todo o nada, como `decrement_many`: si alguna variante no tiene fila de
+    inventario no se libera nada y se lanza `MissingInventory`.
+    Devuelve `{variant_id: stock_resultante}`.
+    """
+    lines = _normalize(items)
+    if not lines:
+        return {}
+    if any(quantity <= 0 for _, quantity in lines):
+        raise ValueError("Las cantidades deben ser positivas")
+
+    released = Case(
+        *[When(variant_id=variant_id, then=Value(quantity)) for variant_id, quantity in lines],
+        output_field=IntegerField(),
+    )
+    with transaction.atomic():
+        updated = Inventory.objects.filter(variant_id__in=[v for v, _ in lines]).update(
+            stock_quantity=F('stock_quantity') + released,
+            updated_at=timezone.now(),
+        )
+        complete = updated == len(lines)
+        if complete:
+            stock = _apply_levels(lines, 1)
+            invalidate_catalog('inventory')
+        else:
+            transaction.set_rollback(True)
+    if not complete:
+        found = _current_stock(lines)
+        raise MissingInventory([variant_id for variant_id, _ in lines if variant_id not in found])
+    return stock
@@ -1,3 +1,1597 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .authentication import user_cache
+from .cache import catalog_cache
+from .compression import negotiate
+from .push import publish_inventory, push
+from .renderers import (
+    FastJSONParser, FastJSONRenderer, MsgspecBackend, MsgspecRenderer, OrjsonRenderer,
+    StdlibBackend, StdlibJSONRenderer, coerce_decimals,
+)
+from .routers import PrimaryReplicaRouter, replica_reads, request_context
+from .search import PostgresSearchBackend, reset_search_backend
+from .throttling import take, throttling
+from .models import Product, Promotion, Variant, Inventory, Cart, CartItem, Order, LowStockEvent
+from .pricing import discounted
+
+User = get_user_model()
+
+
+def crear_producto(name='Zapato', **kwargs):
+    """Crea un producto con valores por defecto válidos"""
+    defaults = {
+        'category': Product.CategoryChoices.DEPORTIVO,
+        'gender': Product.GenderChoices.UNISEX,
+        'base_price': Decimal('100.00'),
+    }
+    defaults.update(kwargs)
+    return Product.objects.create(name=name, **defaults)
+
+
+def crear_variante(product, sku, stock=20, **kwargs):
+    """Crea una variante con su inventario"""
+    defaults = {'size': '42', 'color': 'negro'}
+    defaults.update(kwargs)
+    variant = Variant.objects.create(product=product, sku=sku, **defaults)
+    Inventory.objects.create(variant=variant, stock_quantity=stock)
+    return variant
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class CatalogTestCase(TestCase):
+    """
+    Base para tests del catálogo: parte siempre de una caché vacía.
+    Sin réplicas: sus conexiones no ven la transacción del test (ver ReplicaRoutingTests).
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        catalog_cache.reset()
+        reset_search_backend()
+        throttling.reset()
+        push.reset()
+
+
+class ProductPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(30):
+            crear_producto(name=f'Producto {i:02d}')
+
+    def test_cursor_recorre_todo_el_catalogo_sin_duplicados(self):
+        vistos = []
+        url = '/api/products/?page_size=7'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            vistos.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        esperado = list(Product.objects.values_list('id', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_page_size_acotado(self):
+        response = self.client.get('/api/products/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 30)
+
+    def test_offset_solo_para_staff(self):
+        response = self.client.get('/api/products/?page=2')
+        self.assertNotIn('count', response.data)
+
+        staff = User.objects.create_user(
+            username='admin', email='admin@shop.com', password='x', is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/products/?page=2&page_size=10')
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class CatalogQueryBudgetTests(CatalogTestCase):
+    """El catálogo anidado debe costar un número fijo de consultas"""
+
+    def poblar(self, productos, variantes):
+        for i in range(productos):
+            product = crear_producto(name=f'Producto {i}')
+            for j in range(variantes):
+                crear_variante(product, sku=f'SKU-{i}-{j}', size=str(36 + j))
+
+    def test_presupuesto_de_consultas_constante(self):
+        self.poblar(productos=20, variantes=3)
+        for page_size in (1, 5, 20):
+            # validador ETag + 1 consulta de productos + 1 de variantes con inventario
+            with self.assertNumQueries(3):
+                response = self.client.get(f'/api/products/catalog/?page_size={page_size}')
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_representacion_anidada(self):
+        product = crear_producto(name='Runner')
+        crear_variante(product, sku='RUN-42', stock=7)
+        Variant.objects.create(product=product, sku='RUN-43', size='43', color='negro')
+
+        response = self.client.get('/api/products/catalog/')
+        item = response.data['results'][0]
+        self.assertEqual(item['name'], 'Runner')
+        variants = {v['sku']: v for v in item['variants']}
+        self.assertEqual(variants['RUN-42']['inventory']['stock_quantity'], 7)
+        self.assertIsNone(variants['RUN-43']['inventory'])
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = crear_producto(name='Runner')
+        self.variant = crear_variante(self.product, sku='RUN-42', stock=5)
+
+    def test_segunda_lectura_sin_consultas(self):
+        response = self.client.get('/api/products/catalog/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/catalog/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        # validadores ETag + respuesta
+        self.assertEqual(catalog_cache.stats()['hits'], 2)
+        self.assertEqual(catalog_cache.stats()['misses'], 2)
+
+    def test_guardar_inventario_invalida(self):
+        url = f'/api/variants/{self.variant.pk}/stock/'
+        self.assertEqual(self.client.get(url).data['stock_quantity'], 5)
+
+        inventory = self.variant.inventory
+        inventory.stock_quantity = 3
+        inventory.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['stock_quantity'], 3)
+
+    def test_borrar_producto_invalida_listado(self):
+        self.client.get('/api/products/')
+        self.product.delete()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['results'], [])
+
+    def test_backend_compartido(self):
+        with self.settings(CATALOG_CACHE={'BACKEND': 'core.cache.DjangoCacheBackend'}):
+            catalog_cache.reset()
+            self.client.get('/api/inventory/')
+            self.assertEqual(self.client.get('/api/inventory/')['X-Cache'], 'HIT')
+            Inventory.objects.filter(pk=self.variant.inventory.pk).get().save()
+            self.assertEqual(self.client.get('/api/inventory/')['X-Cache'], 'MISS')
+        catalog_cache.reset()
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = crear_producto(name='Runner')
+        self.variant = crear_variante(self.product, sku='RUN-42', stock=5)
+
+    def test_etag_y_last_modified(self):
+        response = self.client.get('/api/products/')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_if_none_match_devuelve_304_sin_serializar(self):
+        etag = self.client.get('/api/inventory/low_stock/')['ETag']
+        catalog_cache.reset()  # fuerza el cálculo del validador desde la BD
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inventory/low_stock/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_cambio_en_relacion_cambia_etag(self):
+        url = f'/api/products/{self.product.pk}/inventory/'
+        etag = self.client.get(url)['ETag']
+
+        inventory = self.variant.inventory
+        inventory.stock_quantity = 1
+        inventory.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pk_no_numerico_es_404(self):
+        for url in ('/api/products/abc/', '/api/variants/abc/', '/api/inventory/abc/', '/api/products/abc/inventory/'):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+
+    def test_borrado_en_relacion_cambia_etag(self):
+        otra = crear_variante(self.product, sku='RUN-43', size='43')
+        url = f'/api/products/{self.product.pk}/variants/'
+        etag = self.client.get(url)['ETag']
+        otra.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class StockReservationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='buyer', email='buyer@shop.com', password='x')
+        self.client.force_authenticate(self.user)
+        product = crear_producto()
+        self.a = crear_variante(product, sku='A', stock=5, size='40')
+        self.b = crear_variante(product, sku='B', stock=1, size='41')
+
+    def stock(self, variant):
+        return Inventory.objects.get(variant=variant).stock_quantity
+
+    def test_reserva_descuenta(self):
+        response = self.client.post(f'/api/variants/{self.a.pk}/reserve/', {'quantity': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'], [{'variant': self.a.pk, 'stock_quantity': 3}])
+        self.assertEqual(self.stock(self.a), 3)
+
+    def test_reserva_sin_stock_devuelve_409(self):
+        response = self.client.post(f'/api/variants/{self.b.pk}/reserve/', {'quantity': 2})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'][0]['available'], 1)
+        self.assertEqual(self.stock(self.b), 1)
+
+    def test_carrito_es_todo_o_nada(self):
+        items = [
+            {'variant': self.a.pk, 'quantity': 2},
+            {'variant': self.b.pk, 'quantity': 2},
+        ]
+        response = self.client.post('/api/variants/reserve/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([s['variant'] for s in response.data['shortages']], [self.b.pk])
+        self.assertEqual(self.stock(self.a), 5)
+
+        items[1]['quantity'] = 1
+        # SAVEPOINT + UPDATE + SELECT + RELEASE, sin importar el tamaño del carrito
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/variants/reserve/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((self.stock(self.a), self.stock(self.b)), (3, 0))
+
+    def test_liberar_reserva(self):
+        self.client.post(f'/api/variants/{self.a.pk}/reserve/', {'quantity': 4})
+        self.client.post(f'/api/variants/{self.a.pk}/release/', {'quantity': 4})
+        self.assertEqual(self.stock(self.a), 5)
+
+    def test_liberar_sin_inventario_devuelve_404(self):
+        sin_inventario = Variant.objects.create(product=self.a.product, sku='C', size='42', color='negro')
+        response = self.client.post(f'/api/variants/{sin_inventario.pk}/release/', {'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['missing'], [sin_inventario.pk])
+
+        items = [{'variant': self.a.pk, 'quantity': 2}, {'variant': 999999, 'quantity': 1}]
+        response = self.client.post('/api/variants/release/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['missing'], [999999])
+        # Todo o nada: la variante con inventario tampoco cambia
+        self.assertEqual(self.stock(self.a), 5)
+
+    def test_reserva_invalida_cache(self):
+        url = f'/api/variants/{self.a.pk}/stock/'
+        self.client.get(url)
+        self.client.post(f'/api/variants/{self.a.pk}/reserve/', {'quantity': 1})
+        self.assertEqual(self.client.get(url).data['stock_quantity'], 4)
+
+
+class StockContentionTests(TransactionTestCase):
+    """Muchos hilos contra la misma SKU: nunca se vende más de lo que hay"""
+
+    def test_sin_sobreventa(self):
+        from .benchmarks import hammer_stock, make_catalog
+
+        variant = make_catalog(1, stock=40)[0]
+        result = hammer_stock(variant.pk, threads=8, attempts=10)
+        self.assertEqual(result['reserved'], 40)
+        self.assertEqual(result['rejected'], 40)
+        self.assertEqual(Inventory.objects.get(variant=variant).stock_quantity, 0)
+
+
+class CheckoutTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='buyer', email='buyer@shop.com', password='x')
+        self.client.force_authenticate(self.user)
+        self.product = crear_producto(base_price=Decimal('50.00'))
+
+    def llenar_carrito(self, lineas, stock=10):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        variants = [
+            crear_variante(self.product, sku=f'SKU-{i}', size=str(30 + i), stock=stock)
+            for i in range(lineas)
+        ]
+        CartItem.objects.bulk_create(CartItem(cart=cart, variant=v, quantity=2) for v in variants)
+        return variants
+
+    def test_agregar_al_carrito(self):
+        variant = crear_variante(self.product, sku='X')
+        response = self.client.post('/api/cart/items/', {'variant': variant.pk, 'quantity': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'][0]['quantity'], 3)
+        self.assertEqual(response.data['total'], '150.00')
+
+        updated_at = Cart.objects.get(user=self.user).updated_at
+        response = self.client.post('/api/cart/items/', {'variant': variant.pk, 'quantity': 0})
+        self.assertEqual(response.data['items'], [])
+        self.assertGreater(Cart.objects.get(user=self.user).updated_at, updated_at)
+
+    def test_linea_de_carrito_invalida_es_400(self):
+        for data in ({'variant': 'abc', 'quantity': 0}, {'variant': 'abc', 'quantity': 1},
+                     {'variant': 999999, 'quantity': 0}):
+            response = self.client.post('/api/cart/items/', data)
+            self.assertEqual(response.status_code, 400, data)
+        variant = crear_variante(self.product, sku='X')
+        response = self.client.post('/api/cart/items/', {'variant': variant.pk, 'quantity': -1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_checkout_crea_pedido_y_descuenta(self):
+        variants = self.llenar_carrito(3)
+        response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total'], '300.00')
+        self.assertEqual(len(response.data['lines']), 3)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(
+            list(Inventory.objects.filter(variant__in=variants).values_list('stock_quantity', flat=True)),
+            [8, 8, 8],
+        )
+
+    def test_consultas_constantes_por_tamano_de_carrito(self):
+        for lineas in (1, 10):
+            Order.objects.all().delete()
+            Variant.objects.all().delete()
+            self.llenar_carrito(lineas)
+            with self.assertNumQueries(14):
+                response = self.client.post('/api/cart/checkout/')
+            self.assertEqual(len(response.data['lines']), lineas)
+
+    def test_stock_insuficiente_no_cambia_nada(self):
+        self.llenar_carrito(2, stock=1)
+        response = self.client.post('/api/cart/checkout/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.data['shortages']), 2)
+        self.assertEqual(CartItem.objects.count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_carrito_vacio(self):
+        self.assertEqual(self.client.post('/api/cart/checkout/').status_code, 400)
+
+
+class CatalogImportTests(CatalogTestCase):
+    CSV = (
+        "product_name,description,category,gender,base_price,size,color,sku,stock_quantity\n"
+        "Runner,Liviano,deportivo,unisex,99.90,40,negro,RUN-40,5\n"
+        "Runner,Liviano,deportivo,unisex,99.90,41,negro,RUN-41,7\n"
+        "Bota,,utilitario,hombre,150.00,42,marron,BOT-42,1\n"
+        "Roto,,volador,hombre,10,42,rojo,BAD-1,1\n"
+    )
+
+    def importar_csv(self, contenido):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(contenido)
+        self.addCleanup(os.unlink, f.name)
+        out = io.StringIO()
+        call_command('import_catalog', f.name, '--chunk-size', '2', stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_comando_importa_y_reporta_errores(self):
+        output = self.importar_csv(self.CSV)
+        self.assertIn('3 variantes', output)
+        self.assertIn('1 filas con error', output)
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(Inventory.objects.get(variant__sku='RUN-41').stock_quantity, 7)
+
+    def test_reimportar_actualiza_por_sku(self):
+        self.importar_csv(self.CSV)
+        self.importar_csv(self.CSV.replace('RUN-41,7', 'RUN-41,0').replace('150.00', '120.00'))
+        self.assertEqual(Variant.objects.count(), 3)
+        self.assertEqual(Inventory.objects.get(variant__sku='RUN-41').stock_quantity, 0)
+        self.assertEqual(Product.objects.get(name='Bota').base_price, Decimal('120.00'))
+
+    def test_endpoint_jsonl_solo_staff(self):
+        filas = [
+            {'product_name': 'Runner', 'category': 'deportivo', 'gender': 'mujer',
+             'base_price': '80', 'size': '38', 'color': 'blanco', 'sku': 'R-38', 'stock_quantity': 3},
+            {'product_name': 'Runner', 'category': 'deportivo', 'gender': 'mujer',
+             'base_price': '80', 'size': '38', 'color': 'blanco', 'sku': 'R-38-DUP'},
+        ]
+        contenido = '\n'.join(json.dumps(f) for f in filas) + '\nno-es-json\n'
+        upload = SimpleUploadedFile('catalogo.jsonl', contenido.encode())
+
+        response = self.client.post('/api/products/import/', {'file': upload})
+        self.assertIn(response.status_code, (401, 403))
+
+        staff = User.objects.create_user(username='s', email='s@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(staff)
+        upload.seek(0)
+        response = self.client.post('/api/products/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['imported'], 1)
+        # talla/color repetidos con otro SKU y la línea no JSON
+        self.assertEqual([e['line'] for e in response.data['errors']], [3, 2])
+
+    def test_endpoint_rechaza_archivo_no_utf8(self):
+        staff = User.objects.create_user(username='s', email='s@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(staff)
+        contenido = (
+            b'product_name,category,gender,base_price,size,color,sku\n'
+            b'Runner,deportivo,mujer,80,38,blanco,R-38\n'
+            b'Cami\xf3n,deportivo,mujer,80,39,blanco,R-39\n'
+        )
+        upload = SimpleUploadedFile('catalogo.csv', contenido)
+        response = self.client.post('/api/products/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['line'], response.data['position']), (3, contenido.index(b'\xf3') + 1))
+        # Se rechaza entero: tampoco se importa la fila válida anterior
+        self.assertFalse(Variant.objects.filter(sku='R-38').exists())
+
+    def test_check_encoding_entre_bloques(self):
+        from .importers import EncodingError, check_encoding
+
+        # 'ñ' partida entre dos bloques es válida; el byte suelto del final no
+        stream = io.BytesIO('añ\nb'.encode() + b'\xff')
+        with self.assertRaises(EncodingError) as ctx:
+            check_encoding(stream, block_size=2)
+        self.assertEqual((ctx.exception.line, ctx.exception.position), (2, 6))
+        stream = io.BytesIO('añ\nb'.encode())
+        check_encoding(stream, block_size=2)
+        self.assertEqual(stream.tell(), 0)
+
+
+class CatalogExportTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        product = crear_producto(name='Runner', base_price=Decimal('99.90'))
+        crear_variante(product, sku='RUN-40', stock=5, size='40')
+        Variant.objects.create(product=product, sku='RUN-41', size='41', color='negro')
+
+    def test_endpoint_csv_en_streaming(self):
+        staff = User.objects.create_user(username='s', email='s@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/products/export/?file_format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['product_name', 'description'])
+        self.assertEqual(lines[1], 'Runner,,deportivo,unisex,99.90,40,negro,RUN-40,5,10')
+        self.assertEqual(lines[2], 'Runner,,deportivo,unisex,99.90,41,negro,RUN-41,0,10')
+
+    def test_export_jsonl_se_puede_reimportar(self):
+        out = io.StringIO()
+        call_command('export_catalog', '--format', 'jsonl', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(rows[0]['base_price'], '99.90')
+        self.assertEqual((rows[1]['stock_quantity'], rows[1]['low_stock_threshold']), (0, 10))
+
+        from .importers import CatalogImporter
+        rows[0]['stock_quantity'] = 9
+        result = CatalogImporter().run(iter(rows[:1]))
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(Inventory.objects.get(variant__sku='RUN-40').stock_quantity, 9)
+
+    def test_ida_y_vuelta_completa(self):
+        from .exporters import export_catalog
+        from .importers import CatalogImporter, iter_rows
+
+        for fmt in ('csv', 'jsonl'):
+            text = ''.join(export_catalog(fmt))
+            result = CatalogImporter().run(iter_rows(io.StringIO(text, newline=''), fmt))
+            self.assertEqual((result.rows, result.imported, result.failed), (2, 2, 0), fmt)
+            self.assertEqual(''.join(export_catalog(fmt)), text)
+        # La variante sin inventario lo tiene ahora, con stock 0
+        self.assertEqual(Inventory.objects.get(variant__sku='RUN-41').stock_quantity, 0)
+
+
+class ProductSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.runner = crear_producto(name='Zapatilla Running Pro', description='Amortiguación para maratón')
+        self.trail = crear_producto(
+            name='Bota Trail', description='Ideal para running en montaña',
+            category=Product.CategoryChoices.UTILITARIO,
+        )
+        self.nino = crear_producto(name='Zapatilla Niño', gender=Product.GenderChoices.NIÑO)
+
+    def buscar(self, query):
+        response = self.client.get('/api/products/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data['results']]
+
+    def test_ranking_prioriza_el_nombre(self):
+        self.assertEqual(self.buscar('running'), ['Zapatilla Running Pro', 'Bota Trail'])
+
+    def test_prefijo_acentos_y_errores(self):
+        self.assertEqual(self.buscar('zapat'), ['Zapatilla Running Pro', 'Zapatilla Niño'])
+        self.assertEqual(self.buscar('nino'), ['Zapatilla Niño'])
+        self.assertEqual(self.buscar('runing'), ['Zapatilla Running Pro', 'Bota Trail'])
+
+    def test_filtros_y_validacion(self):
+        response = self.client.get('/api/products/search/', {'q': 'running', 'category': 'utilitario'})
+        self.assertEqual([item['name'] for item in response.data['results']], ['Bota Trail'])
+        self.assertEqual(self.client.get('/api/products/search/').status_code, 400)
+
+    def test_postgres_normaliza_como_memoria(self):
+        # Solo se compila la consulta: las funciones de búsqueda son de PostgreSQL
+        backend = PostgresSearchBackend()
+        sql, params = backend.fulltext(['calzon', 'nino'], category='deportivo').query.sql_with_params()
+        self.assertIn('search_vector @@ to_tsquery', sql)
+        self.assertIn('calzon:* & nino:*', params)
+        sql, params = backend.similar(['calzon']).query.sql_with_params()
+        self.assertIn("core_unaccent(name || ' ' || description)", sql)
+        with mock.patch.object(PostgresSearchBackend, 'fulltext') as fulltext:
+            fulltext.return_value.order_by.return_value.values_list.return_value = [(1, 0.5)]
+            self.assertEqual(backend.search('Calzón NIÑO'), [(1, 0.5)])
+        fulltext.assert_called_once_with(['calzon', 'nino'], None, None)
+
+    def test_refleja_cambios_del_catalogo(self):
+        self.assertEqual(self.buscar('sandalia'), [])
+        crear_producto(name='Sandalia Playa')
+        self.assertEqual(self.buscar('sandalia'), ['Sandalia Playa'])
+
+
+class FacetedBrowseTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        a = crear_producto(name='A', base_price=Decimal('40'))
+        b = crear_producto(name='B', base_price=Decimal('120'), gender=Product.GenderChoices.MUJER)
+        c = crear_producto(name='C', base_price=Decimal('250'), category=Product.CategoryChoices.UTILITARIO)
+        crear_variante(a, sku='A40', size='40', color='negro')
+        crear_variante(a, sku='A41', size='41', color='negro')
+        crear_variante(b, sku='B40', size='40', color='rojo')
+        crear_variante(c, sku='C42', size='42', color='negro')
+
+    def counts(self, data, facet):
+        return {item['value']: item['count'] for item in data['facets'][facet]}
+
+    def test_facetas_en_una_consulta(self):
+        # 1 consulta de resultados + 1 (UNION ALL) para todas las facetas
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/browse/')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(self.counts(response.data, 'category'), {'deportivo': 2, 'utilitario': 1})
+        self.assertEqual(self.counts(response.data, 'size'), {'40': 2, '41': 1, '42': 1})
+        self.assertEqual(self.counts(response.data, 'price'), {'0-50': 1, '100-200': 1, '200+': 1})
+        self.assertEqual(response.data['facets']['category'][0]['label'], 'Calzado Deportivo')
+
+    def test_conteos_disyuntivos(self):
+        response = self.client.get('/api/products/browse/?size=40&color=negro')
+        self.assertEqual([item['name'] for item in response.data['results']], ['A'])
+        # la faceta talla ignora su propio filtro pero respeta el color
+        self.assertEqual(self.counts(response.data, 'size'), {'40': 1, '41': 1, '42': 1})
+        self.assertEqual(self.counts(response.data, 'color'), {'negro': 1, 'rojo': 1})
+        self.assertEqual(self.counts(response.data, 'category'), {'deportivo': 1})
+
+    def test_filtro_por_rango_de_precio(self):
+        response = self.client.get('/api/products/browse/?price=100-200,200%2B')
+        self.assertEqual(sorted(item['name'] for item in response.data['results']), ['B', 'C'])
+        self.assertEqual(self.counts(response.data, 'price')['0-50'], 1)
+        response = self.client.get('/api/products/browse/?price_max=100')
+        self.assertEqual([item['name'] for item in response.data['results']], ['A'])
+
+    def test_filtros_de_precio_invalidos_son_400(self):
+        for query, field in (('price=10-20', 'price'), ('price_min=abc', 'price_min'),
+                             ('price_max=NaN', 'price_max'), ('price=50-100,foo', 'price')):
+            response = self.client.get(f'/api/products/browse/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn(field, response.data)
+
+
+class JWTAuthenticationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@shop.com', password='secreta123')
+        crear_variante(crear_producto(), sku='JWT-1')
+
+    def login(self):
+        response = self.client.post('/login/', {'email': 'ana@shop.com', 'password': 'secreta123'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_login_devuelve_jwt(self):
+        data = self.login()
+        self.assertEqual(data['token'], data['access'])
+        self.assertIn('refresh', data)
+        self.assertEqual(data['token'].count('.'), 2)
+
+    def test_peticion_autenticada_sin_consultas_de_auth(self):
+        access = self.login()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.client.get('/api/products/catalog/')  # calienta usuario y catálogo
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/catalog/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_cambios_del_usuario_expulsan_la_cache(self):
+        access = self.login()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/products/catalog/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/products/catalog/').status_code, 401)
+
+    @override_settings(AUTH_USER_CACHE_MAX_ENTRIES=2)
+    def test_cache_de_usuarios_acotada(self):
+        otros = [
+            User.objects.create_user(username=f'u{i}', email=f'u{i}@shop.com', password='x')
+            for i in range(2)
+        ]
+        user_cache.get(self.user.pk)
+        user_cache.get(otros[0].pk)
+        user_cache.get(self.user.pk)  # el menos usado pasa a ser otros[0]
+        user_cache.get(otros[1].pk)
+        self.assertEqual(len(user_cache), 2)
+        with self.assertNumQueries(0):
+            user_cache.get(self.user.pk)
+        with self.assertNumQueries(3):  # usuario + permisos directos y de grupos
+            user_cache.get(otros[0].pk)
+
+    def test_logout_revoca_tokens(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        response = self.client.post('/logout/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.client.get('/api/products/catalog/').status_code, 401)
+
+        self.client.credentials()
+        response = self.client.post('/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+
+class EmailLoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='luis', email='luis@shop.com', password='clave-segura')
+
+    def test_una_consulta_por_intento(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(email='luis@shop.com', password='clave-segura'), self.user)
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(email='luis@shop.com', password='otra'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(email='nadie@shop.com', password='clave-segura'))
+
+    def test_email_inexistente_hashea_igualmente(self):
+        from unittest import mock
+
+        with mock.patch('django.contrib.auth.base_user.make_password') as make_password:
+            authenticate(email='nadie@shop.com', password='x')
+        make_password.assert_called_once_with('x')
+
+    def test_admin_usa_username(self):
+        self.assertEqual(authenticate(username='luis@shop.com', password='clave-segura'), self.user)
+
+    def test_rehash_al_cambiar_el_coste(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            self.user.set_password('clave-segura')
+            self.user.save()
+        self.assertIn('$1000$', User.objects.get(pk=self.user.pk).password)
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(authenticate(email='luis@shop.com', password='clave-segura'), self.user)
+        self.assertIn('$2000$', User.objects.get(pk=self.user.pk).password)
+
+
+class ThrottlingTests(CatalogTestCase):
+    def test_token_bucket(self):
+        # 1 ficha/s con ráfaga de 2
+        state, wait = take(None, 0.0, 1.0, 2)
+        state, wait = take(state, 0.0, 1.0, 2)
+        self.assertEqual(wait, 0)
+        state, wait = take(state, 0.0, 1.0, 2)
+        self.assertAlmostEqual(wait, 1.0)
+        state, wait = take(state, 1.5, 1.0, 2)
+        self.assertEqual(wait, 0)
+
+    @override_settings(THROTTLING={'SCOPES': {'login': {'ip': {'rate': '6/min', 'burst': 2}}}})
+    def test_login_limitado_por_ip_con_retry_after(self):
+        credentials = {'email': 'nadie@shop.com', 'password': 'x'}
+        for _ in range(2):
+            self.assertEqual(self.client.post('/login/', credentials).status_code, 400)
+        response = self.client.post('/login/', credentials)
+        self.assertEqual(response.status_code, 429)
+        # 6/min = 10 s por ficha (algo menos si el hash de las contraseñas tardó)
+        self.assertIn(int(response['Retry-After']), range(5, 11))
+
+        # otra IP tiene su propio cubo
+        response = self.client.post('/login/', credentials, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(THROTTLING={'SCOPES': {'stock_write': {'user': {'rate': '1/min', 'burst': 1}}}})
+    def test_stock_limita_escrituras_por_usuario(self):
+        variant = crear_variante(crear_producto(), sku='THR-1')
+        admin = User.objects.create_user(username='adm', email='adm@shop.com', password='x', is_staff=True)
+        otro = User.objects.create_user(username='otro', email='otro@shop.com', password='x', is_staff=True)
+        url = f'/api/variants/{variant.pk}/stock/'
+
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.put(url, {'stock_quantity': 5}).status_code, 200)
+        self.assertEqual(self.client.put(url, {'stock_quantity': 6}).status_code, 429)
+        # las lecturas no consumen fichas
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_authenticate(otro)
+        self.assertEqual(self.client.put(url, {'stock_quantity': 7}).status_code, 200)
+
+
+class InstrumentationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        from .instrumentation import registry
+        registry.reset()
+        product = crear_producto(name='Runner')
+        crear_variante(product, sku='INS-1')
+
+    def test_server_timing(self):
+        response = self.client.get('/api/products/catalog/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(INSTRUMENTATION={'SLOW_REQUEST_MS': 0})
+    def test_peticion_lenta_registra_sql(self):
+        with self.assertLogs('core.performance', level='WARNING') as logs:
+            self.client.get('/api/products/catalog/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'product-catalog')
+        self.assertEqual(record['queries'], 3)
+        self.assertEqual(len(record['slowest_queries']), 3)
+        self.assertIn('SELECT', record['slowest_queries'][0]['sql'])
+        self.assertGreater(record['serializer_ms'], 0)
+
+    def test_serializers_fuera_de_las_vistas_sin_instrumentar(self):
+        from rest_framework.serializers import BaseSerializer
+
+        from .serializers import ProductSerializer
+
+        # `data` es la propiedad original de DRF, sin envolver
+        self.assertEqual(BaseSerializer.data.fget.__qualname__, 'BaseSerializer.data')
+        self.assertIs(type(ProductSerializer(Product.objects.first())), ProductSerializer)
+
+    @override_settings(INSTRUMENTATION={'SLOW_REQUEST_MS': 0})
+    def test_filas_rapidas_cuentan_como_serializacion(self):
+        with self.assertLogs('core.performance', level='WARNING') as logs:
+            self.client.get('/api/products/')
+        self.assertGreater(json.loads(logs.records[0].getMessage())['serializer_ms'], 0)
+
+    def test_histograma_por_vista(self):
+        for _ in range(3):
+            self.client.get('/api/products/catalog/')
+        self.client.get('/api/products/')
+
+        self.assertEqual(self.client.get('/api/ops/metrics/').status_code, 401)
+        admin = User.objects.create_user(username='ops', email='ops@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        data = self.client.get('/api/ops/metrics/').data
+        stats = data['GET product-catalog']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(sum(stats['histogram'].values()), 3)
+        self.assertIn('GET product-list', data)
+
+
+@override_settings(METRICS={'AUTH_TOKEN': 'secreto'})
+class PrometheusMetricsTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        from . import metrics
+        metrics.store.reset()
+        product = crear_producto()
+        self.variant = crear_variante(product, sku='MET-1', stock=20)
+        crear_variante(product, sku='MET-2', size='43', stock=3)  # umbral 10: stock bajo
+
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_token_obligatorio(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+        with self.settings(METRICS={}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_peticiones_latencia_y_cache(self):
+        self.client.get('/api/products/catalog/')
+        self.client.get('/api/products/catalog/')
+        text = self.scrape()
+        self.assertIn(
+            'http_requests_total{route="product-catalog",method="GET",status="200"} 2', text)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="product-catalog",method="GET",le="+Inf"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{route="product-catalog",method="GET"} 2', text)
+        self.assertIn('db_queries_total{route="product-catalog"} 3', text)
+        self.assertIn('catalog_cache_requests_total{result="hit"}', text)
+        self.assertIn('# TYPE catalog_cache_hit_ratio gauge', text)
+
+    def test_metricas_de_negocio(self):
+        from .stock import InsufficientStock, decrement_many
+
+        decrement_many([(self.variant.pk, 2)])
+        with self.assertRaises(InsufficientStock):
+            decrement_many([(self.variant.pk, 100)])
+        User.objects.create_user(username='m', email='m@shop.com', password='clave-segura')
+        self.client.post('/login/', {'email': 'm@shop.com', 'password': 'clave-segura'})
+        self.client.post('/login/', {'email': 'm@shop.com', 'password': 'mal'})
+
+        text = self.scrape()
+        self.assertIn('inventory_low_stock_variants 1', text)
+        self.assertIn('stock_decrements_total 1', text)
+        self.assertIn('stock_decremented_units_total 2', text)
+        self.assertIn('stock_rejections_total 1', text)
+        self.assertIn('login_attempts_total{result="success"} 1', text)
+        self.assertIn('login_attempts_total{result="failure"} 1', text)
+
+    def test_conexiones_abiertas(self):
+        from django.db import connection
+        from django.db.backends.signals import connection_created
+
+        connection_created.send(sender=connection.__class__, connection=connection)
+        self.assertIn('db_connection_setups_total{alias="default"} 1', self.scrape())
+
+    def test_gauges_del_pool_sin_sufijo_total(self):
+        from . import metrics
+
+        pool = {name: kind for name, (kind, _) in metrics.METRICS.items() if name.startswith('db_pool_')}
+        self.assertEqual(set(pool.values()), {'gauge'})
+        self.assertFalse([name for name in pool if name.endswith('_total')])
+
+    def test_shards_de_hilos_terminados(self):
+        from . import metrics
+
+        store = metrics.MetricStore()
+        for _ in range(20):
+            thread = threading.Thread(target=store.observe, args=('http_request_duration_seconds', (), 0.2))
+            thread.start()
+            thread.join()
+        store.inc('stock_decrements_total')
+        # Los 20 shards muertos se sumaron al de retirados; queda el de este hilo
+        self.assertEqual(len(store._shards), 1)
+        counters, histograms = store.collect()
+        self.assertEqual(counters[('stock_decrements_total', ())], 1)
+        self.assertEqual(histograms[('http_request_duration_seconds', ())][-2], 0)
+        self.assertAlmostEqual(histograms[('http_request_duration_seconds', ())][-1], 20 * 0.2)
+
+    def test_agrega_workers(self):
+        from . import metrics
+
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.MetricStore()
+            other.inc('stock_decrements_total', value=5)
+            other.flush(directory)
+            # Otro worker vivo: su archivo se lee tal cual
+            os.rename(metrics.snapshot_path(directory, os.getpid()), metrics.snapshot_path(directory, os.getppid()))
+            metrics.store.inc('stock_decrements_total')
+            with self.settings(METRICS={'MULTIPROCESS_DIR': directory, 'AUTH_TOKEN': 'secreto'}):
+                text = self.scrape()
+            self.assertTrue(os.path.exists(metrics.snapshot_path(directory, os.getppid())))
+        self.assertIn('stock_decrements_total 6', text)
+
+    def test_workers_terminados(self):
+        from . import metrics
+
+        dead_pid = 2 ** 22 + 1  # por encima de pid_max: no existe
+        with tempfile.TemporaryDirectory() as directory:
+            with open(metrics.snapshot_path(directory, dead_pid), 'w') as fh:
+                json.dump({
+                    'counters': [['stock_decrements_total', [], 5]],
+                    'histograms': [],
+                    'gauges': [['db_pool_size', [['alias', 'default'], ['worker', str(dead_pid)]], 4]],
+                }, fh)
+            # Archivo con nuestro pid de un worker anterior (pid reutilizado)
+            with open(metrics.snapshot_path(directory, os.getpid()), 'w') as fh:
+                json.dump({'counters': [['stock_decrements_total', [], 2]], 'histograms': []}, fh)
+
+            metrics.store.inc('stock_decrements_total')
+            metrics.store.flush(directory)
+            with self.settings(METRICS={'MULTIPROCESS_DIR': directory, 'AUTH_TOKEN': 'secreto'}):
+                text = self.scrape()
+                self.assertIn('stock_decrements_total 8', text)
+                self.assertNotIn('db_pool_size', text)
+                self.assertEqual(
+                    set(os.listdir(directory)),
+                    {metrics.LOCK_FILE, metrics.RETIRED_FILE, f'metrics-{os.getpid()}.json'},
+                )
+                # Al salir, el worker pasa su snapshot al agregado
+                metrics.store.retire_own()
+                self.assertEqual(set(os.listdir(directory)), {metrics.LOCK_FILE, metrics.RETIRED_FILE})
+                metrics.store.reset()
+                self.assertIn('stock_decrements_total 8', self.scrape())
+
+
+class AsyncCatalogTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        self.products = [crear_producto(name=f'Async {i}') for i in range(3)]
+        self.variant = crear_variante(self.products[0], sku='ASY-1', stock=4)
+        crear_variante(self.products[1], sku='ASY-2', stock=50)
+
+    async def test_listado_por_keyset(self):
+        response = await self.async_client.get('/api/async/products/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        first = response.json()
+        self.assertEqual(len(first['results']), 2)
+
+        response = await self.async_client.get(first['next'])
+        second = response.json()
+        self.assertIsNone(second['next'])
+        names = [p['name'] for p in first['results'] + second['results']]
+        self.assertEqual(sorted(names), ['Async 0', 'Async 1', 'Async 2'])
+
+        response = await self.async_client.get('/api/async/products/?cursor=basura')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_misma_representacion_que_la_vista_sincrona(self):
+        pk = self.products[0].pk
+        response = await self.async_client.get(f'/api/async/products/{pk}/')
+        sync = await self.sync_get(f'/api/products/{pk}/')
+        self.assertEqual(response.json(), sync)
+
+        response = await self.async_client.get(f'/api/async/variants/{self.variant.pk}/stock/')
+        self.assertEqual(response.json(), await self.sync_get(f'/api/variants/{self.variant.pk}/stock/'))
+        # las consultas del ORM asíncrono (en otro hilo) también se miden
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+        response = await self.async_client.get('/api/async/inventory/low_stock/')
+        self.assertEqual([item['variant'] for item in response.json()], [self.variant.pk])
+
+        response = await self.async_client.get('/api/async/products/999999/')
+        self.assertEqual(response.status_code, 404)
+
+    async def sync_get(self, url):
+        from asgiref.sync import sync_to_async
+
+        response = await sync_to_async(self.client.get)(url)
+        return json.loads(response.content)
+
+
+class LowStockTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='ops', email='ops@shop.com', password='x')
+        self.client.force_authenticate(self.user)
+        product = crear_producto()
+        self.baja = crear_variante(product, sku='LOW-1', stock=3, size='40')
+        self.alta = crear_variante(product, sku='LOW-2', stock=50, size='41')
+
+    def changes(self, after):
+        return self.client.get(f'/api/inventory/low_stock/changes/?after={after}').data
+
+    def test_conjunto_paginado(self):
+        crear_variante(crear_producto(name='Otro'), sku='LOW-3', stock=0)
+        response = self.client.get('/api/inventory/low_stock/?page_size=1')
+        self.assertEqual(len(response.data['results']), 1)
+        segunda = self.client.get(response.data['next']).data
+        variantes = [item['variant'] for item in response.data['results'] + segunda['results']]
+        self.assertEqual(len(variantes), 2)
+        self.assertNotIn(self.alta.pk, variantes)
+
+    def test_consulta_servida_por_indice_parcial(self):
+        plan = Inventory.objects.low_stock().order_by('id').explain()
+        self.assertIn('inventory_low_stock_idx', plan)
+
+    def test_feed_de_cruces(self):
+        # el alta con stock bajo ya es un evento
+        inicio = self.client.get('/api/inventory/low_stock/changes/').data
+        self.assertEqual([e['variant'] for e in inicio['results']], [self.baja.pk])
+        last_id = inicio['last_id']
+
+        # movimientos atómicos: 50 -> 10 entra, 10 -> 11 sale, 11 -> 12 no cruza
+        self.client.post(f'/api/variants/{self.alta.pk}/reserve/', {'quantity': 40})
+        self.client.post(f'/api/variants/{self.alta.pk}/release/', {'quantity': 1})
+        self.client.post(f'/api/variants/{self.alta.pk}/release/', {'quantity': 1})
+        # guardado normal (PUT de stock)
+        self.client.put(f'/api/variants/{self.baja.pk}/stock/', {'stock_quantity': 30})
+
+        data = self.changes(last_id)
+        self.assertEqual(
+            [(e['variant'], e['is_low_stock']) for e in data['results']],
+            [(self.alta.pk, True), (self.alta.pk, False), (self.baja.pk, False)],
+        )
+        self.assertEqual(self.changes(data['last_id']), {'last_id': data['last_id'], 'results': []})
+
+    def test_importacion_registra_cruces(self):
+        inicio = LowStockEvent.objects.order_by('-id').values_list('id', flat=True).first()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(
+                "product_name,description,category,gender,base_price,size,color,sku,stock_quantity\n"
+                "Zapato,,deportivo,unisex,100,40,negro,LOW-1,20\n"
+                "Zapato,,deportivo,unisex,100,41,negro,LOW-2,2\n"
+            )
+        self.addCleanup(os.unlink, f.name)
+        call_command('import_catalog', f.name, stdout=io.StringIO(), stderr=io.StringIO())
+        eventos = LowStockEvent.objects.filter(id__gt=inicio)
+        self.assertEqual(
+            sorted((e.variant_id, e.is_low_stock) for e in eventos),
+            sorted([(self.baja.pk, False), (self.alta.pk, True)]),
+        )
+        self.assertEqual(list(Inventory.objects.low_stock().values_list('variant_id', flat=True)), [self.alta.pk])
+
+
+@override_settings(CATALOG_CACHE={'ENABLED': False})
+class FastSerializerTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        # Textos y precios que ponen a prueba el formato: unicode, separadores JS, decimales
+        zapato = crear_producto(name='Zapatilla ñandú 👟', description='línea\u2028nueva "comillas"',
+                                base_price=Decimal('99.90'), gender=Product.GenderChoices.NIÑO)
+        bota = crear_producto(name='Bota', category=Product.CategoryChoices.UTILITARIO, base_price=Decimal('0'))
+        crear_variante(zapato, sku='FAST-1', stock=2)
+        crear_variante(zapato, sku='FAST-2', stock=40, size='43', color='blanco')
+        crear_variante(bota, sku='FAST-3', stock=0)
+
+    def test_salida_identica_byte_a_byte(self):
+        for url in (
+            '/api/products/',
+            '/api/products/?page_size=1',
+            '/api/variants/',
+            '/api/inventory/',
+            '/api/inventory/low_stock/',
+        ):
+            fast = self.client.get(url)
+            with self.settings(FAST_SERIALIZERS={'ENABLED': False}):
+                slow = self.client.get(url)
+            self.assertEqual(fast.status_code, 200, url)
+            self.assertEqual(fast.content, slow.content, url)
+
+    def test_inventario_en_una_consulta(self):
+        # filas con JOIN a variante y producto + validadores ETag
+        with self.assertNumQueries(2):
+            self.client.get('/api/inventory/')
+
+
+class BulkWriteTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user(username='w', email='w@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(self.staff)
+        self.product = crear_producto(name='Runner')
+        self.variants = [crear_variante(self.product, sku=f'BULK-{i}', stock=20, size=str(38 + i)) for i in range(4)]
+        self.sin_inventario = Variant.objects.create(product=self.product, sku='BULK-X', size='45', color='negro')
+
+    def post(self, url, items):
+        return self.client.post(url, items, format='json')
+
+    def stock(self):
+        return dict(Inventory.objects.values_list('variant__sku', 'stock_quantity'))
+
+    def test_inventario_por_sku_y_variante(self):
+        items = [
+            {'sku': 'BULK-0', 'stock_quantity': 5},
+            {'variant': self.variants[1].pk, 'stock_quantity': 20},
+            {'sku': 'BULK-2', 'stock_quantity': 0, 'low_stock_threshold': 3},
+            {'sku': 'BULK-X', 'stock_quantity': 12},
+        ]
+        response = self.post('/api/inventory/bulk/', items)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([item['status'] for item in body['results']], ['updated', 'unchanged', 'updated', 'created'])
+        self.assertEqual((body['created'], body['updated'], body['unchanged'], body['failed']), (1, 2, 1, 0))
+        self.assertEqual(self.stock(), {'BULK-0': 5, 'BULK-1': 20, 'BULK-2': 0, 'BULK-3': 20, 'BULK-X': 12})
+        self.assertEqual(Inventory.objects.get(variant__sku='BULK-2').low_stock_threshold, 3)
+        # BULK-0 y BULK-2 entran en stock bajo
+        self.assertEqual(
+            sorted(LowStockEvent.objects.values_list('variant_id', 'is_low_stock')),
+            [(self.variants[0].pk, True), (self.variants[2].pk, True)],
+        )
+
+    def test_consultas_fijas_por_lote(self):
+        items = [{'sku': f'BULK-{i}', 'stock_quantity': i} for i in range(4)]
+        # validación (1) + transacción con bloqueo, UPDATE y registro de cruces
+        with CaptureQueriesContext(connections['default']) as small:
+            self.post('/api/inventory/bulk/', items[:1])
+        with CaptureQueriesContext(connections['default']) as large:
+            self.post('/api/inventory/bulk/', [{**item, 'stock_quantity': 50} for item in items])
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    @override_settings(BULK_WRITES={'BATCH_SIZE': 2})
+    def test_validacion_por_trozos(self):
+        items = [{'sku': f'BULK-{i}', 'stock_quantity': 7} for i in range(3)]
+        items += [{'variant': self.variants[3].pk, 'stock_quantity': 7}, {'sku': 'BULK-X', 'stock_quantity': 7}]
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.post('/api/inventory/bulk/', items)
+        self.assertEqual(response.json()['failed'], 0)
+        self.assertEqual(set(self.stock().values()), {7})
+        # 4 SKUs y 1 id en trozos de 2: 2 consultas de validación
+        lookups = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT "core_variant"."id"')]
+        self.assertEqual(len(lookups), 2)
+
+        response = self.post('/api/variants/bulk/', [
+            {'product': self.product.pk, 'size': str(50 + i), 'color': 'rojo', 'sku': f'TROZO-{i}'} for i in range(6)
+        ] + [{'product': 999999, 'size': '60', 'color': 'rojo', 'sku': 'TROZO-X'}])
+        self.assertEqual([item['status'] for item in response.json()['results']][-2:], ['created', 'invalid'])
+
+    @override_settings(BULK_WRITES={'BATCH_SIZE': 2})
+    def test_lote_atomico(self):
+        items = [
+            {'sku': 'BULK-0', 'stock_quantity': 1},
+            {'sku': 'NO-EXISTE', 'stock_quantity': 1},
+            {'sku': 'BULK-2', 'stock_quantity': 1},
+            {'variant': self.variants[3].pk, 'stock_quantity': -1},
+            {'sku': 'BULK-1', 'stock_quantity': 2},
+        ]
+        response = self.post('/api/inventory/bulk/', items)
+        self.assertEqual(response.status_code, 207)
+        results = response.json()['results']
+        self.assertEqual([item['status'] for item in results], ['rejected', 'invalid', 'rejected', 'invalid', 'updated'])
+        self.assertIn('sku', results[1]['errors'])
+        self.assertIn('stock_quantity', results[3]['errors'])
+        self.assertEqual(self.stock()['BULK-0'], 20)
+        self.assertEqual(self.stock()['BULK-1'], 2)
+
+    def test_variantes_alta_y_actualizacion(self):
+        items = [
+            {'product': self.product.pk, 'size': '38', 'color': 'rojo', 'sku': 'BULK-0'},
+            {'product': self.product.pk, 'size': '46', 'color': 'negro', 'sku': 'BULK-NEW'},
+            {'product': self.product.pk, 'size': '39', 'color': 'negro', 'sku': 'BULK-1'},
+        ]
+        response = self.post('/api/variants/bulk/', items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['status'] for item in response.json()['results']], ['updated', 'created', 'unchanged'])
+        self.assertEqual(Variant.objects.get(sku='BULK-0').color, 'rojo')
+        self.assertEqual(response.json()['results'][1]['id'], Variant.objects.get(sku='BULK-NEW').pk)
+
+        response = self.post('/api/variants/bulk/', [
+            {'product': 999999, 'size': '40', 'color': 'azul', 'sku': 'BULK-A'},
+            {'product': self.product.pk, 'size': '40', 'color': 'azul', 'sku': 'BULK-B'},
+            {'product': self.product.pk, 'size': '41', 'color': 'azul', 'sku': 'BULK-B'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([item['status'] for item in response.json()['results']], ['invalid', 'rejected', 'invalid'])
+        self.assertFalse(Variant.objects.filter(sku='BULK-B').exists())
+
+    def test_errores_de_escritura_y_cache(self):
+        self.assertEqual(self.client.get(f'/api/variants/{self.variants[0].pk}/stock/').json()['stock_quantity'], 20)
+        self.post('/api/inventory/bulk/', [{'sku': 'BULK-0', 'stock_quantity': 3}])
+        self.assertEqual(self.client.get(f'/api/variants/{self.variants[0].pk}/stock/').json()['stock_quantity'], 3)
+        # Talla/color ya usados por otra variante del producto: falla el lote entero
+        response = self.post('/api/variants/bulk/', [
+            {'product': self.product.pk, 'size': '39', 'color': 'negro', 'sku': 'BULK-0'},
+        ])
+        self.assertEqual(response.json()['results'][0]['status'], 'failed')
+        self.assertEqual(Variant.objects.get(sku='BULK-0').size, '38')
+
+    def test_permisos_y_formato(self):
+        self.assertEqual(self.post('/api/inventory/bulk/', {'sku': 'BULK-0'}).status_code, 400)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='c', email='c@shop.com', password='x'))
+        self.assertEqual(client.post('/api/inventory/bulk/', [], format='json').status_code, 403)
+
+
+class SparseFieldsetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.zapato = crear_producto(name='Zapato', description='x' * 200)
+        self.bota = crear_producto(name='Bota')
+        self.variant = crear_variante(self.zapato, sku='SPARSE-1', stock=2)
+        crear_variante(self.bota, sku='SPARSE-2', stock=30, size='43')
+
+    def get(self, url):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.json(), ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields_reduce_respuesta_y_columnas(self):
+        data, sql = self.get('/api/products/?fields=id,name,current_price')
+        self.assertEqual([list(item) for item in data['results']], [['id', 'name', 'current_price']] * 2)
+        self.assertNotIn('"description"', sql)
+        self.assertIn('"effective_price"', sql)
+        self.assertNotIn('"base_price"', sql)
+
+        data, sql = self.get('/api/products/?omit=description,category_display,gender_display')
+        self.assertEqual(set(data['results'][0]), {'id', 'name', 'category', 'gender', 'base_price', 'current_price', 'created_at'})
+        self.assertNotIn('"description"', sql)
+
+    def test_paginacion_por_cursor_con_fields(self):
+        data, _ = self.get('/api/products/?fields=name&page_size=1')
+        # validadores + página, sin el prefetch de variantes que ya no se usa
+        with self.assertNumQueries(2):
+            second = self.client.get(data['next']).json()
+        self.assertEqual([data['results'], second['results']], [[{'name': 'Bota'}], [{'name': 'Zapato'}]])
+
+    def test_campos_anidados(self):
+        data, sql = self.get(
+            '/api/products/catalog/?fields=name,variants.sku,variants.inventory.stock_quantity&omit=variants.sku'
+        )
+        zapato = next(item for item in data['results'] if item['name'] == 'Zapato')
+        self.assertEqual(zapato, {'name': 'Zapato', 'variants': [{'inventory': {'stock_quantity': 2}}]})
+        self.assertNotIn('"core_product"."description"', sql)
+
+    def test_relaciones_y_detalle(self):
+        data, _ = self.get('/api/variants/?fields=sku,product_name')
+        self.assertEqual(data[0], {'sku': 'SPARSE-1', 'product_name': 'Zapato'})
+        data, _ = self.get('/api/inventory/low_stock/?fields=variant_info,stock_quantity')
+        self.assertEqual(data['results'], [{'variant_info': 'Zapato - 42/negro', 'stock_quantity': 2}])
+        data, sql = self.get(f'/api/products/{self.zapato.pk}/?fields=name')
+        self.assertEqual(data, {'name': 'Zapato'})
+        self.assertNotIn('"description"', sql)
+        data, _ = self.get(f'/api/variants/{self.variant.pk}/stock/?omit=variant_info,updated_at')
+        self.assertEqual(set(data), {'id', 'variant', 'stock_quantity'})
+
+    def test_escrituras_ignoran_fields(self):
+        admin = User.objects.create_user(username='a', email='a@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.patch(f'/api/products/{self.bota.pk}/?fields=id', {'name': 'Botín'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Botín')
+
+
+class CompressionTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            crear_producto(name=f'Producto {i}', description='Zapatilla de running ' * 5)
+
+    def test_negociacion(self):
+        self.assertEqual(negotiate('gzip, deflate').name, 'gzip')
+        self.assertEqual(negotiate('*').name, 'gzip')
+        self.assertIsNone(negotiate('gzip;q=0, identity'))
+        self.assertIsNone(negotiate(''))
+        # Preferencia del cliente antes que la del servidor; sin brotli/zstd se usa gzip
+        self.assertEqual(negotiate('zstd;q=0.1, gzip;q=0.9').name, 'gzip')
+
+    def test_comprime_json_con_gzip(self):
+        plain = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content) * 4, len(plain.content))
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+    def test_respuestas_pequenas_sin_comprimir(self):
+        response = self.client.get('/api/products/?page_size=1&fields=id', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        staff = User.objects.create_user(username='s', email='s@shop.com', password='x', is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/products/export/?file_format=csv', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertTrue(content.startswith('product_name,description'))
+
+    def test_html_sin_comprimir(self):
+        # Admin y browsable API llevan el token CSRF: comprimirlos abre la puerta a BREACH
+        response = self.client.get(reverse('admin:login'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertGreater(len(response.content), 1024)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(PUSH={'HEARTBEAT': 0.05})
+class InventoryStreamTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        self.user = User.objects.create_user(username='push', email='push@shop.com', password='x')
+        self.client.force_authenticate(self.user)
+        self.a = crear_variante(crear_producto(name='A'), sku='PUSH-A', stock=10)
+        self.b = crear_variante(crear_producto(name='B', category=Product.CategoryChoices.UTILITARIO), sku='PUSH-B')
+
+    async def open(self, query='', **headers):
+        response = await self.async_client.get(f'/api/stream/inventory/{query}', **headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def next_event(self, stream):
+        while True:
+            chunk = (await asyncio.wait_for(anext(stream), 2)).decode()
+            if not chunk.startswith(':'):
+                return chunk
+
+    def reserve(self, variant, quantity=1):
+        # Los on_commit no corren dentro de TestCase: se ejecutan a mano
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/variants/{variant.pk}/reserve/', {'quantity': quantity})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_publica_cambios_confirmados_con_filtro(self):
+        from asgiref.sync import sync_to_async
+
+        todos = await self.open()
+        de_a = await self.open(f'?product={self.a.product_id}')
+        utilitario = await self.open('?category=utilitario')
+
+        await sync_to_async(self.reserve)(self.a, 3)
+        chunk = await self.next_event(todos)
+        self.assertIn('event: stock\n', chunk)
+        data = json.loads(chunk.split('data: ')[1])
+        self.assertEqual((data['variant'], data['stock_quantity']), (self.a.pk, 7))
+        self.assertEqual(await self.next_event(de_a), chunk)
+
+        await sync_to_async(self.reserve)(self.b)
+        self.assertIn(f'"variant":{self.b.pk}', await self.next_event(utilitario))
+        self.assertIn(f'"variant":{self.b.pk}', await self.next_event(todos))
+        # el suscrito al producto A solo recibe el latido
+        self.assertEqual(await asyncio.wait_for(anext(de_a), 2), b': ping\n\n')
+
+    async def test_reconexion_reenvia_lo_perdido(self):
+        from asgiref.sync import sync_to_async
+
+        stream = await self.open()
+        await sync_to_async(self.reserve)(self.a)
+        first_id = int((await self.next_event(stream)).split('\n')[0][len('id: '):])
+        await sync_to_async(self.reserve)(self.a)
+        await sync_to_async(self.reserve)(self.a)
+
+        stream = await self.open(headers={'Last-Event-ID': str(first_id)})
+        missed = [await self.next_event(stream), await self.next_event(stream)]
+        self.assertEqual([json.loads(c.split('data: ')[1])['stock_quantity'] for c in missed], [8, 7])
+
+        stream = await self.open(headers={'Last-Event-ID': '999999'})
+        self.assertIn('event: reset', await self.next_event(stream))
+
+    def test_sin_suscriptores_no_consulta(self):
+        with self.assertNumQueries(0):
+            publish_inventory([self.a.pk])
+
+    def test_requiere_asgi(self):
+        self.assertEqual(self.client.get('/api/stream/inventory/').status_code, 501)
+
+
+class PromotionTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.runner = crear_producto(name='Runner', base_price=Decimal('100.00'))
+        self.bota = crear_producto(
+            name='Bota', base_price=Decimal('80.00'),
+            category=Product.CategoryChoices.UTILITARIO, gender=Product.GenderChoices.HOMBRE,
+        )
+
+    def promocion(self, **kwargs):
+        defaults = {'name': 'Promo', 'discount_type': Promotion.DiscountType.PERCENTAGE, 'value': Decimal('10')}
+        defaults.update(kwargs)
+        return Promotion.objects.create(**defaults)
+
+    def precios(self):
+        return dict(Product.objects.values_list('name', 'effective_price'))
+
+    def test_descuentos(self):
+        self.assertEqual(discounted(Decimal('99.99'), percentage=Decimal('15')), Decimal('84.99'))
+        self.assertEqual(discounted(Decimal('20'), fixed=Decimal('25')), Decimal('0'))
+        # Gana el descuento que deja el precio más bajo, no se acumulan
+        self.assertEqual(discounted(Decimal('100'), Decimal('10'), Decimal('15')), Decimal('85'))
+
+    def test_alcance_y_mejor_promocion(self):
+        self.assertEqual(self.precios(), {'Runner': Decimal('100.00'), 'Bota': Decimal('80.00')})
+        self.promocion(category=Product.CategoryChoices.UTILITARIO, value=Decimal('25'))
+        self.promocion(product=self.runner, discount_type=Promotion.DiscountType.FIXED, value=Decimal('5'))
+        self.assertEqual(self.precios(), {'Runner': Decimal('95.00'), 'Bota': Decimal('60.00')})
+        self.promocion(value=Decimal('10'))  # todo el catálogo
+        self.assertEqual(self.precios(), {'Runner': Decimal('90.00'), 'Bota': Decimal('60.00')})
+        response = self.client.get(f'/api/products/{self.runner.pk}/')
+        self.assertEqual(response.data['current_price'], Decimal('90.00'))
+
+    def test_cambiar_y_borrar_promocion_recalcula_su_alcance(self):
+        promo = self.promocion(gender=Product.GenderChoices.HOMBRE, value=Decimal('50'))
+        self.assertEqual(self.precios()['Bota'], Decimal('40.00'))
+        promo.gender = Product.GenderChoices.UNISEX
+        promo.save()
+        self.assertEqual(self.precios(), {'Runner': Decimal('50.00'), 'Bota': Decimal('80.00')})
+        Promotion.objects.get(pk=promo.pk).delete()
+        self.assertEqual(self.precios(), {'Runner': Decimal('100.00'), 'Bota': Decimal('80.00')})
+
+    def test_producto_nuevo_o_modificado_toma_su_precio(self):
+        self.promocion(category=Product.CategoryChoices.DEPORTIVO, value=Decimal('20'))
+        nuevo = crear_producto(name='Nuevo', base_price=Decimal('50.00'))
+        self.assertEqual(nuevo.current_price, Decimal('40.00'))
+        nuevo.base_price = Decimal('60.00')
+        nuevo.save(update_fields=['base_price'])
+        self.assertEqual(self.precios()['Nuevo'], Decimal('48.00'))
+
+    def test_ventana_de_fechas_con_refresh_prices(self):
+        ahora = timezone.now()
+        promo = self.promocion(value=Decimal('50'), starts_at=ahora + timedelta(hours=1), ends_at=ahora + timedelta(hours=2))
+        self.assertEqual(self.precios()['Runner'], Decimal('100.00'))
+        self.assertFalse(promo.applied)
+
+        with mock.patch('django.utils.timezone.now', return_value=ahora + timedelta(minutes=90)):
+            call_command('refresh_prices', stdout=io.StringIO())
+        self.assertEqual(self.precios()['Runner'], Decimal('50.00'))
+        self.assertTrue(Promotion.objects.get(pk=promo.pk).applied)
+
+        with mock.patch('django.utils.timezone.now', return_value=ahora + timedelta(hours=3)):
+            out = io.StringIO()
+            call_command('refresh_prices', stdout=out)
+            self.assertIn('1 promociones recalculadas: 2 precios cambiados', out.getvalue())
+            call_command('refresh_prices', stdout=out)
+            self.assertIn('0 promociones recalculadas', out.getvalue())
+        self.assertEqual(self.precios()['Runner'], Decimal('100.00'))
+
+    def test_filtro_de_precio_usa_precio_efectivo(self):
+        self.promocion(product=self.runner, value=Decimal('30'))
+        response = self.client.get('/api/products/browse/?price_max=75')
+        self.assertEqual([item['name'] for item in response.data['results']], ['Runner'])
+        self.assertEqual(
+            {item['value']: item['count'] for item in response.data['facets']['price']},
+            {'50-100': 2},
+        )
+
+    def test_promocion_invalida_cache_y_etag(self):
+        response = self.client.get('/api/products/')
+        etag = response['ETag']
+        self.promocion(value=Decimal('10'))
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(item['current_price'] for item in response.json()['results']),
+            [72.0, 90.0],
+        )
+
+    def test_importacion_aplica_promociones(self):
+        self.promocion(category=Product.CategoryChoices.UTILITARIO, discount_type=Promotion.DiscountType.FIXED, value=Decimal('30'))
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write(CatalogImportTests.CSV)
+        self.addCleanup(os.unlink, f.name)
+        call_command('import_catalog', f.name, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.precios()['Bota'], Decimal('120.00'))
+        self.assertEqual(Product.objects.get(name='Runner').current_price, Decimal('99.90'))
+
+
+class JSONRendererTests(SimpleTestCase):
+    data = {
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'name': 'Zapatilla ñandú 👟',
+        'description': 'línea\u2028nueva\u2029 "comillas" </script>',
+        'base_price': Decimal('99.90'),
+        'current_price': 99.9,
+        'created_at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'updated_at': datetime(2024, 5, 1, 12, 30),
+        'day': date(2024, 5, 1),
+        'tags': ('a', 'b'),
+        'nested': [{'ok': True, 'none': None, 'count': 3}],
+        'huge': 2 ** 70,
+    }
+
+    def assertSameAsDRF(self, renderer_class):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(renderer_class().render(self.data), expected)
+
+    def test_stdlib_igual_que_drf(self):
+        self.assertSameAsDRF(StdlibJSONRenderer)
+
+    @skipUnless(find_spec('orjson'), 'requiere orjson')
+    def test_orjson_igual_que_drf(self):
+        self.assertSameAsDRF(OrjsonRenderer)
+
+    @skipUnless(find_spec('msgspec'), 'requiere msgspec')
+    def test_msgspec_igual_que_drf(self):
+        self.assertSameAsDRF(MsgspecRenderer)
+
+    def test_decimales_como_drf(self):
+        # msgspec escribiría Decimal('100.00') tal cual; se convierte antes, como DRF
+        data = {'price': Decimal('100.00'), 'rows': [(Decimal('0.10'), 'x')], 'n': 3}
+        self.assertEqual(coerce_decimals(data), {'price': 100.0, 'rows': [[0.1, 'x']], 'n': 3})
+        self.assertEqual(StdlibBackend().dumps(coerce_decimals(data)), JSONRenderer().render(data))
+
+    def test_msgspec_json_invalido_es_value_error(self):
+        class DecodeError(Exception):
+            pass
+
+        # Sin msgspec instalado: se simulan el módulo y su decoder
+        backend = MsgspecBackend.__new__(MsgspecBackend)
+        backend.msgspec = mock.Mock(DecodeError=DecodeError)
+        backend.decoder = mock.Mock(decode=mock.Mock(side_effect=DecodeError('truncated')))
+        with self.assertRaisesMessage(ValueError, 'truncated'):
+            backend.loads(b'{"a":')
+
+    def test_indentado_usa_la_biblioteca_estandar(self):
+        content = FastJSONRenderer().render({'a': [1]}, 'application/json; indent=2')
+        self.assertEqual(content, b'{\n  "a": [\n    1\n  ]\n}')
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"name": "ñandú", "n": [1, 2.5]}'.encode())),
+                         {'name': 'ñandú', 'n': [1, 2.5]})
+        for invalid in (b'{"a":', b'NaN'):
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(invalid))
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    @override_settings(DATABASE_REPLICAS=['replica9'])
+    def test_solo_lee_de_replica_dentro_de_replica_reads(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), 'default')
+        with request_context(), replica_reads():
+            self.assertEqual(router.db_for_read(Product), 'replica9')
+            self.assertEqual(router.db_for_write(Product), 'default')
+            # tras escribir, el resto de la petición lee del primario
+            self.assertEqual(router.db_for_read(Product), 'default')
+        self.assertFalse(router.allow_migrate('replica9', 'core'))
+
+    def test_sin_replicas_todo_al_primario(self):
+        with self.settings(DATABASE_REPLICAS=[]), replica_reads():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Product), 'default')
+
+
+@skipUnless('replica1' in settings.DATABASES, 'requiere DB_REPLICAS (p. ej. DB_REPLICAS=/tmp/replica.sqlite3)')
+class ReplicaRoutingTests(TransactionTestCase):
+    """La réplica es espejo de 'default' en tests: se comprueba qué conexión consulta"""
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        catalog_cache.reset()
+        throttling.reset()
+        self.user = User.objects.create_user(username='rep', email='rep@shop.com', password='x')
+        self.variant = crear_variante(crear_producto(), sku='REP-1', stock=3)
+
+    def queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400)
+        return len(primary), len(replica), response
+
+    def test_lecturas_del_catalogo_van_a_la_replica(self):
+        for url in (
+            '/api/products/',
+            f'/api/products/{self.variant.product_id}/variants/',
+            f'/api/variants/{self.variant.pk}/stock/',
+            '/api/inventory/low_stock/',
+        ):
+            primary, replica, _ = self.queries('get', url)
+            self.assertEqual(primary, 0, url)
+            self.assertGreater(replica, 0, url)
+
+    def test_escritura_fija_la_sesion_al_primario(self):
+        url = f'/api/variants/{self.variant.pk}/stock/'
+        self.client.force_authenticate(self.user)
+        primary, replica, response = self.queries('put', url, data={'stock_quantity': 8})
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertIn('pin_primary', response.cookies)
+
+        # anónimo con la cookie (force_authenticate(None) borraría las cookies)
+        self.client = APIClient()
+        self.client.cookies = response.cookies
+        primary, replica, response = self.queries('get', url)
+        self.assertEqual(replica, 0)
+        self.assertEqual(response.data['stock_quantity'], 8)
+
+    def test_usuario_jwt_fijado_sin_cookie(self):
+        self.client.force_authenticate(self.user)
+        self.client.put(f'/api/variants/{self.variant.pk}/stock/', {'stock_quantity': 1})
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connections['replica1']) as replica:
+            client.get('/api/inventory/low_stock/')
+        self.assertEqual(len(replica), 0)
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_sin_ventana_vuelve_a_la_replica(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.put(f'/api/variants/{self.variant.pk}/stock/', {'stock_quantity': 1})
+        self.client = APIClient()
+        self.client.cookies = response.cookies
+        _, replica, _ = self.queries('get', '/api/products/')
+        self.assertGreater(replica, 0)
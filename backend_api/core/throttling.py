@@ -0,0 +1,230 @@
+"""
+Limitación de peticiones (throttling) por token bucket.
+
+Cada cliente tiene un cubo de `burst` fichas que se rellena a `rate` fichas
+por segundo; cada petición consume una. Si el cubo está vacío se responde
+429 con `Retry-After` (lo añade DRF a partir de `wait()`). A diferencia de la
+ventana fija de DRF, el coste por petición es O(1) y no se guarda el historial
+de marcas de tiempo.
+
+Un throttle solo actúa en las vistas que declaran un ámbito:
+- `throttle_scope = 'login'` en vistas simples, o
+- `throttle_scopes = {'accion': 'ámbito'}` en viewsets (por acción).
+Por defecto solo se limitan métodos de escritura (POST/PUT/PATCH/DELETE):
+leer stock no consume fichas, cambiarlo sí.
+
+Claves: `IPBucketThrottle` limita por IP (`NUM_PROXIES` de DRF) y
+`UserBucketThrottle` por usuario autenticado. Ambos usan el mismo ámbito con
+límites independientes.
+
+Backends:
+- `LocalBucketBackend`: en memoria del proceso, LRU acotado.
+- `DjangoCacheBackend`: sobre un alias de `CACHES`, compartido entre workers.
+  La lectura-escritura del cubo no es atómica: bajo carrera pueden colarse
+  algunas peticiones de más, nunca más de las de un cubo lleno por worker.
+
+Configuración (`settings.THROTTLING`):
+    {
+        'BACKEND': 'core.throttling.LocalBucketBackend',
+        'OPTIONS': {'max_entries': 100000},
+        'ENABLED': True,
+        'SCOPES': {
+            'login': {'ip': '10/min'},                       # burst = 10
+            'stock_write': {'user': {'rate': '60/min', 'burst': 20}},
+        },
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'core.throttling.LocalBucketBackend',
+    'OPTIONS': {},
+    'ENABLED': True,
+    'SCOPES': {},
+}
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(spec):
+    """
+    `'10/min'` o `{'rate': '10/min', 'burst': 5}` -> `(fichas_por_segundo, burst)`.
+    Sin `burst` explícito el cubo admite una ráfaga igual al número de peticiones.
+    """
+    if isinstance(spec, dict):
+        rate, burst = spec['rate'], spec.get('burst')
+    else:
+        rate, burst = spec, None
+    count, period = rate.split('/')
+    count = int(count)
+    return count / PERIODS[period], burst or count
+
+
+def take(state, now, rate, burst):
+    """
+    Aplica el token bucket a `state = (fichas, instante)` (o `None` si es nuevo).
+    Devuelve `(nuevo_estado, espera)`; `espera == 0` si la petición se permite.
+    """
+    if state is None:
+        tokens = burst
+    else:
+        tokens, last = state
+        tokens = min(burst, tokens + (now - last) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketBackend:
+    """Cubos en memoria del proceso, seguros entre hilos y acotados por LRU"""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            state, wait = take(self._buckets.get(key), now, rate, burst)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                # El más antiguo es el que lleva más tiempo sin pedir: su cubo ya estaría lleno
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DjangoCacheBackend:
+    """Cubos en un alias de `settings.CACHES`, compartidos entre workers"""
+    prefix = 'throttle:'
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def consume(self, key, rate, burst):
+        key = self.prefix + key
+        state, wait = take(self.cache.get(key), time.time(), rate, burst)
+        # Expira cuando el cubo volvería a estar lleno: no deja basura
+        self.cache.set(key, state, int(burst / rate) + 1)
+        return wait
+
+    def clear(self):
+        self.cache.clear()
+
+
+class Throttling:
+    """Fachada: configuración, backend y resolución de límites por ámbito"""
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return {**DEFAULT_SETTINGS, **getattr(settings, 'THROTTLING', {})}
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    config = self.config
+                    backend_class = import_string(config['BACKEND'])
+                    self._backend = backend_class(**config['OPTIONS'])
+        return self._backend
+
+    def reset(self):
+        """Descarta el backend y con él todos los cubos"""
+        with self._lock:
+            self._backend = None
+
+    def get_rate(self, scope, kind):
+        spec = self.config['SCOPES'].get(scope, {}).get(kind)
+        return parse_rate(spec) if spec else None
+
+    def consume(self, key, rate, burst):
+        return self.backend.consume(key, rate, burst)
+
+
+throttling = Throttling()
+
+
+def get_throttle_scope(view):
+    """Ámbito de la vista: `throttle_scopes[action]` o `throttle_scope`"""
+    scopes = getattr(view, 'throttle_scopes', None)
+    if scopes is not None:
+        return scopes.get(getattr(view, 'action', None))
+    return getattr(view, 'throttle_scope', None)
+
+
+class BucketThrottle(BaseThrottle):
+    """Base: subclases definen `kind` y `get_ident_key(request)`"""
+    kind = None
+    # Métodos limitados; None = solo escrituras
+    methods = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def applies(self, request):
+        if self.methods is None:
+            return request.method not in SAFE_METHODS
+        return request.method in self.methods
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if not throttling.enabled or not self.applies(request):
+            return True
+        scope = get_throttle_scope(view)
+        limit = throttling.get_rate(scope, self.kind) if scope else None
+        if limit is None:
+            return True
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        wait = throttling.consume(f'{scope}:{self.kind}:{ident}', *limit)
+        if wait:
+            self.wait_seconds = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPBucketThrottle(BucketThrottle):
+    kind = 'ip'
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class UserBucketThrottle(BucketThrottle):
+    kind = 'user'
+
+    def get_ident_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return None
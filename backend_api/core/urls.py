@@ -2,28 +2,51 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.documentation import include_docs_urls
 from django.contrib import admin
+from rest_framework_simplejwt.views import TokenRefreshView
+from .metrics import metrics_view
+from .push import inventory_stream
+from . import async_views
 #from rest_framework.schemas import get_schema_vie
 from .views import (
     RegisterAPIView,
     LoginAPIView,
+    LogoutAPIView,
     ProfileAPIView,
     ProductViewSet,
     VariantViewSet,
     InventoryViewSet,
-    
+    OrderViewSet,
+    CartAPIView,
+    CartItemAPIView,
+    CheckoutAPIView,
+    RequestMetricsAPIView,
 )
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'variants', VariantViewSet, basename='variant')
 router.register(r'inventory', InventoryViewSet, basename='inventory')
+router.register(r'orders', OrderViewSet, basename='order')
 
 urlpatterns = [
+    path('api/cart/', CartAPIView.as_view(), name='cart'),
+    path('api/cart/items/', CartItemAPIView.as_view(), name='cart-items'),
+    path('api/cart/checkout/', CheckoutAPIView.as_view(), name='checkout'),
+    path('metrics', metrics_view, name='metrics'),
+    # Lecturas del catálogo con el ORM asíncrono (servir con un servidor ASGI)
+    path('api/async/products/', async_views.product_list, name='async-product-list'),
+    path('api/async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('api/async/variants/<int:pk>/stock/', async_views.variant_stock, name='async-variant-stock'),
+    path('api/async/inventory/low_stock/', async_views.low_stock, name='async-inventory-low-stock'),
+    path('api/stream/inventory/', inventory_stream, name='inventory-stream'),
+    path('api/ops/metrics/', RequestMetricsAPIView.as_view(), name='ops-metrics'),
     path('api/', include(router.urls)),
     # Tus otras URLs personalizadas aquí (ej: usuarios)
     #path('admin', admin.site.urls),
     path('register/', RegisterAPIView.as_view(), name='register'),
     path('login/', LoginAPIView.as_view(), name='login'),
+    path('logout/', LogoutAPIView.as_view(), name='logout'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('profile/', ProfileAPIView.as_view(), name='profile'),
     path('', include_docs_urls(title='E-commerce Shop API')),
 
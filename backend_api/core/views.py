@@ -1,27 +1,60 @@
 # users/views.py
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from .serializers import UserSerializer, UserLoginSerializer, UserSerializer, VariantSerializer, InventorySerializer, ProductSerializer
-from .models import Product, Inventory, Variant
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import issue_tokens, revoke_access_token
+from .instrumentation import registry as metrics_registry
+from . import metrics
+from .serializers import UserSerializer, UserLoginSerializer, UserSerializer, VariantSerializer, InventorySerializer, ProductSerializer, CatalogProductSerializer
+from .serializers import StockMovementSerializer, StockBatchSerializer
+from .serializers import CartSerializer, CartItemSerializer, OrderSerializer
+from .serializers import ProductSearchQuerySerializer
+from .serializers import LowStockEventSerializer, LowStockFeedQuerySerializer
+from .serializers import InventoryBulkItemSerializer, VariantBulkItemSerializer
+from .models import Product, Inventory, Variant, Cart, CartItem, Order
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import action
-from django.db import models 
+from django.db import models, transaction
+from django.db.models import Prefetch
+from .pagination import LowStockCursorPagination, ProductCursorPagination
+from .cache import CachedCatalogMixin, cache_response
+from .conditional import ConditionalCatalogMixin, conditional_response
+from .stock import InsufficientStock, MissingInventory, decrement_many, increment_many
+from .checkout import EmptyCart, checkout, lock_cart
+from .importers import FORMATS, CatalogImporter, EncodingError, check_encoding, iter_rows, open_text
+from rest_framework.parsers import MultiPartParser
+from .exporters import CONTENT_TYPES, FORMATS as EXPORT_FORMATS, export_catalog
+from django.http import StreamingHttpResponse
+from .low_stock import feed as low_stock_feed
+from .routers import ReplicaReadMixin
+from .fast_serializers import FastListMixin, InventoryRows, ProductRows, VariantRows
+from .fieldsets import SparseQuerysetMixin
+from .bulk import run_bulk
+from .search import search_products
+from .facets import FacetFilters, facet_counts, filter_products
 
 # Obtenemos el modelo de usuario personalizado (o el default de Django)
 User = get_user_model()
+
+# Plan de carga del catálogo anidado: 1 consulta de productos + 1 de
+# variantes (con su inventario vía JOIN), sin importar el tamaño de página.
+CATALOG_PREFETCH = Prefetch(
+    'variants',
+    queryset=Variant.objects.select_related('inventory').order_by('id'),
+)
 class RegisterAPIView(generics.CreateAPIView):
     """
     Endpoint para el registro de nuevos usuarios.
 
     Permite a un usuario registrarse en el sistema, creando una nueva cuenta
-    y generando un token de autenticación para acceso inmediato.
+    y emitiendo tokens JWT (access/refresh) para acceso inmediato.
 
     Flujo:
     1. Valida los datos del usuario (email, username, password, etc.).
     2. Crea el usuario en la base de datos.
-    3. Genera (o obtiene) un token de autenticación asociado al usuario.
-    4. Devuelve una respuesta con datos básicos del usuario y el token.
+    3. Emite el par de tokens JWT (no se guarda nada en la base de datos).
+    4. Devuelve una respuesta con datos básicos del usuario y los tokens.
 
     Notas de seguridad:
     - Solo devuelve datos públicos del usuario (evita enviar información sensible).
@@ -30,11 +63,11 @@ class RegisterAPIView(generics.CreateAPIView):
 
     Posibles mejoras futuras:
     - Implementar verificación por email.
-    - Añadir rate limiting para evitar abuso.
-    - Soporte para OAuth2/JWT en lugar de tokens simples.
+    - Soporte para OAuth2.
     """
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
 
     def perform_create(self, serializer):
         """
@@ -42,27 +75,25 @@ class RegisterAPIView(generics.CreateAPIView):
         
         Aquí se maneja:
         - La creación del usuario (save() del serializer).
-        - La generación del token de autenticación.
+        - La emisión de los tokens JWT.
         
         Separar esta lógica de `create` sigue las buenas prácticas de DRF.
         """
         user = serializer.save()  # Guarda el usuario (el serializer ya validó los datos)
-        # Crea o obtiene un token para el nuevo usuario
-        token, created = Token.objects.get_or_create(user=user)
-        # Almacena el token en el objeto view para usarlo en la respuesta
-        self.token = token
+        # Emite los tokens y los guarda en el objeto view para usarlos en la respuesta
+        self.tokens = issue_tokens(user)
 
     def create(self, request, *args, **kwargs):
         """
         Maneja la lógica principal de creación y respuesta.
 
         1. Valida los datos con el serializer.
-        2. Llama a `perform_create` para guardar el usuario y generar el token.
-        3. Construye una respuesta con datos seguros del usuario + token.
+        2. Llama a `perform_create` para guardar el usuario y emitir los tokens.
+        3. Construye una respuesta con datos seguros del usuario + tokens.
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)  # Valida los datos (400 si falla)
-        self.perform_create(serializer)  # Llama a perform_create (crea usuario + token)
+        self.perform_create(serializer)  # Llama a perform_create (crea usuario + tokens)
 
         # Serializa el usuario para la respuesta (podría ser un serializer diferente)
         user_data = UserSerializer(instance=serializer.instance).data
@@ -70,14 +101,15 @@ class RegisterAPIView(generics.CreateAPIView):
         return Response(
             {
                 'user': user_data,
-                'token': self.token.key,  # Token generado en perform_create
+                'token': self.tokens['access'],  # Compatibilidad: el frontend lee `token`
+                **self.tokens,
             },
             status=status.HTTP_201_CREATED,
         )
     
 class LoginAPIView(generics.GenericAPIView):
     """
-    Endpoint para autenticar usuarios y generar tokens.
+    Endpoint para autenticar usuarios y emitir tokens JWT.
 
     Método: POST
     Campos requeridos en el body:
@@ -85,31 +117,56 @@ class LoginAPIView(generics.GenericAPIView):
     - password
 
     Respuestas:
-    - 200 OK: Credenciales válidas → Devuelve usuario + token.
+    - 200 OK: Credenciales válidas → Devuelve usuario + tokens (`access`, `refresh`).
+      `token` repite el access token para los clientes existentes.
     - 400 Bad Request: Datos inválidos o credenciales incorrectas.
     """
     serializer_class = UserLoginSerializer
     permission_classes = [permissions.AllowAny]
+    # Limita intentos por IP antes de llegar a hashear (ver core.throttling)
+    throttle_scope = 'login'
 
     def post(self, request, *args, **kwargs):
         """
         Procesa el login:
         1. Valida los datos con UserLoginSerializer.
-        2. Genera/recupera el token del usuario.
-        3. Devuelve datos públicos del usuario + token.
+        2. Emite el par de tokens JWT (sin escribir en la base de datos).
+        3. Devuelve datos públicos del usuario + tokens.
         """
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)  # Lanza 400 si hay errores
         user = serializer.validated_data['user']  # Objeto User desde el serializer
+        metrics.inc('login_attempts_total', (('result', 'success'),))
 
-        # Obtener o crear token (evita crear múltiples tokens por usuario)
-        token, _ = Token.objects.get_or_create(user=user)
-        print('token', token)
+        tokens = issue_tokens(user)
 
         return Response({
             'user': UserSerializer(user).data,
-            'token': token.key
+            'token': tokens['access'],
+            **tokens,
         }, status=status.HTTP_200_OK)
+
+
+class LogoutAPIView(generics.GenericAPIView):
+    """
+    Cierra la sesión JWT.
+
+    - Revoca el access token usado en la petición (lista en caché, sin BD).
+    - Si se envía `refresh` en el body, lo añade a la blacklist de simplejwt.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if request.auth is not None and 'jti' in request.auth:
+            revoke_access_token(request.auth)
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                RefreshToken(refresh).blacklist()
+            except TokenError as exc:
+                return Response({'refresh': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
     
 #VERSION SEGURA INTERFAZ DRF USA "SESIONES" PARA AUTENTICACION NO TOKEN
     
@@ -131,41 +188,192 @@ class ProfileAPIView(generics.RetrieveUpdateAPIView):
         from django.contrib.auth import get_user_model
         return get_user_model().objects.first()  # Devuelve el primer usuario
     
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, ConditionalCatalogMixin, CachedCatalogMixin, FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet para el modelo Product.
     Permite todas las operaciones CRUD y endpoints adicionales.
     """
     queryset = Product.objects.prefetch_related('variants').all()
+    replica_actions = ('list', 'retrieve', 'catalog', 'browse', 'variants', 'inventory')
+    fast_rows_class = ProductRows
+    sparse_actions = ('list', 'retrieve', 'catalog')
+    pagination_class = ProductCursorPagination
+    validator_fields = {
+        'default': ('updated_at',),
+        'catalog': ('updated_at', 'variants__updated_at', 'variants__inventory__updated_at'),
+        'variants': ('updated_at', 'variants__updated_at'),
+        'inventory': ('updated_at', 'variants__updated_at', 'variants__inventory__updated_at'),
+    }
     
+    def get_queryset(self):
+        """Aplica el plan de prefetch anidado solo donde se serializa"""
+        if self.action == 'catalog':
+            return Product.objects.prefetch_related(CATALOG_PREFETCH)
+        if self.action == 'browse':
+            # ProductSerializer no usa las variantes: se evita el prefetch
+            return Product.objects.all()
+        return super().get_queryset()
+
     def get_serializer_class(self):
         """Determina qué serializer usar según la acción"""
+        if self.action == 'catalog':
+            return CatalogProductSerializer
         if self.action in ['create', 'update', 'partial_update']:
             return ProductSerializer
         return ProductSerializer
 
+    @action(detail=False, methods=['get'])
+    @conditional_response
+    @cache_response
+    def catalog(self, request):
+        """
+        Listado del catálogo con variantes y stock anidados.
+        Reemplaza las llamadas por producto a `variants/` e `inventory/`:
+        cuesta un número fijo de consultas por página.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def browse(self, request):
+        """
+        Navegación facetada: resultados filtrados + conteos de todas las facetas.
+        Filtros: `category`, `gender`, `size`, `color`, `price` (rango, ej. `50-100`),
+        `price_min`, `price_max`. Cada uno admite varios valores separados por comas.
+        """
+        filters = FacetFilters(request.query_params)
+        queryset = filter_products(self.get_queryset(), filters)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['facets'] = facet_counts(filters)
+        return response
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def search(self, request):
+        """
+        Búsqueda full-text rankeada: `?q=texto&category=&gender=&limit=`.
+        Devuelve los productos ordenados por relevancia con su `score`.
+        """
+        params = ProductSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        hits = search_products(
+            params.validated_data['q'],
+            category=params.validated_data.get('category'),
+            gender=params.validated_data.get('gender'),
+            limit=params.validated_data['limit'],
+        )
+        products = Product.objects.in_bulk([product_id for product_id, _ in hits])
+        results = []
+        for product_id, score in hits:
+            if product_id in products:
+                item = ProductSerializer(products[product_id], context=self.get_serializer_context()).data
+                item['score'] = round(float(score), 4)
+                results.append(item)
+        return Response({'count': len(results), 'results': results})
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        url_name='import',
+        parser_classes=[MultiPartParser],
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def import_catalog(self, request):
+        """
+        Importación masiva (solo staff). Multipart con `file` (CSV o JSONL) y
+        opcionalmente `file_format`. Devuelve el resumen y los errores por fila.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ["Este campo es requerido."]}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('file_format') or upload.name.rpartition('.')[2].lower()
+        if fmt not in FORMATS:
+            return Response(
+                {'file_format': [f"Formato no soportado. Opciones: {', '.join(FORMATS)}"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            check_encoding(upload.file)
+        except EncodingError as exc:
+            return Response(
+                {'file': [str(exc)], 'line': exc.line, 'position': exc.position},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = CatalogImporter().run(iter_rows(open_text(upload.file), fmt))
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='export',
+        url_name='export',
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def export_catalog(self, request):
+        """
+        Feed del catálogo completo para marketplaces (solo staff).
+        `?file_format=csv|jsonl|ndjson`. Se transmite en streaming con memoria constante.
+        """
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response(
+                {'file_format': [f"Formato no soportado. Opciones: {', '.join(EXPORT_FORMATS)}"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        response = StreamingHttpResponse(export_catalog(fmt), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="catalogo.{fmt}"'
+        return response
+
     @action(detail=True, methods=['get'])
+    @conditional_response
+    @cache_response
     def variants(self, request, pk=None):
         """Endpoint para obtener todas las variantes de un producto"""
         product = self.get_object()
         variants = product.variants.all()
-        serializer = VariantSerializer(variants, many=True)
+        serializer = VariantSerializer(variants, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
+    @conditional_response
+    @cache_response
     def inventory(self, request, pk=None):
         """Endpoint para obtener el inventario de todas las variantes de un producto"""
         product = self.get_object()
         inventory = Inventory.objects.filter(variant__product=product)
-        serializer = InventorySerializer(inventory, many=True)
+        serializer = InventorySerializer(inventory, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
-class VariantViewSet(viewsets.ModelViewSet):
+class VariantViewSet(ReplicaReadMixin, ConditionalCatalogMixin, CachedCatalogMixin, FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet para el modelo Variant.
     Maneja operaciones CRUD para las variantes de productos.
     """
     queryset = Variant.objects.select_related('product', 'inventory').all()
+    # `stock` solo lee de réplica en GET; el PUT va siempre al primario
+    replica_actions = ('list', 'retrieve', 'stock')
+    fast_rows_class = VariantRows
+    validator_fields = {
+        'default': ('updated_at', 'product__updated_at'),
+        'stock': ('updated_at', 'product__updated_at', 'inventory__updated_at'),
+    }
+    # Solo se limitan las escrituras: leer stock no consume fichas
+    throttle_scopes = {
+        'stock': 'stock_write',
+        'reserve': 'stock_write',
+        'release': 'stock_write',
+        'reserve_many': 'stock_write',
+        'release_many': 'stock_write',
+    }
     
     def get_serializer_class(self):
         """Determina qué serializer usar según la acción"""
@@ -174,12 +382,14 @@ class VariantViewSet(viewsets.ModelViewSet):
         return VariantSerializer
 
     @action(detail=True, methods=['get', 'put'])
+    @conditional_response
+    @cache_response
     def stock(self, request, pk=None):
         """Endpoint especial para manejar el stock de una variante"""
         variant = self.get_object()
         
         if request.method == 'GET':
-            serializer = InventorySerializer(variant.inventory)
+            serializer = InventorySerializer(variant.inventory, context=self.get_serializer_context())
             return Response(serializer.data)
             
         elif request.method == 'PUT':
@@ -189,20 +399,249 @@ class VariantViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data)
 
-class InventoryViewSet(viewsets.ReadOnlyModelViewSet):
+    def move_stock(self, movement, lines):
+        """
+        Aplica un movimiento atómico y construye la respuesta (409 si no
+        alcanza, 404 si alguna variante no tiene inventario al liberar)
+        """
+        try:
+            stock = movement(lines)
+        except InsufficientStock as exc:
+            return Response(
+                {'error': str(exc), 'shortages': exc.shortages},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except MissingInventory as exc:
+            return Response(
+                {'error': str(exc), 'missing': exc.variants},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(
+            {'items': [
+                {'variant': variant_id, 'stock_quantity': quantity}
+                for variant_id, quantity in stock.items()
+            ]},
+            status=status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=['post'])
+    def reserve(self, request, pk=None):
+        """
+        Descuenta stock de una variante sin sobreventa.
+        Body: {"quantity": n}. Responde 409 si no hay stock suficiente.
+        """
+        variant = self.get_object()
+        serializer = StockMovementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.move_stock(decrement_many, [(variant.pk, serializer.validated_data['quantity'])])
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Devuelve unidades reservadas al stock. Body: {"quantity": n}"""
+        variant = self.get_object()
+        serializer = StockMovementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.move_stock(increment_many, [(variant.pk, serializer.validated_data['quantity'])])
+
+    @action(detail=False, methods=['post'], url_path='reserve', url_name='reserve-many')
+    def reserve_many(self, request):
+        """
+        Reserva un carrito completo en un solo UPDATE (todo o nada).
+        Body: {"items": [{"variant": id, "quantity": n}, ...]}
+        """
+        serializer = StockBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.move_stock(decrement_many, serializer.get_lines())
+
+    @action(detail=False, methods=['post'], url_path='release', url_name='release-many')
+    def release_many(self, request):
+        """Libera las reservas de un carrito completo"""
+        serializer = StockBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.move_stock(increment_many, serializer.get_lines())
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def bulk(self, request):
+        """
+        Alta/actualización de variantes en lote (solo staff), por `sku`.
+        Body: [{"product": id, "size": "42", "color": "negro", "sku": "..."}, ...]
+        Devuelve el resultado por elemento (ver `core/bulk.py`).
+        """
+        result = run_bulk(VariantBulkItemSerializer(data=request.data, many=True))
+        return Response(result.as_dict(), status=result.status_code)
+
+class InventoryViewSet(ReplicaReadMixin, ConditionalCatalogMixin, CachedCatalogMixin, FastListMixin, SparseQuerysetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet de solo lectura para el modelo Inventory.
     Permite consultar y filtrar inventario.
     """
     queryset = Inventory.objects.select_related('variant__product').all()
+    replica_actions = ('list', 'retrieve', 'low_stock', 'low_stock_changes')
+    fast_rows_class = InventoryRows
     serializer_class = InventorySerializer
     filterset_fields = ['stock_quantity', 'variant__product__category']
+    validator_fields = {
+        'default': ('updated_at', 'variant__updated_at', 'variant__product__updated_at'),
+    }
+
+    def get_low_stock_queryset(self):
+        """Items cuyo stock está en o por debajo de su umbral"""
+        return self.get_queryset().low_stock()
+
+    def get_validator_queryset(self):
+        if self.action == 'low_stock':
+            return self.get_low_stock_queryset()
+        return super().get_validator_queryset()
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=LowStockCursorPagination)
+    @conditional_response
+    @cache_response
     def low_stock(self, request):
-        """Endpoint especial para obtener items con stock bajo"""
-        low_stock = self.get_queryset().filter(
-            stock_quantity__lte=models.F('low_stock_threshold')
+        """
+        Items con stock bajo, paginados por cursor (`?cursor=`, `?page_size=`).
+        Recorre solo el índice parcial de stock bajo.
+        """
+        if self.use_fast_rows():
+            return self.fast_list_response(self.get_low_stock_queryset())
+        page = self.paginate_queryset(self.sparse_queryset(self.get_low_stock_queryset()))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def bulk(self, request):
+        """
+        Sincronización de stock en lote (solo staff): fija el stock (y
+        opcionalmente el umbral) de cada variante, por `sku` o `variant`.
+        Body: [{"sku": "...", "stock_quantity": n, "low_stock_threshold": m}, ...]
+        """
+        result = run_bulk(InventoryBulkItemSerializer(data=request.data, many=True))
+        return Response(result.as_dict(), status=result.status_code)
+
+    @action(detail=False, methods=['get'], url_path='low_stock/changes', url_name='low-stock-changes')
+    def low_stock_changes(self, request):
+        """
+        Feed de variantes que entran o salen del stock bajo.
+        `?after=<id>` devuelve los eventos posteriores; sin `after`, los más
+        recientes. `last_id` es el `after` de la siguiente consulta.
+        """
+        params = LowStockFeedQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        events, last_id = low_stock_feed(
+            params.validated_data.get('after'),
+            params.validated_data['limit'],
         )
-        serializer = self.get_serializer(low_stock, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response({
+            'last_id': last_id,
+            'results': LowStockEventSerializer(events, many=True, context=self.get_serializer_context()).data,
+        })
+
+
+class CartMixin:
+    """Obtiene (o crea) el carrito del usuario autenticado"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_cart(self):
+        cart, _ = Cart.objects.get_or_create(user=self.request.user)
+        return cart
+
+    def cart_response(self, cart, status_code=status.HTTP_200_OK):
+        cart = Cart.objects.prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.select_related('variant__product').order_by('id'))
+        ).get(pk=cart.pk)
+        return Response(CartSerializer(cart, context=self.get_serializer_context()).data, status=status_code)
+
+
+class CartAPIView(CartMixin, generics.GenericAPIView):
+    """
+    Carrito del usuario guardado en el servidor.
+    GET: devuelve el carrito con sus líneas. DELETE: lo vacía.
+    """
+    serializer_class = CartSerializer
+
+    def get(self, request, *args, **kwargs):
+        return self.cart_response(self.get_cart())
+
+    def delete(self, request, *args, **kwargs):
+        cart = self.get_cart()
+        CartItem.objects.filter(cart=cart).delete()
+        return self.cart_response(cart)
+
+
+class CartItemAPIView(CartMixin, generics.GenericAPIView):
+    """
+    Alta/modificación de líneas del carrito.
+    POST {"variant": id, "quantity": n} fija la cantidad (0 elimina la línea).
+    """
+    serializer_class = CartItemSerializer
+    throttle_scope = 'cart_write'
+
+    def post(self, request, *args, **kwargs):
+        cart = self.get_cart()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variant = serializer.validated_data['variant']
+        quantity = serializer.validated_data['quantity']
+        with transaction.atomic():
+            # Espera a un checkout en curso del mismo carrito
+            lock_cart(cart)
+            if quantity == 0:
+                CartItem.objects.filter(cart=cart, variant=variant).delete()
+            else:
+                CartItem.objects.update_or_create(cart=cart, variant=variant, defaults={'quantity': quantity})
+            cart.save(update_fields=['updated_at'])
+        return self.cart_response(cart)
+
+
+class CheckoutAPIView(CartMixin, generics.GenericAPIView):
+    """
+    Confirma el carrito como pedido.
+
+    Respuestas:
+    - 201 Created: pedido creado, stock descontado y carrito vaciado.
+    - 400 Bad Request: carrito vacío.
+    - 409 Conflict: stock insuficiente (incluye el detalle por variante).
+    - 429 Too Many Requests: límite de checkouts superado (`Retry-After`).
+    """
+    serializer_class = OrderSerializer
+    throttle_scope = 'checkout'
+
+    def post(self, request, *args, **kwargs):
+        try:
+            order = checkout(self.get_cart())
+        except EmptyCart as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as exc:
+            return Response(
+                {'error': str(exc), 'shortages': exc.shortages},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(order).data, status=status.HTTP_201_CREATED)
+
+
+class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet de solo lectura para los pedidos del usuario autenticado.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).prefetch_related('lines')
+
+
+class RequestMetricsAPIView(generics.GenericAPIView):
+    """
+    Agregados de rendimiento por vista de este proceso (solo staff).
+
+    GET: por `"MÉTODO vista"` devuelve peticiones, errores 5xx, latencia media,
+    p50/p95/p99 estimados, histograma (ms), consultas y tiempos de BD y de
+    serialización medios. DELETE: reinicia los contadores.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics_registry.snapshot())
+
+    def delete(self, request, *args, **kwargs):
+        metrics_registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)